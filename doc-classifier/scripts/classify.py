@@ -1,8 +1,10 @@
 """Classify a document as Driver License, Insurance, or Unknown."""
 
 import json
+import math
 import sys
 from pathlib import Path
+from typing import Literal
 
 from dotenv import load_dotenv
 import openai
@@ -12,32 +14,69 @@ from pydantic import ValidationError
 # Add project root to path so we can import shared modules
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
 
-from legal_skills.image_utils import file_to_base64_image
+from legal_skills.image_utils import (
+    DocumentSource,
+    file_to_base64_image,
+    load_source,
+    source_name,
+)
 from legal_skills.models import ClassificationResult
+from legal_skills import metrics
+from legal_skills.backends import ModelBackend, backend_key, default_backend
+from legal_skills.deadline import Deadline, request_timeout, timeout_kwargs
+from legal_skills.packing import (
+    DEFAULT_BATCH_SIZE,
+    chunked,
+    packed_image_content,
+    packed_response_instructions,
+    parse_indexed_results,
+)
+from legal_skills.schemas import (
+    RefusalError,
+    packed_response_format,
+    response_content,
+    response_format,
+)
+from legal_skills.singleflight import request_key, run_once, run_once_async
 
 load_dotenv()
 
+CLASSIFICATION_GUIDANCE = (
+    "You are a document classifier. Examine the image and determine "
+    "if it is a Driver License or an Insurance document. "
+    "IMPORTANT: If the document is not clearly a Driver License or Insurance document, "
+    'return "unknown". The confidence score reflects how certain you are about your classification — '
+    "use high confidence when you are sure (even if the type is unknown), "
+    "low confidence when you are uncertain. Do NOT guess or force a classification."
+)
 
-def classify_document(file_path: str) -> ClassificationResult:
-    """Classify a document image as driver_license, insurance, or unknown."""
-    base64_image = file_to_base64_image(file_path, auto_rotate=True)
-    client = OpenAI()
+# Single-token labels for logprob mode; each is one token in the GPT-4o tokenizer.
+LABEL_TOKENS = {"D": "driver_license", "I": "insurance", "U": "unknown"}
 
+LOGPROB_PROMPT = (
+    "You are a document classifier. Examine the image and determine "
+    "if it is a Driver License or an Insurance document. "
+    "Answer with exactly one letter: D for a Driver License, I for an Insurance document, "
+    "U if the document is not clearly either. Do NOT guess or force a classification."
+)
+
+RESULT_SHAPE = '"document_type": "driver_license" | "insurance" | "unknown", "confidence": 0.0-1.0'
+
+
+def _classify_image(
+    backend: ModelBackend,
+    file_path: str | None,
+    base64_image: str,
+    deadline: Deadline | None = None,
+) -> ClassificationResult:
+    """Classify a single already-encoded image."""
     try:
-        response = client.chat.completions.create(
+        response = backend.complete(
             model="gpt-4o-mini",
             messages=[
                 {
                     "role": "system",
-                    "content": (
-                        "You are a document classifier. Examine the image and determine "
-                        "if it is a Driver License or an Insurance document. "
-                        'Respond with JSON: {"document_type": "driver_license" | "insurance" | "unknown", "confidence": 0.0-1.0}. '
-                        "IMPORTANT: If the document is not clearly a Driver License or Insurance document, "
-                        'return "unknown". The confidence score reflects how certain you are about your classification — '
-                        "use high confidence when you are sure (even if the type is unknown), "
-                        "low confidence when you are uncertain. Do NOT guess or force a classification."
-                    ),
+                    "content": f"{CLASSIFICATION_GUIDANCE} Respond with JSON: {{{RESULT_SHAPE}}}.",
                 },
                 {
                     "role": "user",
@@ -55,10 +94,11 @@ def classify_document(file_path: str) -> ClassificationResult:
                     ],
                 },
             ],
-            response_format={"type": "json_object"},
+            response_format=response_format(ClassificationResult),
             max_tokens=100,
+            **request_timeout(deadline, "classify"),
         )
-        result = json.loads(response.choices[0].message.content)
+        result = json.loads(response_content(response))
         return ClassificationResult(
             file_path=file_path,
             document_type=result.get("document_type", "unknown"),
@@ -68,16 +108,246 @@ def classify_document(file_path: str) -> ClassificationResult:
         print(f"OpenAI API call failed: {e}", file=sys.stderr)
         raise
     except json.JSONDecodeError as e:
+        metrics.increment("parse_failures.classify")
         print(f"Failed to parse OpenAI response as JSON: {e}", file=sys.stderr)
         raise
     except ValidationError as e:
+        metrics.increment("parse_failures.classify")
         print(f"OpenAI response failed Pydantic validation: {e}", file=sys.stderr)
         raise
+    except RefusalError as e:
+        metrics.increment("refusals.classify")
+        print(f"OpenAI declined to answer: {e}", file=sys.stderr)
+        raise
+
+
+def _label_distribution(top_logprobs: list) -> dict[str, float]:
+    """Turn the first token's top logprobs into a normalized distribution over labels.
+
+    Token variants that map to the same label (e.g. "D" and " d") are summed.
+    Raises ValueError if none of the top tokens is a label.
+    """
+    mass = dict.fromkeys(LABEL_TOKENS.values(), 0.0)
+    for candidate in top_logprobs:
+        label = LABEL_TOKENS.get(candidate.token.strip().upper())
+        if label is not None:
+            mass[label] += math.exp(candidate.logprob)
+    total = sum(mass.values())
+    if total == 0.0:
+        tokens = [candidate.token for candidate in top_logprobs]
+        raise ValueError(f"No classification label among top tokens: {tokens}")
+    return {label: p / total for label, p in mass.items()}
+
+
+def _classify_image_logprob(
+    backend: ModelBackend,
+    file_path: str | None,
+    base64_image: str,
+    deadline: Deadline | None = None,
+) -> ClassificationResult:
+    """Classify a single encoded image from one label token and its logprobs.
+
+    The confidence is the label's probability renormalized over the three
+    labels, rather than a number the model writes about itself.
+    """
+    try:
+        response = backend.complete(
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": LOGPROB_PROMPT},
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "image_url",
+                            "image_url": {
+                                "url": f"data:image/png;base64,{base64_image}",
+                            },
+                        },
+                        {"type": "text", "text": "Classify this document. Answer D, I or U."},
+                    ],
+                },
+            ],
+            max_tokens=1,
+            logprobs=True,
+            top_logprobs=5,
+            **request_timeout(deadline, "classify"),
+        )
+        logprobs = response.choices[0].logprobs
+        if logprobs is None or not logprobs.content:
+            raise ValueError("Response has no logprobs for the label token")
+        distribution = _label_distribution(logprobs.content[0].top_logprobs)
+        document_type = max(distribution, key=distribution.__getitem__)
+        return ClassificationResult(
+            file_path=file_path,
+            document_type=document_type,
+            confidence=distribution[document_type],
+        )
+    except openai.OpenAIError as e:
+        print(f"OpenAI API call failed: {e}", file=sys.stderr)
+        raise
+    except ValueError as e:
+        metrics.increment("parse_failures.classify")
+        print(f"Failed to read classification label from logprobs: {e}", file=sys.stderr)
+        raise
+
+
+def _classify_packed(
+    backend: ModelBackend,
+    file_paths: list[str],
+    base64_images: list[str],
+    deadline: Deadline | None = None,
+) -> list[ClassificationResult]:
+    """Classify several encoded images in one request.
+
+    Falls back to one request per image when the packed response is malformed.
+    """
+    try:
+        response = backend.complete(
+            model="gpt-4o-mini",
+            messages=[
+                {
+                    "role": "system",
+                    "content": (
+                        f"{CLASSIFICATION_GUIDANCE} "
+                        f"{packed_response_instructions(len(file_paths), RESULT_SHAPE)}"
+                    ),
+                },
+                {
+                    "role": "user",
+                    "content": packed_image_content(
+                        base64_images, "Classify each document independently."
+                    ),
+                },
+            ],
+            response_format=packed_response_format(ClassificationResult),
+            max_tokens=60 * len(file_paths),
+            **request_timeout(deadline, "classify"),
+        )
+        items = parse_indexed_results(response_content(response), len(file_paths))
+        return [
+            ClassificationResult(
+                file_path=file_path,
+                document_type=item.get("document_type", "unknown"),
+                confidence=item.get("confidence", 0.0),
+            )
+            for file_path, item in zip(file_paths, items)
+        ]
+    except (ValueError, ValidationError) as e:
+        # json.JSONDecodeError is a ValueError subclass
+        metrics.increment("parse_failures.classify_packed")
+        print(f"Packed classification response malformed, retrying per item: {e}", file=sys.stderr)
+    return [
+        _classify_image(backend, file_path, base64_image, deadline)
+        for file_path, base64_image in zip(file_paths, base64_images)
+    ]
+
+
+def _classify_document(
+    source: DocumentSource,
+    source_id: str | None,
+    mode: Literal["json", "logprob"],
+    backend: ModelBackend | None,
+    deadline: Deadline | None,
+) -> ClassificationResult:
+    base64_image = file_to_base64_image(
+        source, auto_rotate=True, **timeout_kwargs(deadline, "classify")
+    )
+    backend = backend or default_backend(OpenAI)
+    if mode == "logprob":
+        return _classify_image_logprob(backend, source_id, base64_image, deadline)
+    return _classify_image(backend, source_id, base64_image, deadline)
+
+
+def classify_document(
+    file_path: DocumentSource,
+    *,
+    source_id: str | None = None,
+    mode: Literal["json", "logprob"] = "json",
+    backend: ModelBackend | None = None,
+    deadline: Deadline | None = None,
+) -> ClassificationResult:
+    """Classify a document image as driver_license, insurance, or unknown.
+
+    mode="json" asks the model for a JSON object with a self-reported
+    confidence. mode="logprob" requests a single label token and derives the
+    confidence from its logprobs, which is faster and better calibrated.
+    backend defaults to the one selected by the environment (see
+    legal_skills.backends). Concurrent calls for identical file content and
+    options share one request (see legal_skills.singleflight). With a
+    deadline, rendering and the model call are bounded by the time left;
+    DeadlineExceeded is raised when it runs out and OperationCancelled when
+    it is cancelled (see legal_skills.deadline).
+
+    file_path may also be the document's bytes or a binary stream (see
+    file_to_base64_image). The result's file_path is source_id, which
+    defaults to the path for file inputs and None for in-memory ones.
+    """
+    source = load_source(file_path)
+    source_id = source_id or source_name(file_path)
+    key = request_key("classify", source, source_id, mode, backend_key(backend))
+    return run_once(
+        "classify",
+        key,
+        lambda: _classify_document(source, source_id, mode, backend, deadline),
+        deadline=deadline,
+    )
+
+
+async def classify_document_async(
+    file_path: DocumentSource,
+    *,
+    source_id: str | None = None,
+    mode: Literal["json", "logprob"] = "json",
+    backend: ModelBackend | None = None,
+    deadline: Deadline | None = None,
+) -> ClassificationResult:
+    """Asyncio variant of classify_document; runs the call in the default executor."""
+    source = load_source(file_path)
+    source_id = source_id or source_name(file_path)
+    key = request_key("classify", source, source_id, mode, backend_key(backend))
+    return await run_once_async(
+        "classify",
+        key,
+        lambda: _classify_document(source, source_id, mode, backend, deadline),
+        deadline=deadline,
+    )
+
+
+def classify_documents(
+    file_paths: list[str],
+    *,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    backend: ModelBackend | None = None,
+    deadline: Deadline | None = None,
+) -> list[ClassificationResult]:
+    """Classify many documents, packing up to ``batch_size`` images per request.
+
+    Results are returned in the same order as ``file_paths``. A batch of one
+    is sent as a regular single-image request. A deadline bounds the whole
+    batch, including per-item fallbacks.
+    """
+    backend = backend or default_backend(OpenAI)
+    results: list[ClassificationResult] = []
+    for batch in chunked(file_paths, batch_size):
+        base64_images = [
+            file_to_base64_image(path, auto_rotate=True, **timeout_kwargs(deadline, "classify"))
+            for path in batch
+        ]
+        if len(batch) == 1:
+            results.append(_classify_image(backend, batch[0], base64_images[0], deadline))
+        else:
+            results.extend(_classify_packed(backend, batch, base64_images, deadline))
+    return results
 
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python classify.py <file_path>", file=sys.stderr)
+    if len(sys.argv) < 2:
+        print("Usage: python classify.py <file_path> [<file_path> ...]", file=sys.stderr)
         sys.exit(1)
-    result = classify_document(sys.argv[1])
-    print(result.model_dump_json(indent=2))
+    if len(sys.argv) == 2:
+        result = classify_document(sys.argv[1])
+        print(result.model_dump_json(indent=2))
+    else:
+        results = classify_documents(sys.argv[1:])
+        print(json.dumps([r.model_dump() for r in results], indent=2))
@@ -7,6 +7,7 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
 
+from legal_skills.deadline import Deadline
 from legal_skills.models import (
     DriverLicenseData,
     FieldDiscrepancy,
@@ -23,14 +24,18 @@ def _normalize(value: str | None) -> str:
 
 
 def validate_documents(
-    dl: DriverLicenseData, insurance: InsuranceData
+    dl: DriverLicenseData, insurance: InsuranceData, *, deadline: Deadline | None = None
 ) -> ValidationReport:
     """Compare DL and insurance data, returning a validation report.
 
     Checks name, date of birth, and address for discrepancies.
     Name and address comparisons are case-insensitive.
     DOB comparison is skipped if either value is None.
+    Raises DeadlineExceeded if the deadline has already passed, or
+    OperationCancelled if it was cancelled.
     """
+    if deadline is not None:
+        deadline.check("validate")
     discrepancies: list[FieldDiscrepancy] = []
 
     # Name comparison
@@ -1,6 +1,9 @@
 """Extract structured data from an Insurance document."""
 import json
+import re
 import sys
+from collections.abc import Iterable
+from datetime import date
 from pathlib import Path
 
 import openai
@@ -11,57 +14,538 @@ from dotenv import load_dotenv
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
 
 from legal_skills.models import InsuranceData
-from legal_skills.image_utils import file_to_base64_image
+from legal_skills.image_utils import (
+    DocumentSource,
+    QualityThresholds,
+    TieredRenderer,
+    composite_base64_image,
+    file_to_base64_image,
+    files_to_base64_images,
+    load_sources,
+    source_name,
+    unreadable_only,
+)
+from legal_skills import metrics
+from legal_skills.backends import ModelBackend, backend_key, default_backend, stream_completion
+from legal_skills.cascade import ImageProfile, is_identifier, is_iso_date, run_cascade
+from legal_skills.deadline import Deadline, request_timeout, timeout_kwargs
+from legal_skills.packing import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_MAX_PACKED_IMAGE_CHARS,
+    chunked,
+    packed_image_content,
+    packed_response_instructions,
+    parse_indexed_results,
+)
+from legal_skills.repair import (
+    field_spec,
+    max_tokens_for,
+    merge_fields,
+    recorded_sources,
+    select_fields,
+)
+from legal_skills.schemas import (
+    RefusalError,
+    field_response_format,
+    packed_response_format,
+    response_content,
+    response_format,
+)
+from legal_skills.singleflight import request_key, run_once, run_once_async
+from legal_skills.streaming import FieldStream
 
 load_dotenv()
 
-EXTRACTION_PROMPT = (
-    "Extract the following fields from this insurance document image. "
-    "Return JSON with these exact keys: "
-    "first_name, last_name, date_of_birth (YYYY-MM-DD or null), address, "
-    "policy_number (or null), vehicle_make (or null), vehicle_model (or null), "
-    "vehicle_year (or null), vin (or null). "
+# Prompt hint for each extracted field; None means no hint.
+FIELD_DESCRIPTIONS: dict[str, str | None] = {
+    "first_name": None,
+    "last_name": None,
+    "date_of_birth": "YYYY-MM-DD or null",
+    "address": None,
+    "policy_number": "or null",
+    "vehicle_make": "or null",
+    "vehicle_model": "or null",
+    "vehicle_year": "or null",
+    "vin": "or null",
+}
+
+FIELD_SPEC = f"{field_spec(FIELD_DESCRIPTIONS, FIELD_DESCRIPTIONS)}. "
+
+EXTRACTION_RULES = (
     "IMPORTANT: Only extract values that are clearly visible in the document. "
     "If a field is not visible, partially obscured, or you are not confident in the value, use null. "
     "Do NOT guess or fabricate any values. Accuracy is more important than completeness."
 )
 
+EXTRACTION_PROMPT = (
+    "Extract the following fields from this insurance document image. "
+    "Return JSON with these exact keys: "
+    f"{FIELD_SPEC}"
+    f"{EXTRACTION_RULES}"
+)
+
+PACKED_EXTRACTION_PROMPT = (
+    "Extract the following fields from each insurance document image. "
+    "Each result must have these exact keys: "
+    f"{FIELD_SPEC}"
+    f"{EXTRACTION_RULES}"
+)
+
+# Pre-flight quality gate for extract_insurance, its async variant and stream (see
+# legal_skills.image_utils.unreadable_only); the batch, packed and reextract
+# paths are not gated.
+QUALITY_THRESHOLDS = unreadable_only("extract_insurance")
+
+# Fields that must be present for a cascade run to stop at a cheaper tier.
+CASCADE_REQUIRED_FIELDS = ("address", "date_of_birth", "policy_number")
+
+# 17 characters; VINs never use I, O or Q.
+_VIN = re.compile(r"[A-HJ-NPR-Z0-9]{17}", re.IGNORECASE)
+
+
+def _plausible(data: InsuranceData) -> bool:
+    """Cascade check for values a low-detail read tends to garble rather than omit."""
+    if not is_identifier(data.policy_number) or not is_iso_date(data.date_of_birth):
+        return False
+    if data.vin is not None and not _VIN.fullmatch(data.vin):
+        return False
+    year = data.vehicle_year
+    return year is None or (year.isdigit() and 1900 <= int(year) <= date.today().year + 2)
+
+
+def _image_url(base64_image: str, detail: str | None) -> dict:
+    """Build the image_url payload, adding the detail level when requested."""
+    image_url = {"url": f"data:image/png;base64,{base64_image}"}
+    if detail is not None:
+        image_url["detail"] = detail
+    return image_url
 
-def extract_insurance(file_path: str) -> InsuranceData:
-    """Extract structured data from an insurance document image."""
-    base64_image = file_to_base64_image(file_path, auto_rotate=True)
-    client = OpenAI()
 
+def _user_text(image_count: int, source_count: int) -> str:
+    """Instruction sent after the image parts of an extraction request."""
+    if source_count == 1:
+        return "Extract all fields from this insurance document."
+    combine = "Extract all fields, combining what every capture shows."
+    if image_count == 1:
+        return (
+            f"This image stacks {source_count} captures of the same insurance document "
+            f"(for example an ID card and a declarations page), top to bottom. {combine}"
+        )
+    return (
+        f"These {image_count} images are captures of the same insurance document "
+        f"(for example an ID card and a declarations page). {combine}"
+    )
+
+
+def _extraction_request(
+    base64_images: list[str],
+    *,
+    source_count: int | None = None,
+    detail: str | None = None,
+    deadline: Deadline | None = None,
+) -> dict:
+    """Chat completion arguments for extracting every field from one document.
+
+    The document may span several images, or one composite of
+    ``source_count`` captures.
+    """
+    content: list[dict] = [
+        {"type": "image_url", "image_url": _image_url(base64_image, detail)}
+        for base64_image in base64_images
+    ]
+    text = _user_text(len(base64_images), source_count or len(base64_images))
+    content.append({"type": "text", "text": text})
+    return dict(
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": EXTRACTION_PROMPT},
+            {"role": "user", "content": content},
+        ],
+        response_format=response_format(InsuranceData),
+        max_tokens=300,
+        **request_timeout(deadline, "extract_insurance"),
+    )
+
+
+def _extract_from_image(
+    backend: ModelBackend,
+    file_path: str | None,
+    base64_image: str,
+    *,
+    detail: str | None = None,
+    deadline: Deadline | None = None,
+) -> InsuranceData:
+    """Extract insurance fields from a single already-encoded image."""
+    return _extract_from_images(
+        backend, [file_path], [base64_image], detail=detail, deadline=deadline
+    )
+
+
+def _extract_from_images(
+    backend: ModelBackend,
+    source_ids: list[str | None],
+    base64_images: list[str],
+    *,
+    detail: str | None = None,
+    deadline: Deadline | None = None,
+) -> InsuranceData:
+    """Extract insurance fields from the encoded images of one document.
+
+    ``source_ids`` names every capture, also when they were composited into
+    one image. With more than one, the result lists them in ``sources``.
+    """
     try:
-        response = client.chat.completions.create(
+        response = backend.complete(
+            **_extraction_request(
+                base64_images,
+                source_count=len(source_ids),
+                detail=detail,
+                deadline=deadline,
+            )
+        )
+        result = json.loads(response_content(response))
+        sources = source_ids if len(source_ids) > 1 else []
+        return InsuranceData(file_path=source_ids[0], sources=sources, **result)
+    except openai.OpenAIError as e:
+        print(f"OpenAI API call failed: {e}", file=sys.stderr)
+        raise
+    except json.JSONDecodeError as e:
+        metrics.increment("parse_failures.extract_insurance")
+        print(f"Failed to parse OpenAI response as JSON: {e}", file=sys.stderr)
+        raise
+    except ValidationError as e:
+        metrics.increment("parse_failures.extract_insurance")
+        print(f"OpenAI response failed Pydantic validation: {e}", file=sys.stderr)
+        raise
+    except RefusalError as e:
+        metrics.increment("refusals.extract_insurance")
+        print(f"OpenAI declined to answer: {e}", file=sys.stderr)
+        raise
+
+
+def _extract_packed(
+    backend: ModelBackend,
+    file_paths: list[str],
+    base64_images: list[str],
+    deadline: Deadline | None = None,
+) -> list[InsuranceData]:
+    """Extract several encoded insurance documents in one request.
+
+    Falls back to one request per image when the packed response is malformed.
+    """
+    try:
+        response = backend.complete(
+            model="gpt-4o-mini",
+            messages=[
+                {
+                    "role": "system",
+                    "content": (
+                        f"{PACKED_EXTRACTION_PROMPT} "
+                        f"{packed_response_instructions(len(file_paths), '<extracted fields>')}"
+                    ),
+                },
+                {
+                    "role": "user",
+                    "content": packed_image_content(
+                        base64_images, "Extract all fields from each insurance document."
+                    ),
+                },
+            ],
+            response_format=packed_response_format(InsuranceData),
+            max_tokens=300 * len(file_paths),
+            **request_timeout(deadline, "extract_insurance"),
+        )
+        items = parse_indexed_results(response_content(response), len(file_paths))
+        return [
+            InsuranceData(file_path=file_path, **item)
+            for file_path, item in zip(file_paths, items)
+        ]
+    except (ValueError, ValidationError) as e:
+        # json.JSONDecodeError is a ValueError subclass
+        metrics.increment("parse_failures.extract_insurance_packed")
+        print(f"Packed extraction response malformed, retrying per item: {e}", file=sys.stderr)
+    return [
+        _extract_from_image(backend, file_path, base64_image, deadline=deadline)
+        for file_path, base64_image in zip(file_paths, base64_images)
+    ]
+
+
+def _extract_insurance(
+    sources: list[DocumentSource],
+    source_ids: list[str | None],
+    cascade: bool,
+    composite: bool,
+    backend: ModelBackend | None,
+    deadline: Deadline | None,
+    quality: QualityThresholds | None,
+) -> InsuranceData:
+    backend = backend or default_backend(OpenAI)
+
+    def render(max_side: int | None) -> list[str]:
+        options = dict(
+            auto_rotate=True,
+            max_side=max_side,
+            quality=quality,
+            **timeout_kwargs(deadline, "extract_insurance"),
+        )
+        if len(sources) == 1:
+            return [file_to_base64_image(sources[0], **options)]
+        if composite:
+            return [composite_base64_image(sources, **options)]
+        return files_to_base64_images(sources, **options)
+
+    if cascade:
+        # Decode once; each tier only downscales and re-encodes.
+        with TieredRenderer(
+            sources,
+            composite=composite and len(sources) > 1,
+            auto_rotate=True,
+            quality=quality,
+            **timeout_kwargs(deadline, "extract_insurance"),
+        ) as renderer:
+
+            def attempt(profile: ImageProfile) -> InsuranceData:
+                return _extract_from_images(
+                    backend,
+                    source_ids,
+                    renderer.encode(profile.max_side),
+                    detail=profile.detail,
+                    deadline=deadline,
+                )
+
+            return run_cascade(
+                attempt,
+                skill="extract_insurance",
+                required_fields=CASCADE_REQUIRED_FIELDS,
+                validate=_plausible,
+                deadline=deadline,
+            )
+
+    return _extract_from_images(backend, source_ids, render(None), deadline=deadline)
+
+
+def extract_insurance(
+    file_path: DocumentSource | list[DocumentSource],
+    *,
+    source_id: str | list[str | None] | None = None,
+    cascade: bool = False,
+    composite: bool = False,
+    backend: ModelBackend | None = None,
+    deadline: Deadline | None = None,
+    quality: QualityThresholds | None = QUALITY_THRESHOLDS,
+) -> InsuranceData:
+    """Extract structured data from an insurance document image.
+
+    file_path is a path, the document's bytes or a binary stream, or a list
+    of captures of one document (e.g. ID card and declarations page), sent
+    as several images in one request or, with composite=True, stacked into
+    one. The result's file_path is source_id (by default the path, or None
+    for in-memory input); sources lists every capture's id.
+
+    With cascade=True, a low-detail image is tried first and full resolution
+    only if CASCADE_REQUIRED_FIELDS come back missing or implausible. Every
+    capture must pass the ``quality`` gate or ImageQualityError is raised;
+    quality=None skips it. A deadline bounds rendering and model calls, which
+    raise DeadlineExceeded when it passes and OperationCancelled when it is
+    cancelled. Concurrent identical calls share one request (see
+    legal_skills.singleflight).
+    """
+    sources, source_ids = load_sources(file_path, source_id)
+    options = (cascade, composite, backend_key(backend), quality)
+    key = request_key("extract_insurance", sources, source_ids, *options)
+    return run_once(
+        "extract_insurance",
+        key,
+        lambda: _extract_insurance(
+            sources, source_ids, cascade, composite, backend, deadline, quality
+        ),
+        deadline=deadline,
+    )
+
+
+async def extract_insurance_async(
+    file_path: DocumentSource | list[DocumentSource],
+    *,
+    source_id: str | list[str | None] | None = None,
+    cascade: bool = False,
+    composite: bool = False,
+    backend: ModelBackend | None = None,
+    deadline: Deadline | None = None,
+    quality: QualityThresholds | None = QUALITY_THRESHOLDS,
+) -> InsuranceData:
+    """Asyncio variant of extract_insurance; runs the call in the default executor."""
+    sources, source_ids = load_sources(file_path, source_id)
+    options = (cascade, composite, backend_key(backend), quality)
+    key = request_key("extract_insurance", sources, source_ids, *options)
+    return await run_once_async(
+        "extract_insurance",
+        key,
+        lambda: _extract_insurance(
+            sources, source_ids, cascade, composite, backend, deadline, quality
+        ),
+        deadline=deadline,
+    )
+
+
+def extract_insurance_stream(
+    file_path: DocumentSource,
+    *,
+    source_id: str | None = None,
+    backend: ModelBackend | None = None,
+    deadline: Deadline | None = None,
+    quality: QualityThresholds | None = QUALITY_THRESHOLDS,
+) -> FieldStream[InsuranceData]:
+    """Extract insurance fields, delivering each one as soon as the model writes it.
+
+    Sends the same request as extract_insurance with streaming. Iterating the returned
+    FieldStream yields (field, value) pairs as each completes; result()
+    returns the validated InsuranceData. Reading stops as soon as the JSON
+    object closes. The image is rendered and quality-checked before this
+    returns. There is no cascade, and concurrent identical calls are not
+    shared.
+    """
+    source_id = source_id or source_name(file_path)
+    base64_image = file_to_base64_image(
+        file_path,
+        auto_rotate=True,
+        quality=quality,
+        **timeout_kwargs(deadline, "extract_insurance"),
+    )
+    backend = backend or default_backend(OpenAI)
+    chunks = stream_completion(backend, **_extraction_request([base64_image], deadline=deadline))
+    return FieldStream(
+        chunks,
+        lambda fields: InsuranceData(file_path=source_id, **fields),
+        skill="extract_insurance",
+    )
+
+
+def extract_insurance_batch(
+    file_paths: list[str],
+    *,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_packed_image_chars: int = DEFAULT_MAX_PACKED_IMAGE_CHARS,
+    backend: ModelBackend | None = None,
+    deadline: Deadline | None = None,
+) -> list[InsuranceData]:
+    """Extract many insurance documents, packing small images into shared requests.
+
+    Images whose encoded size exceeds ``max_packed_image_chars`` are sent on
+    their own. Results are returned in the same order as ``file_paths``. A
+    deadline bounds the whole batch, including per-item fallbacks.
+    """
+    backend = backend or default_backend(OpenAI)
+    encoded = [
+        file_to_base64_image(
+            path, auto_rotate=True, **timeout_kwargs(deadline, "extract_insurance")
+        )
+        for path in file_paths
+    ]
+    results: dict[int, InsuranceData] = {}
+
+    small: list[int] = []
+    for i, image in enumerate(encoded):
+        if len(image) <= max_packed_image_chars:
+            small.append(i)
+        else:
+            results[i] = _extract_from_image(backend, file_paths[i], image, deadline=deadline)
+    for batch in chunked(small, batch_size):
+        paths = [file_paths[i] for i in batch]
+        images = [encoded[i] for i in batch]
+        if len(batch) == 1:
+            extracted = [_extract_from_image(backend, paths[0], images[0], deadline=deadline)]
+        else:
+            extracted = _extract_packed(backend, paths, images, deadline)
+        results.update(zip(batch, extracted))
+
+    return [results[i] for i in range(len(file_paths))]
+
+
+def reextract_insurance_fields(
+    data: InsuranceData,
+    fields: Iterable[str],
+    *,
+    file_path: DocumentSource | list[DocumentSource] | None = None,
+    crop: tuple[float, float, float, float] | None = None,
+    backend: ModelBackend | None = None,
+    deadline: Deadline | None = None,
+) -> InsuranceData:
+    """Re-extract only ``fields`` and return a copy of ``data`` with them merged in.
+
+    Sends a reduced prompt and schema listing just the requested fields, with
+    a proportionally small max_tokens. The document is read from file_path
+    (one source or a list of captures), defaulting to every capture in
+    data.sources, or data.file_path for a single image; file_path is required
+    when data came from bytes, a stream or a source_id (ValueError
+    otherwise). A single document may be cropped to a (left, top, right,
+    bottom) box given as fractions of the page. Null answers leave the
+    existing values untouched.
+    """
+    if file_path is None:
+        sources = recorded_sources(data)
+    else:
+        sources = list(file_path) if isinstance(file_path, (list, tuple)) else [file_path]
+    if crop is not None and len(sources) > 1:
+        raise ValueError("crop applies to a single document; pass one capture as file_path")
+    selected = select_fields(InsuranceData, fields)
+    options = dict(
+        auto_rotate=True, crop=crop, **timeout_kwargs(deadline, "reextract_insurance_fields")
+    )
+    if len(sources) == 1:
+        base64_images = [file_to_base64_image(sources[0], **options)]
+    else:
+        base64_images = files_to_base64_images(sources, **options)
+    backend = backend or default_backend(OpenAI)
+
+    prompt = (
+        "Extract only the following fields from this insurance document image. "
+        "Return JSON with these exact keys: "
+        f"{field_spec(FIELD_DESCRIPTIONS, selected)}. "
+        f"{EXTRACTION_RULES}"
+    )
+    if crop is not None:
+        prompt += " The image shows only a cropped region of the document."
+    request_text = "Extract the requested fields from this insurance document."
+    if len(sources) > 1:
+        request_text += " Each image is a capture of it; combine what they show."
+
+    try:
+        response = backend.complete(
             model="gpt-4o-mini",
             messages=[
-                {"role": "system", "content": EXTRACTION_PROMPT},
+                {"role": "system", "content": prompt},
                 {
                     "role": "user",
                     "content": [
-                        {
-                            "type": "image_url",
-                            "image_url": {"url": f"data:image/png;base64,{base64_image}"},
-                        },
-                        {"type": "text", "text": "Extract all fields from this insurance document."},
+                        *(
+                            {"type": "image_url", "image_url": _image_url(base64_image, None)}
+                            for base64_image in base64_images
+                        ),
+                        {"type": "text", "text": request_text},
                     ],
                 },
             ],
-            response_format={"type": "json_object"},
-            max_tokens=300,
+            response_format=field_response_format(InsuranceData, selected),
+            max_tokens=max_tokens_for(selected),
+            **request_timeout(deadline, "reextract_insurance_fields"),
         )
-        result = json.loads(response.choices[0].message.content)
-        return InsuranceData(file_path=file_path, **result)
+        result = json.loads(response_content(response))
+        return merge_fields(data, {name: result.get(name) for name in selected})
     except openai.OpenAIError as e:
         print(f"OpenAI API call failed: {e}", file=sys.stderr)
         raise
     except json.JSONDecodeError as e:
+        metrics.increment("parse_failures.reextract_insurance_fields")
         print(f"Failed to parse OpenAI response as JSON: {e}", file=sys.stderr)
         raise
     except ValidationError as e:
+        metrics.increment("parse_failures.reextract_insurance_fields")
         print(f"OpenAI response failed Pydantic validation: {e}", file=sys.stderr)
         raise
+    except RefusalError as e:
+        metrics.increment("refusals.reextract_insurance_fields")
+        print(f"OpenAI declined to answer: {e}", file=sys.stderr)
+        raise
 
 
 if __name__ == "__main__":
@@ -0,0 +1,220 @@
+"""Content-addressed on-disk cache of preprocessed image payloads.
+
+``file_to_base64_image`` renders, orients, resizes and PNG-encodes every
+document on every run, although the pixels only change when the file or the
+preprocessing options do. With a cache enabled, the encoded payload is stored
+under a key made of the file's SHA-256, the preprocessing options and
+``PREPROCESS_VERSION``, so re-runs after a prompt or model change skip
+rendering and encoding entirely. Model responses are not cached here.
+
+Entries are plain files (``<dir>/<k[:2]>/<k>.b64``), written atomically and
+read whole. When the total size exceeds ``max_bytes``, the least recently
+used entries are deleted. Several processes may share a directory: writes
+take an exclusive lock on ``<dir>/.lock`` and keep the running total in
+``<dir>/.total``, so the budget holds across all of them. Writes are
+best-effort: a full disk or an unwritable directory costs a re-render next
+time, never the call that produced the payload.
+
+Enable it for all skills with:
+
+    LEGAL_SKILLS_ARTIFACT_CACHE_DIR=/var/cache/legal-skills
+    LEGAL_SKILLS_ARTIFACT_CACHE_MAX_BYTES=2147483648  # optional, default 2 GiB
+
+Counters in ``legal_skills.metrics``: ``artifact_cache.hits``,
+``artifact_cache.misses``, ``artifact_cache.evictions`` and
+``artifact_cache.write_errors``.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+
+from legal_skills import metrics
+
+# Bump whenever preprocessing changes what a given file and set of options
+# produce, so stale entries stop matching.
+# 2: JPEGs decoded in draft mode to max_decode_side.
+PREPROCESS_VERSION = 2
+
+DEFAULT_MAX_BYTES = 2 * 1024**3
+
+# Eviction deletes down to this fraction of max_bytes, so it runs rarely.
+_EVICT_TO = 0.9
+
+
+@lru_cache(maxsize=1024)
+def _file_digest(path: str, version: tuple[int, int, int, int]) -> bytes:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").digest()
+
+
+def content_digest(source: str | os.PathLike[str] | bytes | memoryview) -> bytes:
+    """SHA-256 of a document's content, a file path or its bytes.
+
+    A file's digest is remembered until its size, mtime or inode changes, so
+    the request key and the artifact key of one call hash it only once.
+    """
+    if isinstance(source, (bytes, memoryview)):
+        return hashlib.sha256(source).digest()
+    stat = os.stat(source)
+    version = (stat.st_ino, stat.st_size, stat.st_mtime_ns, stat.st_ctime_ns)
+    return _file_digest(os.path.abspath(source), version)
+
+
+def artifact_key(source: str | Path | bytes | memoryview, params: Mapping[str, Any]) -> str:
+    """Key for the payload of ``source`` preprocessed with ``params``.
+
+    ``source`` is a file path or the document's bytes; both give the same key
+    for the same content.
+    """
+    digest = hashlib.sha256(content_digest(source))
+    options = json.dumps(
+        [PREPROCESS_VERSION, dict(params)], sort_keys=True, separators=(",", ":")
+    )
+    digest.update(options.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ArtifactCache:
+    """A size-bounded directory of encoded payloads keyed by ``artifact_key``."""
+
+    def __init__(self, directory: str | Path, *, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.b64"
+
+    def _entries(self) -> list[Path]:
+        return list(self.directory.glob("*/*.b64"))
+
+    def get(self, key: str) -> str | None:
+        """Return the cached payload for ``key``, or None on a miss."""
+        path = self._path(key)
+        try:
+            payload = path.read_text("ascii")
+            os.utime(path)  # mark as recently used for eviction
+        except (OSError, UnicodeDecodeError):
+            payload = ""  # missing, just evicted, or unreadable
+        if not payload:
+            metrics.increment("artifact_cache.misses")
+            return None
+        metrics.increment("artifact_cache.hits")
+        return payload
+
+    def put(self, key: str, payload: str) -> None:
+        """Store ``payload`` under ``key`` atomically, then evict if over budget.
+
+        Write errors are reported on stderr and counted, not raised.
+        """
+        path = self._path(key)
+        data = payload.encode("ascii")
+        try:
+            with self._locked():
+                replaced = self._write(path, data)
+                total = self._read_total()
+                total = self.size_bytes() if total is None else total + len(data) - replaced
+                if total > self.max_bytes:
+                    total = self._evict()
+                self._write_total(total)
+        except OSError as e:
+            metrics.increment("artifact_cache.write_errors")
+            print(f"Artifact cache write failed for {path}: {e}", file=sys.stderr)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Hold the directory's exclusive lock, shared by every process and thread."""
+        with open(self.directory / ".lock", "ab") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield  # closing the file releases the lock
+
+    def _read_total(self) -> int | None:
+        """The total recorded in .total, or None if it is missing or unreadable. Holds the lock."""
+        try:
+            return int((self.directory / ".total").read_text("ascii"))
+        except (OSError, ValueError):
+            return None
+
+    def _write_total(self, total: int) -> None:
+        (self.directory / ".total").write_text(str(total), "ascii")
+
+    @staticmethod
+    def _write(path: Path, data: bytes) -> int:
+        """Atomically write ``data`` to ``path``; return the size of the entry it replaced."""
+        path.parent.mkdir(exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            try:
+                replaced = path.stat().st_size
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return replaced
+
+    def _evict(self) -> int:
+        """Delete least recently used entries down to _EVICT_TO of max_bytes; return the total.
+
+        Rescans the directory, so the total also corrects for entries that were
+        removed by hand or lost to a crash between a write and its update.
+        Holds the lock.
+        """
+        entries = []
+        for path in self._entries():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * _EVICT_TO
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+            metrics.increment("artifact_cache.evictions")
+        return total
+
+    def size_bytes(self) -> int:
+        """Total size of all entries on disk."""
+        total = 0
+        for path in self._entries():
+            try:
+                total += path.stat().st_size
+            except FileNotFoundError:
+                pass
+        return total
+
+
+@lru_cache(maxsize=None)
+def _cache_for(directory: str, max_bytes: int) -> ArtifactCache:
+    return ArtifactCache(directory, max_bytes=max_bytes)
+
+
+def default_artifact_cache() -> ArtifactCache | None:
+    """The cache configured by LEGAL_SKILLS_ARTIFACT_CACHE_DIR, or None when unset."""
+    directory = os.environ.get("LEGAL_SKILLS_ARTIFACT_CACHE_DIR")
+    if not directory:
+        return None
+    max_bytes = int(os.environ.get("LEGAL_SKILLS_ARTIFACT_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+    return _cache_for(directory, max_bytes)
@@ -0,0 +1,313 @@
+"""Pluggable model backends for the skills' chat completion calls.
+
+Every skill sends its request through a ``ModelBackend``. The default wraps the
+OpenAI client. ``RecordingBackend`` saves a fingerprint of each request with
+its response to a JSONL cassette, and ``ReplayBackend`` serves those responses
+back offline, with zero or the recorded latency.
+
+Backends may also implement ``stream``, yielding the response content in
+chunks as it is generated; ``stream_completion`` falls back to a single chunk
+from ``complete`` for backends that do not.
+
+A request may carry a ``timeout`` (seconds) derived from the caller's
+deadline. It bounds the whole call, retries included, and is not part of the
+request fingerprint, so recordings replay regardless of the budget they were
+made under.
+
+Skills pick their backend from the environment when none is passed:
+
+    LEGAL_SKILLS_BACKEND=record LEGAL_SKILLS_CASSETTE=run.jsonl  # live + record
+    LEGAL_SKILLS_BACKEND=replay LEGAL_SKILLS_CASSETTE=run.jsonl  # offline
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections.abc import Callable, Hashable, Iterator
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Literal, Protocol
+
+import openai
+from openai import OpenAI
+from openai.types.chat import ChatCompletion
+
+from legal_skills.deadline import DeadlineExceeded
+from legal_skills.schemas import RefusalError, response_content
+from legal_skills.streaming import ObjectStreamParser
+
+# Request options that shape how a request is sent, not what it asks for.
+TRANSPORT_OPTIONS = frozenset({"timeout"})
+
+_RETRYABLE_ERRORS = (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+
+
+class ModelBackend(Protocol):
+    """Anything that can answer a chat completion request."""
+
+    def complete(self, **request: Any) -> ChatCompletion:
+        """Send ``request`` (chat.completions.create keyword arguments) and return the response."""
+        ...
+
+
+def stream_completion(backend: ModelBackend, **request: Any) -> Iterator[str]:
+    """Yield the response content for ``request`` in chunks as it is generated.
+
+    Uses the backend's ``stream`` method when it has one; otherwise the whole
+    content of ``complete`` arrives as one chunk.
+    """
+    stream = getattr(backend, "stream", None)
+    if stream is not None:
+        yield from stream(**request)
+        return
+    yield response_content(backend.complete(**request))
+
+
+def _text_completion(model: str | None, content: str) -> ChatCompletion:
+    """A completion carrying ``content``, for recording streamed responses."""
+    return ChatCompletion.model_validate(
+        {
+            "id": "chatcmpl-stream",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model or "",
+            "choices": [
+                {
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": content},
+                }
+            ],
+        }
+    )
+
+
+def _is_complete_object(text: str) -> bool:
+    """Whether ``text`` holds a whole JSON object, as read by a closed FieldStream."""
+    parser = ObjectStreamParser()
+    try:
+        parser.feed(text)
+    except json.JSONDecodeError:
+        return False
+    return parser.done
+
+
+def backend_key(backend: ModelBackend | None) -> Hashable:
+    """A stable identity for ``backend``: its ``key`` attribute, or else its class.
+
+    Request keys (see legal_skills.singleflight) use this rather than the
+    backend object, so that separate wrappers of one backend share calls.
+    """
+    if backend is None:
+        return None
+    key = getattr(backend, "key", None)
+    if key is not None:
+        return key
+    return f"{type(backend).__module__}.{type(backend).__qualname__}"
+
+
+class CassetteMissError(KeyError):
+    """Raised by ReplayBackend when a request was never recorded."""
+
+
+class OpenAIBackend:
+    """Send requests to the OpenAI API through a client.
+
+    Without a ``timeout`` the client's own timeout and retries apply. With
+    one, retries happen here instead, each attempt capped to the time left,
+    and DeadlineExceeded is raised once the budget is spent.
+    """
+
+    def __init__(self, client: OpenAI) -> None:
+        self._client = client
+        self.key = ("openai", str(client.base_url))
+
+    def complete(self, **request: Any) -> ChatCompletion:
+        budget = request.pop("timeout", None)
+        if budget is None:
+            return self._client.chat.completions.create(**request)
+        return self._complete_within(budget, request)
+
+    def _complete_within(self, budget: float, request: dict[str, Any]) -> ChatCompletion:
+        end = time.monotonic() + budget
+        client = self._client.with_options(max_retries=0)
+        attempt = 0
+        while True:
+            try:
+                return client.chat.completions.create(
+                    timeout=max(0.0, end - time.monotonic()), **request
+                )
+            except openai.APITimeoutError as e:
+                raise DeadlineExceeded(f"Model call exceeded its {budget:.2f}s budget") from e
+            except _RETRYABLE_ERRORS as e:
+                if attempt >= self._client.max_retries:
+                    raise
+                delay = min(0.5 * 2**attempt, 8.0)
+                if end - time.monotonic() <= delay:
+                    raise DeadlineExceeded(
+                        f"Model call failed and its {budget:.2f}s budget leaves no time to retry"
+                    ) from e
+                time.sleep(delay)
+                attempt += 1
+
+    def stream(self, **request: Any) -> Iterator[str]:
+        """Yield the response content as it is generated.
+
+        With a ``timeout``, the client does not retry, and DeadlineExceeded is
+        raised if the budget runs out between chunks. Without one, the
+        client's own timeout errors propagate unchanged.
+        """
+        budget = request.pop("timeout", None)
+        client = self._client
+        if budget is not None:
+            end = time.monotonic() + budget
+            client = client.with_options(max_retries=0)
+            request["timeout"] = budget
+        try:
+            response = client.chat.completions.create(stream=True, **request)
+        except openai.APITimeoutError as e:
+            if budget is None:
+                raise
+            raise DeadlineExceeded(f"Model call exceeded its {budget:.2f}s budget") from e
+        try:
+            for chunk in response:
+                if budget is not None and time.monotonic() > end:
+                    raise DeadlineExceeded(f"Model call exceeded its {budget:.2f}s budget")
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                refusal = getattr(delta, "refusal", None)
+                if isinstance(refusal, str) and refusal:
+                    raise RefusalError(f"Model refused: {refusal}")
+                if delta.content:
+                    yield delta.content
+        except openai.APITimeoutError as e:
+            if budget is None:
+                raise
+            raise DeadlineExceeded(f"Model call exceeded its {budget:.2f}s budget") from e
+        finally:
+            response.close()
+
+
+def request_fingerprint(request: dict[str, Any]) -> str:
+    """Return a stable SHA-256 hex digest of a request's keyword arguments.
+
+    Transport options such as ``timeout`` are ignored.
+    """
+    request = {key: value for key, value in request.items() if key not in TRANSPORT_OPTIONS}
+    canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class RecordingBackend:
+    """Forward requests to another backend and append each exchange to a cassette."""
+
+    def __init__(self, inner: ModelBackend, cassette_path: str | Path) -> None:
+        self._inner = inner
+        self._path = Path(cassette_path)
+        self._lock = threading.Lock()
+        self.key = ("record", str(self._path.resolve()), backend_key(inner))
+
+    def complete(self, **request: Any) -> ChatCompletion:
+        start = time.monotonic()
+        response = self._inner.complete(**request)
+        self._record(request, response, time.monotonic() - start)
+        return response
+
+    def stream(self, **request: Any) -> Iterator[str]:
+        """Stream from the inner backend and record the content that was read.
+
+        The exchange is recorded when the stream ends, or when the consumer
+        closes it after a complete JSON object, and replays as an ordinary
+        completion. A stream abandoned part way is not recorded, so replay
+        never serves a truncated response.
+        """
+        start = time.monotonic()
+        parts: list[str] = []
+        chunks = stream_completion(self._inner, **request)
+        try:
+            for chunk in chunks:
+                parts.append(chunk)
+                yield chunk
+        except GeneratorExit:
+            chunks.close()
+            if not _is_complete_object("".join(parts)):
+                return
+        response = _text_completion(request.get("model"), "".join(parts))
+        self._record(request, response, time.monotonic() - start)
+
+    def _record(self, request: dict[str, Any], response: ChatCompletion, latency: float) -> None:
+        entry = {
+            "fingerprint": request_fingerprint(request),
+            "model": request.get("model"),
+            "latency": latency,
+            "response": response.model_dump(mode="json", exclude_unset=True),
+        }
+        line = json.dumps(entry, separators=(",", ":"))
+        with self._lock, self._path.open("a", encoding="utf-8") as cassette:
+            cassette.write(line + "\n")
+
+
+class ReplayBackend:
+    """Serve recorded responses by request fingerprint, without network access.
+
+    When a fingerprint was recorded more than once, the most recent entry wins.
+    """
+
+    def __init__(
+        self, cassette_path: str | Path, *, latency: Literal["zero", "recorded"] = "zero"
+    ) -> None:
+        self._latency = latency
+        self._entries: dict[str, dict[str, Any]] = {}
+        self.key = ("replay", str(Path(cassette_path).resolve()), latency)
+        with Path(cassette_path).open(encoding="utf-8") as cassette:
+            for line in cassette:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries[entry["fingerprint"]] = entry
+
+    def complete(self, **request: Any) -> ChatCompletion:
+        fingerprint = request_fingerprint(request)
+        try:
+            entry = self._entries[fingerprint]
+        except KeyError:
+            raise CassetteMissError(f"No recorded response for request {fingerprint}") from None
+        if self._latency == "recorded":
+            budget = request.get("timeout")
+            if budget is not None and entry["latency"] > budget:
+                time.sleep(budget)
+                raise DeadlineExceeded(
+                    f"Recorded latency {entry['latency']:.2f}s exceeds the {budget:.2f}s budget"
+                )
+            time.sleep(entry["latency"])
+        return ChatCompletion.model_validate(entry["response"])
+
+
+@lru_cache(maxsize=None)
+def _replay_backend(cassette_path: str, latency: str) -> ReplayBackend:
+    """Load each cassette once per process."""
+    return ReplayBackend(cassette_path, latency=latency)  # type: ignore[arg-type]
+
+
+def default_backend(client_factory: Callable[[], OpenAI] = OpenAI) -> ModelBackend:
+    """Build the backend selected by LEGAL_SKILLS_BACKEND (live, record or replay).
+
+    ``client_factory`` is only called when the backend needs a live client.
+    Replay honours LEGAL_SKILLS_REPLAY_LATENCY ("zero" or "recorded").
+    """
+    mode = os.environ.get("LEGAL_SKILLS_BACKEND", "live")
+    if mode == "live":
+        return OpenAIBackend(client_factory())
+
+    cassette = os.environ.get("LEGAL_SKILLS_CASSETTE")
+    if not cassette:
+        raise ValueError(f"LEGAL_SKILLS_BACKEND={mode} requires LEGAL_SKILLS_CASSETTE")
+    if mode == "record":
+        return RecordingBackend(OpenAIBackend(client_factory()), cassette)
+    if mode == "replay":
+        return _replay_backend(cassette, os.environ.get("LEGAL_SKILLS_REPLAY_LATENCY", "zero"))
+    raise ValueError(f"Unknown LEGAL_SKILLS_BACKEND: {mode}")
@@ -0,0 +1,120 @@
+"""Cost-tiered extraction cascade.
+
+Most clean scans extract completely from a small, low-detail image. The
+cascade tries the cheapest image profile first and escalates to a more
+expensive one only when required fields come back empty, a ``validate``
+check rejects the values as implausible, or the response fails to parse or
+validate. Each run records the tier it stopped at in
+``legal_skills.metrics`` under ``cascade.<skill>.stopped.<tier>``.
+
+With a deadline, the cascade does not escalate past a usable (if incomplete)
+result when too little time is left for another model call.
+"""
+
+from __future__ import annotations
+
+import sys
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from datetime import date
+from typing import Literal, TypeVar
+
+from pydantic import BaseModel
+
+from legal_skills import metrics
+from legal_skills.deadline import MIN_MODEL_CALL_SECONDS, Deadline
+
+M = TypeVar("M", bound=BaseModel)
+
+
+@dataclass(frozen=True)
+class ImageProfile:
+    """How to render and send the image for one cascade tier."""
+
+    name: str
+    max_side: int | None
+    detail: Literal["low", "high", "auto"]
+
+
+# detail="low" makes the API look at a 512px rendition, so larger is wasted upload.
+LOW_DETAIL = ImageProfile(name="low", max_side=512, detail="low")
+HIGH_DETAIL = ImageProfile(name="high", max_side=None, detail="high")
+DEFAULT_TIERS: tuple[ImageProfile, ...] = (LOW_DETAIL, HIGH_DETAIL)
+
+
+def missing_fields(data: BaseModel, required: Iterable[str]) -> list[str]:
+    """Return the required fields that are None or blank in ``data``."""
+    missing = []
+    for name in required:
+        value = getattr(data, name)
+        if value is None or (isinstance(value, str) and not value.strip()):
+            missing.append(name)
+    return missing
+
+
+def is_iso_date(value: str | None) -> bool:
+    """True for a real YYYY-MM-DD calendar date, as the extraction prompts request."""
+    if value is None or len(value) != 10:
+        return False
+    try:
+        date.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+
+def is_identifier(value: str | None, *, min_chars: int = 4) -> bool:
+    """True when ``value`` has at least ``min_chars`` letters or digits (not "N/A" or "?")."""
+    return value is not None and sum(c.isalnum() for c in value) >= min_chars
+
+
+def run_cascade(
+    attempt: Callable[[ImageProfile], M],
+    *,
+    skill: str,
+    required_fields: Iterable[str],
+    tiers: tuple[ImageProfile, ...] = DEFAULT_TIERS,
+    validate: Callable[[M], bool] | None = None,
+    deadline: Deadline | None = None,
+) -> M:
+    """Call ``attempt`` with each tier until one returns a complete result.
+
+    A result is complete when none of ``required_fields`` is missing and
+    ``validate`` (if given) returns True. The last tier's result is returned
+    as-is, and its parse or validation errors propagate. An incomplete result
+    is also returned when ``deadline`` leaves no time to escalate.
+    """
+    required = tuple(required_fields)
+    for position, tier in enumerate(tiers):
+        is_last = position == len(tiers) - 1
+        try:
+            result = attempt(tier)
+        except ValueError as e:
+            # json.JSONDecodeError and pydantic.ValidationError are ValueErrors
+            if is_last:
+                raise
+            print(f"{skill}: tier '{tier.name}' failed, escalating: {e}", file=sys.stderr)
+            continue
+        if is_last:
+            break
+        missing = missing_fields(result, required)
+        if not missing and (validate is None or validate(result)):
+            break
+        problem = f"incomplete {missing}" if missing else "implausible"
+        if deadline is not None and deadline.remaining() <= MIN_MODEL_CALL_SECONDS:
+            metrics.increment(f"cascade.{skill}.deadline")
+            print(
+                f"{skill}: tier '{tier.name}' {problem}, no time to escalate", file=sys.stderr
+            )
+            break
+        print(f"{skill}: tier '{tier.name}' {problem}, escalating", file=sys.stderr)
+    metrics.increment(f"cascade.{skill}.stopped.{tier.name}")
+    return result
+
+
+def tier_fractions(skill: str) -> dict[str, float]:
+    """Return the fraction of cascade runs for ``skill`` that stopped at each tier."""
+    prefix = f"cascade.{skill}.stopped."
+    counts = {name[len(prefix):]: value for name, value in metrics.snapshot(prefix).items()}
+    total = sum(counts.values())
+    return {tier: count / total for tier, count in counts.items()} if total else {}
@@ -0,0 +1,112 @@
+"""Coordinator for a shared job queue: enqueue work and aggregate results.
+
+Workers (``legal_skills.worker``) on any number of hosts execute the tasks;
+the coordinator only reads and writes the queue file, so it can run anywhere
+the file is reachable.
+
+Usage:
+    python -m legal_skills.coordinator <queue.db> enqueue <kind> <file> [<file> ...]
+    python -m legal_skills.coordinator <queue.db> status
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import TypeVar
+
+from pydantic import BaseModel
+
+from legal_skills.jobqueue import JobQueue
+
+M = TypeVar("M", bound=BaseModel)
+
+
+@dataclass(frozen=True)
+class WorkerStats:
+    """Completed-task throughput of one worker process (all of its threads)."""
+
+    worker_id: str
+    completed: int
+    busy_seconds: float
+    tasks_per_second: float
+
+
+@dataclass(frozen=True)
+class QueueSummary:
+    """Task counts by status plus per-worker throughput."""
+
+    counts: dict[str, int]
+    workers: list[WorkerStats]
+
+    @property
+    def total_tasks_per_second(self) -> float:
+        return sum(worker.tasks_per_second for worker in self.workers)
+
+
+def enqueue_files(queue: JobQueue, kind: str, file_paths: Iterable[str]) -> list[str]:
+    """Enqueue one ``kind`` task per file; already-enqueued files are skipped."""
+    return [queue.enqueue(kind, {"file_path": str(path)}) for path in file_paths]
+
+
+def collect_results(queue: JobQueue, kind: str, model: type[M]) -> list[M]:
+    """Return the completed results of ``kind`` tasks parsed as ``model``."""
+    return [model.model_validate(task.result) for task in queue.tasks(status="done", kind=kind)]
+
+
+def summarize(queue: JobQueue) -> QueueSummary:
+    """Aggregate task counts and per-worker throughput from completed tasks.
+
+    A worker's throughput is its completed tasks divided by the wall-clock
+    span from its first claim to its last completion. Thread ids of the form
+    ``host:pid/N`` are grouped under ``host:pid``.
+    """
+    spans: dict[str, list[tuple[float, float]]] = defaultdict(list)
+    for task in queue.tasks(status="done"):
+        if task.lease_owner and task.started_at is not None and task.finished_at is not None:
+            worker_id = task.lease_owner.split("/", 1)[0]
+            spans[worker_id].append((task.started_at, task.finished_at))
+
+    workers = []
+    for worker_id, intervals in sorted(spans.items()):
+        wall = max(end for _, end in intervals) - min(start for start, _ in intervals)
+        workers.append(
+            WorkerStats(
+                worker_id=worker_id,
+                completed=len(intervals),
+                busy_seconds=sum(end - start for start, end in intervals),
+                tasks_per_second=len(intervals) / wall if wall > 0 else 0.0,
+            )
+        )
+    return QueueSummary(counts=queue.counts(), workers=workers)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Enqueue skill tasks and report progress.")
+    parser.add_argument("queue", help="Path to the SQLite queue file")
+    parser.add_argument("--shared", action="store_true", help="Queue file is on a network volume")
+    commands = parser.add_subparsers(dest="command", required=True)
+    enqueue = commands.add_parser("enqueue", help="Enqueue one task per file")
+    enqueue.add_argument("kind", choices=["classify", "extract_dl", "extract_insurance"])
+    enqueue.add_argument("files", nargs="+", type=Path)
+    commands.add_parser("status", help="Print task counts and worker throughput as JSON")
+    args = parser.parse_args(argv)
+
+    with JobQueue(args.queue, journal_mode="DELETE" if args.shared else "WAL") as queue:
+        if args.command == "enqueue":
+            task_ids = enqueue_files(queue, args.kind, (str(p.resolve()) for p in args.files))
+            print(f"Enqueued {len(task_ids)} {args.kind} tasks", file=sys.stderr)
+        else:
+            summary = summarize(queue)
+            report = {"counts": summary.counts, "workers": [asdict(w) for w in summary.workers]}
+            print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
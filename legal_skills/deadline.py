@@ -0,0 +1,105 @@
+"""Deadlines and cooperative cancellation for skill calls.
+
+A ``Deadline`` is created once per request (``Deadline.after(5.0)``) and
+passed to every skill the request runs. Each skill checks it before
+rendering and before every model call, including cascade escalations and
+per-item fallbacks, and passes the remaining time down as the PDF rendering
+timeout and the model request timeout. When too little time is left for the
+next step, the skill raises ``DeadlineExceeded`` instead of starting it.
+
+``Deadline.cancel()`` cancels cooperatively: work already sent is not
+interrupted, but the next check raises ``OperationCancelled``. A deadline
+without a time limit (``Deadline()``) is a plain cancellation token.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from typing import Any
+
+# Below this much remaining time a model call is not started; it would almost
+# certainly time out after the image upload had already been paid for.
+MIN_MODEL_CALL_SECONDS = 2.0
+
+
+class OperationCancelled(Exception):
+    """Raised when a skill call is cancelled through its deadline."""
+
+
+class DeadlineExceeded(OperationCancelled, TimeoutError):
+    """Raised when a skill call's deadline passes or is too close to finish the next step."""
+
+
+class Deadline:
+    """A point in (monotonic) time by which work must finish, plus a cancel flag.
+
+    ``child()`` derives a deadline that expires no later than its parent and
+    is cancelled with it, but can also be cancelled on its own.
+    """
+
+    def __init__(self, at: float | None = None, *, parent: Deadline | None = None) -> None:
+        if parent is not None and parent.at is not None:
+            at = parent.at if at is None else min(at, parent.at)
+        self.at = at
+        self._parent = parent
+        self._cancelled = threading.Event()
+
+    @classmethod
+    def after(cls, seconds: float) -> Deadline:
+        """A deadline ``seconds`` from now."""
+        return cls(time.monotonic() + seconds)
+
+    def child(self, seconds: float | None = None) -> Deadline:
+        """A deadline within this one, optionally shortened to ``seconds`` from now."""
+        at = None if seconds is None else time.monotonic() + seconds
+        return Deadline(at, parent=self)
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set() or (self._parent is not None and self._parent.cancelled)
+
+    def remaining(self) -> float:
+        """Seconds left; ``math.inf`` without a time limit."""
+        if self.at is None:
+            return math.inf
+        return max(0.0, self.at - time.monotonic())
+
+    def timeout(self) -> float | None:
+        """Seconds left as a timeout argument: None without a time limit."""
+        return None if self.at is None else self.remaining()
+
+    def check(self, operation: str, *, needed: float = 0.0) -> float:
+        """Raise unless the deadline allows ``needed`` more seconds; return the time left."""
+        if self.cancelled:
+            raise OperationCancelled(f"{operation}: cancelled")
+        remaining = self.remaining()
+        if remaining <= needed:
+            raise DeadlineExceeded(
+                f"{operation}: {remaining:.2f}s left, need more than {needed:.2f}s"
+            )
+        return remaining
+
+
+def timeout_kwargs(
+    deadline: Deadline | None, operation: str, *, needed: float = 0.0
+) -> dict[str, Any]:
+    """Check ``deadline`` and return ``{"timeout": seconds left}`` for a blocking call.
+
+    Returns ``{}`` without a deadline or time limit, so calls made without one
+    are unchanged.
+    """
+    if deadline is None:
+        return {}
+    deadline.check(operation, needed=needed)
+    timeout = deadline.timeout()
+    return {} if timeout is None else {"timeout": timeout}
+
+
+def request_timeout(deadline: Deadline | None, operation: str) -> dict[str, Any]:
+    """``timeout_kwargs`` for a model request, which needs MIN_MODEL_CALL_SECONDS."""
+    return timeout_kwargs(deadline, operation, needed=MIN_MODEL_CALL_SECONDS)
@@ -0,0 +1,214 @@
+"""Columnar export of skill results to CSV or Parquet.
+
+Columns are derived from the Pydantic models in ``legal_skills.models``.
+List fields such as ``sources`` are joined with ``;`` into one string column.
+``ValidationReport.discrepancies`` is flattened into a count, a list of field
+names, and one ``<field>_dl_value`` / ``<field>_insurance_value`` column pair
+per compared field, so each report is exactly one row.
+
+Rows are buffered and written in row groups of ``row_group_size``, so memory
+stays flat regardless of how many records are exported. Writing to an existing
+dataset appends: CSV files gain rows, and Parquet datasets (directories) gain a
+new part file.
+
+Parquet output requires the optional ``pyarrow`` package.
+"""
+
+from __future__ import annotations
+
+import csv
+import types
+import typing
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any, Literal
+
+from pydantic import BaseModel
+
+from legal_skills.models import FieldDiscrepancy, ValidationReport
+
+DEFAULT_ROW_GROUP_SIZE = 10_000
+
+# Fields compared by doc-validator; each gets its own flattened column pair.
+DISCREPANCY_FIELDS = ("name", "date_of_birth", "address")
+
+_DISCREPANCY_VALUE_FIELDS = [name for name in FieldDiscrepancy.model_fields if name != "field_name"]
+
+
+def _flattened_discrepancy_columns() -> list[tuple[str, Any]]:
+    columns: list[tuple[str, Any]] = [("discrepancy_count", int), ("discrepancy_fields", str)]
+    for field in DISCREPANCY_FIELDS:
+        columns.extend((f"{field}_{value}", str | None) for value in _DISCREPANCY_VALUE_FIELDS)
+    return columns
+
+
+def columns_for(model: type[BaseModel]) -> list[tuple[str, Any]]:
+    """Return ``(column name, annotation)`` pairs for exporting ``model``."""
+    columns: list[tuple[str, Any]] = []
+    for name, field in model.model_fields.items():
+        if model is ValidationReport and name == "discrepancies":
+            columns.extend(_flattened_discrepancy_columns())
+        elif typing.get_origin(field.annotation) is list:
+            columns.append((name, str))
+        else:
+            columns.append((name, field.annotation))
+    return columns
+
+
+def to_row(record: BaseModel) -> dict[str, Any]:
+    """Flatten one record into a ``{column: value}`` row."""
+    row = record.model_dump(exclude={"discrepancies"})
+    for name, value in row.items():
+        if isinstance(value, list):
+            row[name] = ";".join("" if item is None else str(item) for item in value)
+    if isinstance(record, ValidationReport):
+        row["discrepancy_count"] = len(record.discrepancies)
+        row["discrepancy_fields"] = ";".join(d.field_name for d in record.discrepancies)
+        by_field = {d.field_name: d for d in record.discrepancies}
+        for field in DISCREPANCY_FIELDS:
+            discrepancy = by_field.get(field)
+            for value in _DISCREPANCY_VALUE_FIELDS:
+                row[f"{field}_{value}"] = getattr(discrepancy, value) if discrepancy else None
+    return row
+
+
+def _arrow_type(annotation: Any) -> Any:
+    """Map a model annotation (str, float, bool, Literal, X | None) to a pyarrow type."""
+    import pyarrow as pa
+
+    origin = typing.get_origin(annotation)
+    if origin in (typing.Union, types.UnionType):
+        (annotation,) = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        return _arrow_type(annotation)
+    if origin is Literal:
+        return pa.string()
+    mapping = {str: pa.string(), float: pa.float64(), int: pa.int64(), bool: pa.bool_()}
+    try:
+        return mapping[annotation]
+    except KeyError:
+        raise TypeError(f"No columnar type for annotation {annotation!r}") from None
+
+
+class ColumnarWriter:
+    """Incrementally write records of one model to a CSV file or Parquet dataset.
+
+    Use as a context manager so the final partial row group is flushed.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        model: type[BaseModel],
+        *,
+        format: Literal["csv", "parquet"] = "csv",
+        row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+    ) -> None:
+        self.path = Path(path)
+        self.model = model
+        self.format = format
+        self.row_group_size = row_group_size
+        self.columns = columns_for(model)
+        self.rows_written = 0
+        self._buffer: list[dict[str, Any]] = []
+        self._sink: Any = None
+        self._csv_file: Any = None
+
+        if format == "csv":
+            self._open_csv()
+        elif format == "parquet":
+            self._open_parquet()
+        else:
+            raise ValueError(f"Unsupported export format: {format}")
+
+    def _open_csv(self) -> None:
+        names = [name for name, _ in self.columns]
+        exists = self.path.exists() and self.path.stat().st_size > 0
+        if exists:
+            with self.path.open(newline="", encoding="utf-8") as existing:
+                header = next(csv.reader(existing), [])
+            if header != names:
+                raise ValueError(f"{self.path} has columns {header}, expected {names}")
+        self._csv_file = self.path.open("a", newline="", encoding="utf-8")
+        self._sink = csv.DictWriter(self._csv_file, fieldnames=names)
+        if not exists:
+            self._sink.writeheader()
+
+    def _open_parquet(self) -> None:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet export requires pyarrow: pip install pyarrow") from None
+
+        self._schema = pa.schema(
+            [pa.field(name, _arrow_type(annotation)) for name, annotation in self.columns]
+        )
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._sink = pq.ParquetWriter(self._reserve_part(), self._schema)
+
+    def _reserve_part(self) -> Path:
+        """Create the next free ``part-NNNNN.parquet`` exclusively, so no writer reuses it."""
+        parts = self.path.glob("part-*.parquet")
+        indexes = [int(part.stem[5:]) for part in parts if part.stem[5:].isdigit()]
+        index = max(indexes, default=-1) + 1
+        while True:
+            part = self.path / f"part-{index:05d}.parquet"
+            try:
+                part.open("xb").close()
+            except FileExistsError:  # taken by a concurrent writer
+                index += 1
+                continue
+            return part
+
+    def write(self, record: BaseModel) -> None:
+        """Buffer one record, flushing a row group when the buffer is full."""
+        if not isinstance(record, self.model):
+            raise TypeError(f"Expected {self.model.__name__}, got {type(record).__name__}")
+        self._buffer.append(to_row(record))
+        if len(self._buffer) >= self.row_group_size:
+            self.flush()
+
+    def write_many(self, records: Iterable[BaseModel]) -> None:
+        for record in records:
+            self.write(record)
+
+    def flush(self) -> None:
+        """Write buffered rows as one row group."""
+        if not self._buffer:
+            return
+        if self.format == "csv":
+            self._sink.writerows(self._buffer)
+            self._csv_file.flush()
+        else:
+            import pyarrow as pa
+
+            self._sink.write_table(pa.Table.from_pylist(self._buffer, schema=self._schema))
+        self.rows_written += len(self._buffer)
+        self._buffer.clear()
+
+    def close(self) -> None:
+        self.flush()
+        if self.format == "csv":
+            self._csv_file.close()
+        else:
+            self._sink.close()
+
+    def __enter__(self) -> ColumnarWriter:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+def export_records(
+    records: Iterable[BaseModel],
+    path: str | Path,
+    model: type[BaseModel],
+    *,
+    format: Literal["csv", "parquet"] = "csv",
+    row_group_size: int = DEFAULT_ROW_GROUP_SIZE,
+) -> int:
+    """Append ``records`` to a CSV file or Parquet dataset; return rows written."""
+    with ColumnarWriter(path, model, format=format, row_group_size=row_group_size) as writer:
+        writer.write_many(records)
+    return writer.rows_written
@@ -1,11 +1,118 @@
 """Shared image handling utilities for converting PDFs and images to base64."""
 
-import base64
+import binascii
 import io
+import math
+import os
+from collections.abc import Callable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
 from pathlib import Path
+from typing import Any, BinaryIO, Literal, TypeVar
 
-from pdf2image import convert_from_path
-from PIL import Image, ImageOps
+from PIL import Image, ImageFilter, ImageOps, ImageStat
+
+from legal_skills import metrics
+from legal_skills.artifact_cache import artifact_key, default_artifact_cache
+from legal_skills.rasterize import Rasterizer, default_rasterizer
+
+# GPT-4o scales every image to fit within 2048x2048 before tokenizing, so
+# decoding a longer side than this only costs memory.
+DEFAULT_MAX_DECODE_SIDE = 2048
+
+# Pillow decodes a PNG in full before it can be downscaled (only JPEGs have a
+# reduced-size draft mode), so PNGs are limited to this many times
+# max_decode_side squared pixels: about 50 MB of RGB(X) at the default side.
+_FULL_DECODE_FACTOR = 3
+
+# Multi-image documents are rendered by at most this many threads at once.
+MAX_RENDER_WORKERS = 4
+
+# White space between the images of a composite, in pixels.
+COMPOSITE_GAP = 16
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# A document to process: a file path, its bytes, or a binary stream.
+DocumentSource = str | os.PathLike[str] | bytes | bytearray | memoryview | BinaryIO
+
+DocumentFormat = Literal["pdf", "png", "jpeg"]
+
+# PDF readers accept a header anywhere in the first 1024 bytes.
+_PDF_HEADER_WINDOW = 1024
+_IMAGE_SIGNATURES: dict[bytes, DocumentFormat] = {
+    b"\x89PNG\r\n\x1a\n": "png",
+    b"\xff\xd8\xff": "jpeg",
+}
+
+
+def load_source(source: DocumentSource) -> Path | bytes | memoryview:
+    """Normalize a document source to a Path or an in-memory buffer.
+
+    Streams are read to the end; paths and buffers are not read.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return Path(source)
+    if isinstance(source, (bytes, memoryview)):
+        return source
+    if isinstance(source, bytearray):
+        return memoryview(source)
+    return source.read()
+
+
+def source_name(source: DocumentSource) -> str | None:
+    """The path of a file source as a string, or None for in-memory data."""
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+    return None
+
+
+def load_sources(
+    file_paths: DocumentSource | Sequence[DocumentSource],
+    source_ids: str | Sequence[str | None] | None = None,
+) -> tuple[list[Path | bytes | memoryview], list[str | None]]:
+    """Normalize one document, or a list of captures of one document, with their ids.
+
+    Each id defaults to the file's path, or None for in-memory data. For a
+    list of documents, source_ids must be a list of the same length.
+    """
+    if not isinstance(file_paths, (list, tuple)):
+        if source_ids is not None and not isinstance(source_ids, str):
+            raise ValueError("source_ids must be a single id for a single document")
+        return [load_source(file_paths)], [source_ids or source_name(file_paths)]
+    if not file_paths:
+        raise ValueError("No documents given")
+    if source_ids is None:
+        source_ids = [None] * len(file_paths)
+    elif isinstance(source_ids, str) or len(source_ids) != len(file_paths):
+        raise ValueError(f"Expected {len(file_paths)} source ids, got {source_ids!r}")
+    return (
+        [load_source(file_path) for file_path in file_paths],
+        [sid or source_name(file_path) for file_path, sid in zip(file_paths, source_ids)],
+    )
+
+
+def _describe(source: Path | bytes | memoryview) -> str:
+    return str(source) if isinstance(source, Path) else f"<{len(source)} bytes>"
+
+
+def detect_format(source: Path | bytes | memoryview) -> DocumentFormat:
+    """Identify a PDF, PNG or JPEG from its leading bytes, ignoring any file extension.
+
+    Raises ValueError for anything else.
+    """
+    if isinstance(source, Path):
+        with open(source, "rb") as f:
+            header = f.read(_PDF_HEADER_WINDOW)
+    else:
+        header = bytes(source[:_PDF_HEADER_WINDOW])
+    for signature, kind in _IMAGE_SIGNATURES.items():
+        if header.startswith(signature):
+            return kind
+    if b"%PDF-" in header:
+        return "pdf"
+    raise ValueError(f"Unsupported file type: {_describe(source)} is not a PDF, PNG or JPEG")
 
 
 def _auto_orient(img: Image.Image, *, auto_rotate: bool = False) -> Image.Image:
@@ -26,28 +133,550 @@ def _auto_orient(img: Image.Image, *, auto_rotate: bool = False) -> Image.Image:
     return img
 
 
+def _crop_fraction(
+    img: Image.Image, box: tuple[float, float, float, float]
+) -> Image.Image:
+    """Crop to a (left, top, right, bottom) box given as fractions of the image size."""
+    left, top, right, bottom = box
+    if not 0.0 <= left < right <= 1.0 or not 0.0 <= top < bottom <= 1.0:
+        raise ValueError(f"Invalid crop box: {box}")
+    width, height = img.size
+    return img.crop(
+        (round(left * width), round(top * height), round(right * width), round(bottom * height))
+    )
+
+
+def _decode_side(
+    max_decode_side: int | None, crop: tuple[float, float, float, float] | None
+) -> int | None:
+    """Longest side to decode so that a cropped region still gets up to max_decode_side."""
+    if max_decode_side is None or crop is None:
+        return max_decode_side
+    left, top, right, bottom = crop
+    extent = min(right - left, bottom - top)
+    if extent <= 0:
+        return max_decode_side  # _crop_fraction rejects the box
+    return math.ceil(max_decode_side / min(extent, 1.0))
+
+
+def _open_image(source: Path | bytes | memoryview, max_side: int | None) -> Image.Image:
+    """Open a JPEG/PNG, downscaled so that neither side exceeds max_side.
+
+    Image.open only reads the header, so the size check happens before any
+    pixel data is decoded. JPEGs are decoded directly at the smallest DCT
+    scale that still covers the target size, instead of at full size. PNGs
+    can only be decoded in full, so those above _FULL_DECODE_FACTOR times
+    max_side squared pixels are rejected with ValueError.
+    """
+    img = Image.open(source if isinstance(source, Path) else io.BytesIO(source))
+    if max_side is not None and max(img.size) > max_side:
+        if img.format == "JPEG":
+            scale = max_side / max(img.size)
+            img.draft(img.mode, (math.ceil(img.width * scale), math.ceil(img.height * scale)))
+        elif img.width * img.height > _FULL_DECODE_FACTOR * max_side**2:
+            width, height = img.size
+            img.close()
+            raise ValueError(
+                f"{_describe(source)} is a {width}x{height} PNG, too large to decode with "
+                f"max_decode_side={max_side}; downscale it or convert it to JPEG"
+            )
+        img.thumbnail((max_side, max_side))
+    return img
+
+
+QualityIssue = Literal["too_small", "blank", "too_dark", "too_bright", "blurry"]
+
+# Quality measurements are taken on a grayscale copy no larger than this, so
+# the check stays fast and sharpness thresholds mean the same at any input size.
+QUALITY_ANALYSIS_SIDE = 1024
+
+_LAPLACIAN = ImageFilter.Kernel((3, 3), [0, 1, 0, 1, -4, 1, 0, 1, 0], scale=1, offset=128)
+
+
+# Exposure is judged from the darkest and brightest pixels rather than the
+# mean, since a page of sparse text on white paper is mostly white.
+_LEVEL_FRACTION = 0.01
+
+
+@dataclass(frozen=True)
+class QualityThresholds:
+    """Limits for the pre-flight quality gate; ``name`` prefixes its counters.
+
+    The black and white levels are the grayscale values (0-255) below which
+    the darkest 1% and above which the brightest 1% of pixels lie; contrast
+    is the difference between them. Sharpness is the variance of the
+    Laplacian at QUALITY_ANALYSIS_SIDE; readable text scans score in the
+    hundreds or more, while a 2px blur drops below 30.
+    """
+
+    name: str
+    min_side: int = 300
+    min_contrast: int = 24
+    min_white_level: int = 60
+    max_black_level: int = 160
+    min_sharpness: float = 50.0
+
+
+def unreadable_only(name: str) -> QualityThresholds:
+    """Thresholds that only reject captures no model can read.
+
+    That is images under 160 px, blank ones, and ones almost entirely black
+    or white; blur is not checked. The skills gate with these by default,
+    since the stricter QualityThresholds defaults are not yet calibrated on
+    real scans.
+    """
+    return QualityThresholds(
+        name=name,
+        min_side=160,
+        min_contrast=8,
+        min_white_level=24,
+        max_black_level=232,
+        min_sharpness=0.0,
+    )
+
+
+@dataclass(frozen=True)
+class QualityReport:
+    """Measurements from the quality gate and the issues they revealed."""
+
+    width: int
+    height: int
+    black_level: int
+    white_level: int
+    sharpness: float
+    issues: tuple[QualityIssue, ...]
+
+
+class ImageQualityError(Exception):
+    """Raised when an image fails the quality gate; ``report`` says why."""
+
+    def __init__(self, file_path: str, report: QualityReport) -> None:
+        super().__init__(f"{file_path} rejected by quality gate: {', '.join(report.issues)}")
+        self.file_path = file_path
+        self.report = report
+
+
+def _levels(gray: Image.Image) -> tuple[int, int]:
+    """Grayscale values bounding the darkest and brightest _LEVEL_FRACTION of pixels."""
+    histogram = gray.histogram()
+    cutoff = _LEVEL_FRACTION * sum(histogram)
+    black = white = 0
+    seen = 0
+    for value, count in enumerate(histogram):
+        seen += count
+        if seen >= cutoff:
+            black = value
+            break
+    seen = 0
+    for value in range(255, -1, -1):
+        seen += histogram[value]
+        if seen >= cutoff:
+            white = value
+            break
+    return black, white
+
+
+def assess_quality(img: Image.Image, thresholds: QualityThresholds) -> QualityReport:
+    """Measure a decoded image and list the thresholds it fails.
+
+    A blank page is reported as blank only, not also as blurry or badly exposed.
+    """
+    gray = img.convert("L")
+    gray.thumbnail((QUALITY_ANALYSIS_SIDE, QUALITY_ANALYSIS_SIDE))
+    black, white = _levels(gray)
+    edges = gray.filter(_LAPLACIAN)
+    # Drop the one-pixel border, where the kernel sees the image edge as detail.
+    edges = edges.crop((1, 1, max(2, edges.width - 1), max(2, edges.height - 1)))
+    sharpness = ImageStat.Stat(edges).var[0]
+
+    issues: list[QualityIssue] = []
+    if min(img.size) < thresholds.min_side:
+        issues.append("too_small")
+    if white - black < thresholds.min_contrast:
+        issues.append("blank")
+    else:
+        if white < thresholds.min_white_level:
+            issues.append("too_dark")
+        elif black > thresholds.max_black_level:
+            issues.append("too_bright")
+        if sharpness < thresholds.min_sharpness:
+            issues.append("blurry")
+    return QualityReport(
+        width=img.width,
+        height=img.height,
+        black_level=black,
+        white_level=white,
+        sharpness=round(sharpness, 1),
+        issues=tuple(issues),
+    )
+
+
+def quality_skip_rate(name: str) -> float:
+    """Fraction of images checked under ``name`` that the quality gate rejected."""
+    passed = metrics.get(f"quality_gate.{name}.passed")
+    rejected = sum(metrics.snapshot(f"quality_gate.{name}.rejected.").values())
+    total = passed + rejected
+    return rejected / total if total else 0.0
+
+
+def _check_quality(img: Image.Image, thresholds: QualityThresholds, file_path: str) -> None:
+    report = assess_quality(img, thresholds)
+    if report.issues:
+        for issue in report.issues:
+            metrics.increment(f"quality_gate.{thresholds.name}.rejected.{issue}")
+        raise ImageQualityError(file_path, report)
+    metrics.increment(f"quality_gate.{thresholds.name}.passed")
+
+
+class _Base64Writer:
+    """Write-only file object that base64-encodes everything written to it.
+
+    Lets the PNG encoder stream straight into base64 so the raw PNG bytes are
+    never held in memory as a whole.
+    """
+
+    def __init__(self) -> None:
+        self._encoded = bytearray()
+        self._pending = b""
+
+    def write(self, data: bytes) -> int:
+        size = len(data)
+        data = self._pending + bytes(data)
+        usable = len(data) - len(data) % 3
+        self._encoded += binascii.b2a_base64(data[:usable], newline=False)
+        self._pending = data[usable:]
+        return size
+
+    def flush(self) -> None:
+        pass
+
+    def getvalue(self) -> str:
+        """Return the complete base64 text, including padding for any trailing bytes."""
+        if self._pending:
+            self._encoded += binascii.b2a_base64(self._pending, newline=False)
+            self._pending = b""
+        return self._encoded.decode("ascii")
+
+
+def _encode_png_base64(img: Image.Image) -> str:
+    """PNG-encode an image and return it base64-encoded, minimizing peak memory.
+
+    The encoder writes through a streaming base64 writer, so at most the
+    base64 buffer and the final str are alive at once — no intermediate PNG
+    buffer or bytes copies.
+    """
+    writer = _Base64Writer()
+    img.save(writer, format="PNG")
+    img.close()
+    return writer.getvalue()
+
+
+def _render_image(
+    source: Path | bytes | memoryview,
+    kind: DocumentFormat,
+    *,
+    auto_rotate: bool,
+    max_side: int | None,
+    crop: tuple[float, float, float, float] | None,
+    max_decode_side: int | None,
+    quality: QualityThresholds | None,
+    rasterizer: Rasterizer | None,
+    timeout: float | None,
+) -> Image.Image:
+    decode_side = _decode_side(max_decode_side, crop)
+    if kind == "pdf":
+        # Let the rasterizer render straight to the target size when no crop needs the detail.
+        size = max_side if crop is None else None
+        rasterizer = rasterizer or default_rasterizer()
+        img = rasterizer.render_first_page(source, size=size, timeout=timeout)
+        if decode_side is not None:
+            img.thumbnail((decode_side, decode_side))
+    else:
+        img = _open_image(source, decode_side)
+
+    img = _auto_orient(img, auto_rotate=auto_rotate)
+    if crop is not None:
+        img = _crop_fraction(img, crop)
+    if quality is not None:
+        _check_quality(img, quality, _describe(source))
+    if max_side is not None:
+        img.thumbnail((max_side, max_side))
+    return img
+
+
+def _render_base64_image(
+    source: Path | bytes | memoryview, kind: DocumentFormat, **options: Any
+) -> str:
+    return _encode_png_base64(_render_image(source, kind, **options))
+
+
+def _cache_params(kind: DocumentFormat, options: dict[str, Any]) -> dict[str, Any]:
+    """Artifact cache parameters for rendering a ``kind`` document with ``options``."""
+    quality, rasterizer = options["quality"], options["rasterizer"]
+    return {
+        **options,
+        "quality": asdict(quality) if quality else None,
+        # Rasterizers differ slightly in anti-aliasing, so PDF entries are kept apart.
+        "rasterizer": (rasterizer or default_rasterizer()).name if kind == "pdf" else None,
+        "format": "png",
+    }
+
+
 def file_to_base64_image(
-    file_path: str, *, auto_rotate: bool = False
+    file_path: DocumentSource,
+    *,
+    auto_rotate: bool = False,
+    max_side: int | None = None,
+    crop: tuple[float, float, float, float] | None = None,
+    max_decode_side: int | None = DEFAULT_MAX_DECODE_SIDE,
+    quality: QualityThresholds | None = None,
+    rasterizer: Rasterizer | None = None,
+    timeout: float | None = None,
 ) -> str:
     """Convert a PDF or image file to a base64-encoded PNG string.
 
+    file_path may also be the document's bytes (bytes, bytearray or
+    memoryview) or a binary stream, so uploads need not be written to disk.
+    The format is detected from the content, not the file extension, and
+    PDFs are rendered from memory.
+
     Applies EXIF orientation correction to all images. When auto_rotate=True,
     also rotates portrait images to landscape — useful for PDFs that render
-    landscape document cards in portrait page orientation.
+    landscape document cards in portrait page orientation. When max_side is
+    set, the image is downscaled (preserving aspect ratio) so neither side
+    exceeds it. crop is a (left, top, right, bottom) box in fractions of the
+    oriented image, applied before downscaling. Images with a side longer
+    than max_decode_side (2048, the most GPT-4o looks at) are downscaled
+    while decoding to bound memory, so the model sees the same image at a
+    fraction of the cost; with a crop the limit is raised so the cropped
+    region keeps that resolution. Pass None to keep full resolution. PDFs
+    are rendered with rasterizer, by default the one selected by the
+    environment (see legal_skills.rasterize), which is only consulted when
+    the document is a PDF. timeout bounds PDF rendering in seconds; when it
+    runs out, DeadlineExceeded is raised.
+
+    With quality thresholds, the decoded, oriented and cropped image is
+    checked before it is downscaled or encoded, and ImageQualityError is
+    raised if it fails (see assess_quality). Cache hits count as passes.
+
+    When an artifact cache is configured (see legal_skills.artifact_cache),
+    results are looked up by file content and these options before rendering.
     """
-    path = Path(file_path)
-    suffix = path.suffix.lower()
+    source = load_source(file_path)
+    kind = detect_format(source)
+    options = {
+        "auto_rotate": auto_rotate,
+        "max_side": max_side,
+        "crop": crop,
+        "max_decode_side": max_decode_side,
+        "quality": quality,
+        "rasterizer": rasterizer,
+    }
+    cache = default_artifact_cache()
+    if cache is None:
+        return _render_base64_image(source, kind, timeout=timeout, **options)
 
-    if suffix == ".pdf":
-        images = convert_from_path(str(path), first_page=1, last_page=1)
-        img = images[0]
-    elif suffix in (".jpg", ".jpeg", ".png"):
-        img = Image.open(path)
-    else:
-        raise ValueError(f"Unsupported file type: {suffix}")
+    key = artifact_key(source, _cache_params(kind, options))
+    payload = cache.get(key)
+    if payload is None:
+        payload = _render_base64_image(source, kind, timeout=timeout, **options)
+        cache.put(key, payload)
+    elif quality is not None:
+        # Only images that passed these thresholds are cached; count the pass again.
+        metrics.increment(f"quality_gate.{quality.name}.passed")
+    return payload
 
-    img = _auto_orient(img, auto_rotate=auto_rotate)
 
-    buffer = io.BytesIO()
-    img.save(buffer, format="PNG")
-    return base64.b64encode(buffer.getvalue()).decode("utf-8")
+def _map_parallel(
+    fn: Callable[[T], R], items: Sequence[T], *, cleanup: Callable[[R], None] | None = None
+) -> list[R]:
+    """Apply ``fn`` to every item on up to MAX_RENDER_WORKERS threads, keeping order.
+
+    If any call raises, ``cleanup`` is applied to the results of the calls
+    that succeeded before the first error is re-raised.
+    """
+    if len(items) <= 1:
+        return [fn(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(len(items), MAX_RENDER_WORKERS)) as executor:
+        futures = [executor.submit(fn, item) for item in items]
+    failed = any(future.exception() is not None for future in futures)
+    if failed and cleanup is not None:
+        for future in futures:
+            if future.exception() is None:
+                cleanup(future.result())
+    return [future.result() for future in futures]
+
+
+def files_to_base64_images(file_paths: Sequence[DocumentSource], **options: Any) -> list[str]:
+    """Convert several documents with file_to_base64_image, rendering them in parallel.
+
+    Takes the same keyword options as file_to_base64_image and returns the
+    payloads in input order.
+    """
+    return _map_parallel(lambda source: file_to_base64_image(source, **options), file_paths)
+
+
+def composite_base64_image(
+    file_paths: Sequence[DocumentSource],
+    *,
+    auto_rotate: bool = False,
+    max_side: int | None = None,
+    max_decode_side: int | None = DEFAULT_MAX_DECODE_SIDE,
+    quality: QualityThresholds | None = None,
+    rasterizer: Rasterizer | None = None,
+    timeout: float | None = None,
+) -> str:
+    """Stack several documents top to bottom into one base64-encoded PNG.
+
+    Each document is rendered, oriented and quality-checked as by
+    file_to_base64_image, in parallel, and the images are left-aligned with
+    COMPOSITE_GAP pixels of white between them; transparent areas are
+    flattened onto white. max_decode_side caps each input and then the
+    composite, and max_side applies to the composite. Composites are not
+    stored in the artifact cache.
+
+    The quality gate applies to each input: if any one of them fails,
+    ImageQualityError is raised for the whole composite.
+    """
+
+    def render(file_path: DocumentSource) -> Image.Image:
+        source = load_source(file_path)
+        return _render_image(
+            source,
+            detect_format(source),
+            auto_rotate=auto_rotate,
+            max_side=None,
+            crop=None,
+            max_decode_side=max_decode_side,
+            quality=quality,
+            rasterizer=rasterizer,
+            timeout=timeout,
+        )
+
+    composite = _stack(_map_parallel(render, file_paths, cleanup=Image.Image.close))
+    if max_decode_side is not None:
+        composite.thumbnail((max_decode_side, max_decode_side))
+    if max_side is not None:
+        composite.thumbnail((max_side, max_side))
+    return _encode_png_base64(composite)
+
+
+def _stack(images: list[Image.Image]) -> Image.Image:
+    """Stack ``images`` top to bottom on white, as composite_base64_image; closes them."""
+    try:
+        width = max(img.width for img in images)
+        height = sum(img.height for img in images) + COMPOSITE_GAP * (len(images) - 1)
+        composite = Image.new("RGB", (width, height), "white")
+        top = 0
+        for img in images:
+            rgba = img.convert("RGBA")
+            composite.paste(rgba, (0, top), rgba)  # alpha as the mask: transparent -> white
+            rgba.close()
+            top += img.height + COMPOSITE_GAP
+    finally:
+        for img in images:
+            img.close()
+    return composite
+
+
+class TieredRenderer:
+    """Render documents once and encode them at several sizes, e.g. one per cascade tier.
+
+    ``encode(max_side)`` returns one payload per document, or a single
+    composite with composite=True, matching what file_to_base64_image (or
+    composite_base64_image) returns for that max_side. Documents are decoded
+    and quality-checked once, on the first encode that is not served from the
+    artifact cache, and kept until close(); each size is downscaled from that
+    one render, so PDFs are not rasterized again per tier.
+    """
+
+    def __init__(
+        self,
+        file_paths: Sequence[DocumentSource],
+        *,
+        composite: bool = False,
+        auto_rotate: bool = False,
+        max_decode_side: int | None = DEFAULT_MAX_DECODE_SIDE,
+        quality: QualityThresholds | None = None,
+        rasterizer: Rasterizer | None = None,
+        timeout: float | None = None,
+    ) -> None:
+        self._sources = [load_source(file_path) for file_path in file_paths]
+        self._kinds = [detect_format(source) for source in self._sources]
+        self._composite = composite
+        self._options = {
+            "auto_rotate": auto_rotate,
+            "crop": None,
+            "max_decode_side": max_decode_side,
+            "quality": quality,
+            "rasterizer": rasterizer,
+        }
+        self._timeout = timeout
+        self._images: list[Image.Image] | None = None
+        self._gated: set[int] = set()  # documents whose quality gate outcome is counted
+
+    def _rendered(self) -> list[Image.Image]:
+        if self._images is None:
+
+            def render(index: int) -> Image.Image:
+                options = self._options
+                if index in self._gated:  # passed already, according to the cache
+                    options = {**options, "quality": None}
+                return _render_image(
+                    self._sources[index],
+                    self._kinds[index],
+                    max_side=None,
+                    timeout=self._timeout,
+                    **options,
+                )
+
+            images = _map_parallel(render, range(len(self._sources)), cleanup=Image.Image.close)
+            self._gated.update(range(len(self._sources)))
+            if self._composite:
+                composite = _stack(images)
+                max_decode_side = self._options["max_decode_side"]
+                if max_decode_side is not None:
+                    composite.thumbnail((max_decode_side, max_decode_side))
+                images = [composite]
+            self._images = images
+        return self._images
+
+    @staticmethod
+    def _encode(img: Image.Image, max_side: int | None) -> str:
+        copy = img.copy()
+        if max_side is not None:
+            copy.thumbnail((max_side, max_side))
+        return _encode_png_base64(copy)
+
+    def encode(self, max_side: int | None) -> list[str]:
+        """Payloads downscaled so neither side exceeds max_side (None: full size)."""
+        cache = None if self._composite else default_artifact_cache()
+        if cache is None:
+            return [self._encode(img, max_side) for img in self._rendered()]
+        payloads = []
+        for index, (source, kind) in enumerate(zip(self._sources, self._kinds)):
+            params = _cache_params(kind, {**self._options, "max_side": max_side})
+            if kind == "pdf" and max_side is not None:
+                # file_to_base64_image rasterizes straight to max_side; these are downscaled.
+                params["downscaled"] = True
+            key = artifact_key(source, params)
+            payload = cache.get(key)
+            if payload is None:
+                payload = self._encode(self._rendered()[index], max_side)
+                cache.put(key, payload)
+            elif self._options["quality"] is not None and index not in self._gated:
+                metrics.increment(f"quality_gate.{self._options['quality'].name}.passed")
+                self._gated.add(index)
+            payloads.append(payload)
+        return payloads
+
+    def close(self) -> None:
+        for img in self._images or []:
+            img.close()
+        self._images = None
+
+    def __enter__(self) -> "TieredRenderer":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
@@ -0,0 +1,346 @@
+"""Durable SQLite job queue for classify/extract/validate tasks.
+
+Progress is stored in a local SQLite file, so a run that is killed part-way
+resumes where it stopped instead of starting over:
+
+- Tasks are enqueued with a deterministic id (kind + payload hash), so
+  re-enqueuing the same inputs after a restart is a no-op.
+- ``claim`` leases a task to a worker for ``lease_seconds``. A task whose
+  lease expires (the worker crashed or hung) becomes claimable again, giving
+  at-least-once execution.
+- ``run`` renews the lease with ``heartbeat`` while a handler runs, and
+  ``complete`` only writes a result for the worker that holds the lease, so
+  a worker whose lease expired cannot overwrite the new holder's run.
+- Failed attempts are retried until ``max_attempts``, then marked failed.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterator, Mapping
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Literal
+
+from pydantic import BaseModel
+
+from legal_skills.models import DriverLicenseData, InsuranceData
+from legal_skills.skills import load_skill
+
+TaskStatus = Literal["pending", "running", "done", "failed"]
+
+DEFAULT_LEASE_SECONDS = 300.0
+DEFAULT_MAX_ATTEMPTS = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    started_at REAL,
+    finished_at REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_claimable ON tasks (status, lease_expires);
+"""
+
+# Columns added after the first release, with their types. Queue files created
+# before them are migrated in place when opened.
+_ADDED_COLUMNS = {"started_at": "REAL", "finished_at": "REAL"}
+
+
+@dataclass(frozen=True)
+class Task:
+    """A snapshot of one task row."""
+
+    task_id: str
+    kind: str
+    payload: dict[str, Any]
+    status: TaskStatus
+    attempts: int
+    lease_owner: str | None
+    result: Any
+    error: str | None
+    started_at: float | None = None
+    finished_at: float | None = None
+
+
+def task_id_for(kind: str, payload: Mapping[str, Any]) -> str:
+    """Deterministic task id, so the same work is only ever enqueued once."""
+    canonical = json.dumps([kind, payload], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+def _to_json(value: Any) -> str:
+    """Serialize a handler result; Pydantic models are dumped to plain JSON."""
+    if isinstance(value, BaseModel):
+        value = value.model_dump(mode="json")
+    return json.dumps(value)
+
+
+class JobQueue:
+    """A persistent task queue backed by one SQLite file.
+
+    Safe to share between threads of one process; several processes may also
+    open the same file (SQLite serializes the claiming transactions). WAL
+    journaling needs shared memory, so when hosts share the file over a
+    network volume, open it with journal_mode="DELETE".
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        journal_mode: Literal["WAL", "DELETE"] = "WAL",
+    ) -> None:
+        if journal_mode not in ("WAL", "DELETE"):
+            raise ValueError(f"Unsupported journal_mode: {journal_mode}")
+        self.path = Path(path)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.path, timeout=30.0, isolation_level=None, check_same_thread=False
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute(f"PRAGMA journal_mode={journal_mode}")
+        self._conn.executescript(_SCHEMA)
+        self._migrate()
+
+    def _migrate(self) -> None:
+        """Add columns missing from a queue file created by an older version."""
+        existing = {row["name"] for row in self._conn.execute("PRAGMA table_info(tasks)")}
+        for column, column_type in _ADDED_COLUMNS.items():
+            if column not in existing:
+                self._conn.execute(f"ALTER TABLE tasks ADD COLUMN {column} {column_type}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> JobQueue:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def enqueue(self, kind: str, payload: Mapping[str, Any], *, task_id: str | None = None) -> str:
+        """Add a task unless one with the same id exists; return its id."""
+        task_id = task_id or task_id_for(kind, payload)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO tasks (task_id, kind, payload, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (task_id, kind, json.dumps(dict(payload)), now, now),
+            )
+        return task_id
+
+    def claim(self, worker_id: str, *, kinds: tuple[str, ...] | None = None) -> Task | None:
+        """Lease the oldest claimable task to ``worker_id``, or return None if there is none.
+
+        Pending tasks and running tasks with an expired lease are claimable.
+        An expired task that has used up its attempts is marked failed instead.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                self._conn.execute(
+                    "UPDATE tasks SET status = 'failed', error = 'lease expired', "
+                    "lease_owner = NULL, updated_at = ? "
+                    "WHERE status = 'running' AND lease_expires < ? AND attempts >= ?",
+                    (now, now, self.max_attempts),
+                )
+                query = (
+                    "SELECT task_id FROM tasks "
+                    "WHERE (status = 'pending' OR (status = 'running' AND lease_expires < ?))"
+                )
+                params: list[Any] = [now]
+                if kinds is not None:
+                    query += f" AND kind IN ({', '.join('?' * len(kinds))})"
+                    params.extend(kinds)
+                query += " ORDER BY created_at, rowid LIMIT 1"
+                row = self._conn.execute(query, params).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE tasks SET status = 'running', attempts = attempts + 1, "
+                    "lease_owner = ?, lease_expires = ?, started_at = ?, updated_at = ? "
+                    "WHERE task_id = ?",
+                    (worker_id, now + self.lease_seconds, now, now, row["task_id"]),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(row["task_id"])
+
+    def heartbeat(self, task_id: str, worker_id: str) -> bool:
+        """Extend the lease of a running task; False if the worker no longer holds it."""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE tasks SET lease_expires = ?, updated_at = ? "
+                "WHERE task_id = ? AND status = 'running' AND lease_owner = ?",
+                (now + self.lease_seconds, now, task_id, worker_id),
+            )
+        return cursor.rowcount == 1
+
+    @contextmanager
+    def leased(self, task_id: str, worker_id: str) -> Iterator[None]:
+        """Renew the lease on ``task_id`` every third of the lease period while the block runs."""
+        done = threading.Event()
+
+        def renew() -> None:
+            while not done.wait(self.lease_seconds / 3):
+                if not self.heartbeat(task_id, worker_id):
+                    return
+
+        heartbeat = threading.Thread(target=renew, daemon=True)
+        heartbeat.start()
+        try:
+            yield
+        finally:
+            done.set()
+            heartbeat.join()
+
+    def complete(self, task_id: str, worker_id: str, result: Any) -> bool:
+        """Store a task's result; False if ``worker_id`` no longer holds its lease.
+
+        A task already done, failed or re-leased to another worker is left
+        unchanged. The completing worker stays recorded in lease_owner for
+        throughput stats.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE tasks SET status = 'done', result = ?, error = NULL, lease_owner = ?, "
+                "lease_expires = NULL, finished_at = ?, updated_at = ? "
+                "WHERE task_id = ? AND status = 'running' AND lease_owner = ?",
+                (_to_json(result), worker_id, now, now, task_id, worker_id),
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, task_id: str, worker_id: str, error: str) -> None:
+        """Record a failed attempt: retry later, or mark failed after max_attempts."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "error = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE task_id = ? AND status = 'running' AND lease_owner = ?",
+                (self.max_attempts, error, time.time(), task_id, worker_id),
+            )
+
+    def get(self, task_id: str) -> Task:
+        """Return the current state of a task. Raises KeyError if it does not exist."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+        if row is None:
+            raise KeyError(task_id)
+        return self._row_to_task(row)
+
+    def tasks(self, *, status: TaskStatus | None = None, kind: str | None = None) -> Iterator[Task]:
+        """Iterate over tasks, optionally filtered by status and kind, in enqueue order."""
+        query, params = "SELECT * FROM tasks WHERE 1 = 1", []
+        if status is not None:
+            query += " AND status = ?"
+            params.append(status)
+        if kind is not None:
+            query += " AND kind = ?"
+            params.append(kind)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY created_at, rowid", params).fetchall()
+        return (self._row_to_task(row) for row in rows)
+
+    def counts(self) -> dict[str, int]:
+        """Number of tasks in each status."""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def execute(
+        self, task: Task, handler: Callable[[dict[str, Any]], Any], worker_id: str
+    ) -> bool:
+        """Run a claimed task under a renewed lease and record its outcome.
+
+        Returns True if the result was stored; False if the handler raised
+        (recorded as a failed attempt) or the lease was lost meanwhile.
+        """
+        try:
+            with self.leased(task.task_id, worker_id):
+                result = handler(task.payload)
+        except Exception as e:
+            print(f"[{worker_id}] task {task.task_id} ({task.kind}) failed: {e}", file=sys.stderr)
+            self.fail(task.task_id, worker_id, f"{type(e).__name__}: {e}")
+            return False
+        return self.complete(task.task_id, worker_id, result)
+
+    def run(
+        self,
+        handlers: Mapping[str, Callable[[dict[str, Any]], Any]],
+        *,
+        worker_id: str,
+    ) -> int:
+        """Claim and execute tasks until none are claimable; return how many completed.
+
+        Each handler receives the task payload and returns a JSON-serializable
+        value or a Pydantic model. Exceptions are recorded as failed attempts.
+        The lease is renewed while a handler runs.
+        """
+        completed = 0
+        while (task := self.claim(worker_id, kinds=tuple(handlers))) is not None:
+            completed += self.execute(task, handlers[task.kind], worker_id)
+        return completed
+
+    @staticmethod
+    def _row_to_task(row: sqlite3.Row) -> Task:
+        return Task(
+            task_id=row["task_id"],
+            kind=row["kind"],
+            payload=json.loads(row["payload"]),
+            status=row["status"],
+            attempts=row["attempts"],
+            lease_owner=row["lease_owner"],
+            result=json.loads(row["result"]) if row["result"] is not None else None,
+            error=row["error"],
+            started_at=row["started_at"],
+            finished_at=row["finished_at"],
+        )
+
+
+def skill_handlers() -> dict[str, Callable[[dict[str, Any]], Any]]:
+    """Handlers that run the four skills on queue payloads.
+
+    Payloads: ``{"file_path": ...}`` for classify/extract_dl/extract_insurance,
+    and ``{"dl": {...}, "insurance": {...}}`` (model dumps) for validate.
+    """
+    classify_document = load_skill("classify")
+    extract_dl = load_skill("extract_dl")
+    extract_insurance = load_skill("extract_insurance")
+    validate_documents = load_skill("validate")
+    return {
+        "classify": lambda payload: classify_document(payload["file_path"]),
+        "extract_dl": lambda payload: extract_dl(payload["file_path"]),
+        "extract_insurance": lambda payload: extract_insurance(payload["file_path"]),
+        "validate": lambda payload: validate_documents(
+            DriverLicenseData.model_validate(payload["dl"]),
+            InsuranceData.model_validate(payload["insurance"]),
+        ),
+    }
@@ -0,0 +1,38 @@
+"""Process-wide counters for skill instrumentation.
+
+Counters are plain named integers, safe to increment from multiple threads.
+Names are dotted, e.g. ``parse_failures.extract_dl``, so related counters can
+be read together with ``snapshot(prefix)``.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import Counter
+
+_lock = threading.Lock()
+_counters: Counter[str] = Counter()
+
+
+def increment(name: str, amount: int = 1) -> None:
+    """Add ``amount`` to the named counter."""
+    with _lock:
+        _counters[name] += amount
+
+
+def get(name: str) -> int:
+    """Return the current value of a counter (0 if never incremented)."""
+    with _lock:
+        return _counters[name]
+
+
+def snapshot(prefix: str = "") -> dict[str, int]:
+    """Return a copy of all counters whose name starts with ``prefix``."""
+    with _lock:
+        return {name: value for name, value in _counters.items() if name.startswith(prefix)}
+
+
+def reset() -> None:
+    """Clear all counters. Intended for tests and periodic reporting."""
+    with _lock:
+        _counters.clear()
@@ -10,7 +10,7 @@ from pydantic import BaseModel
 class ClassificationResult(BaseModel):
     """Result of classifying a document as DL, insurance, or unknown."""
 
-    file_path: str
+    file_path: str | None = None  # source path, or the caller-supplied source_id
     document_type: Literal["driver_license", "insurance", "unknown"]
     confidence: float
 
@@ -18,7 +18,7 @@ class ClassificationResult(BaseModel):
 class DriverLicenseData(BaseModel):
     """Structured data extracted from a driver license document."""
 
-    file_path: str
+    file_path: str | None = None  # source path, or the caller-supplied source_id
     first_name: str
     last_name: str
     license_number: str
@@ -26,12 +26,15 @@ class DriverLicenseData(BaseModel):
     state: str
     date_of_birth: str | None = None
     expiration_date: str | None = None
+    # Every input sent in a multi-image extraction (e.g. front and back), whether or
+    # not the model read any field from it; empty for one image.
+    sources: list[str | None] = []
 
 
 class InsuranceData(BaseModel):
     """Structured data extracted from an insurance document."""
 
-    file_path: str
+    file_path: str | None = None  # source path, or the caller-supplied source_id
     first_name: str
     last_name: str
     date_of_birth: str | None = None
@@ -41,6 +44,9 @@ class InsuranceData(BaseModel):
     vehicle_model: str | None = None
     vehicle_year: str | None = None
     vin: str | None = None
+    # Every input sent in a multi-image extraction (e.g. front and back), whether or
+    # not the model read any field from it; empty for one image.
+    sources: list[str | None] = []
 
 
 class FieldDiscrepancy(BaseModel):
@@ -60,5 +66,15 @@ class ValidationReport(BaseModel):
     address_match: bool
     match_status: Literal["match", "discrepancy"]
     discrepancies: list[FieldDiscrepancy]
-    dl_source: str
-    insurance_source: str
+    dl_source: str | None = None
+    insurance_source: str | None = None
+
+
+class DuplicateGroup(BaseModel):
+    """Records that share a key which should identify only one person or policy."""
+
+    kind: Literal["reused_license", "duplicate_identity", "reused_policy", "shared_vin"]
+    key: str
+    distinct_values: int
+    record_count: int
+    sources: list[str]
@@ -0,0 +1,74 @@
+"""Helpers for packing several document images into a single chat completion.
+
+Packing amortizes the fixed per-request cost (system prompt tokens and the
+round-trip) across many documents. Each image is preceded by a text label with
+its zero-based index, and the model answers with an indexed array.
+"""
+
+from __future__ import annotations
+
+import json
+from collections.abc import Iterator, Sequence
+from typing import TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_BATCH_SIZE = 8
+
+# Base64 payloads larger than this (~750 KB of PNG) are sent on their own.
+DEFAULT_MAX_PACKED_IMAGE_CHARS = 1_000_000
+
+
+def chunked(items: Sequence[T], size: int) -> Iterator[list[T]]:
+    """Yield consecutive slices of at most ``size`` items."""
+    if size < 1:
+        raise ValueError(f"Batch size must be at least 1, got {size}")
+    for start in range(0, len(items), size):
+        yield list(items[start : start + size])
+
+
+def packed_image_content(base64_images: Sequence[str], instruction: str) -> list[dict]:
+    """Build a user message content list with one labelled image part per document."""
+    content: list[dict] = []
+    for index, base64_image in enumerate(base64_images):
+        content.append({"type": "text", "text": f"Document {index}:"})
+        content.append(
+            {
+                "type": "image_url",
+                "image_url": {"url": f"data:image/png;base64,{base64_image}"},
+            }
+        )
+    content.append({"type": "text", "text": instruction})
+    return content
+
+
+def packed_response_instructions(count: int, item_shape: str) -> str:
+    """Describe the indexed array the model must return for ``count`` documents."""
+    return (
+        f"You will receive {count} documents, each preceded by a 'Document <index>:' label. "
+        f'Respond with JSON: {{"results": [{{"index": <index>, {item_shape}}}, ...]}} '
+        f"containing exactly one entry for every index from 0 to {count - 1}."
+    )
+
+
+def parse_indexed_results(content: str, count: int) -> list[dict]:
+    """Parse a packed response into ``count`` result dicts ordered by index.
+
+    Raises json.JSONDecodeError if the content is not JSON, and ValueError if
+    the ``results`` array is missing, has the wrong length, or does not cover
+    every index exactly once.
+    """
+    payload = json.loads(content)
+    results = payload.get("results") if isinstance(payload, dict) else None
+    if not isinstance(results, list) or len(results) != count:
+        raise ValueError(f"Expected {count} packed results, got {results!r:.200}")
+
+    ordered: list[dict | None] = [None] * count
+    for item in results:
+        if not isinstance(item, dict):
+            raise ValueError(f"Packed result is not an object: {item!r:.200}")
+        index = item.get("index")
+        if not isinstance(index, int) or not 0 <= index < count or ordered[index] is not None:
+            raise ValueError(f"Invalid or duplicate packed result index: {index!r}")
+        ordered[index] = {key: value for key, value in item.items() if key != "index"}
+    return ordered  # type: ignore[return-value]
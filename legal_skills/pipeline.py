@@ -0,0 +1,436 @@
+"""End-to-end orchestration: classify -> extract -> pair -> validate.
+
+Inputs are grouped into cases (by default, one case per directory). Every
+document in a case is classified, then routed to the driver license or
+insurance extractor. Once all of a case's documents are extracted, driver
+licenses are paired with insurance documents and each pair is validated.
+
+Pairing is by holder: a license is validated against the insurance documents
+whose first and last name match it (ignoring case and surrounding space), so
+a folder holding two people's documents does not produce cross-person
+discrepancy reports. Whatever is left unmatched is validated as one pair if
+that leaves exactly one license and one insurance document (the usual case,
+where a name mismatch is exactly what validation should report), and is
+reported as unpaired otherwise.
+
+A document whose stage raises, including an error in the pipeline's own
+routing (e.g. no extractor for its type), is reported as a failure and never
+stalls its case.
+
+Each stage runs in its own thread pool with its own concurrency limit, so
+slow extraction calls cannot starve classification and vice versa. Stages
+are chained per document, not per batch: a document is extracted as soon as
+it is classified, and a case is yielded as soon as its last validation
+finishes, regardless of how far other cases have got.
+
+With ``case_timeout``, each case gets one deadline covering all of its
+stages, passed to every skill call (see ``legal_skills.deadline``). Calls that
+run out of time are reported as failures. Closing the iterator early cancels
+every outstanding deadline, so running calls stop at their next checkpoint.
+
+Usage:
+    python -m legal_skills.pipeline <folder> [--classify N] [--extract N] [--validate N]
+        [--case-timeout SECONDS]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import queue
+import sys
+import threading
+from collections import defaultdict
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Literal
+
+from legal_skills import metrics
+from legal_skills.deadline import Deadline
+from legal_skills.models import (
+    ClassificationResult,
+    DriverLicenseData,
+    InsuranceData,
+    ValidationReport,
+)
+from legal_skills.skills import load_skill
+
+Stage = Literal["classify", "extract", "validate"]
+
+SUPPORTED_SUFFIXES = (".jpg", ".jpeg", ".png", ".pdf")
+
+
+@dataclass(frozen=True)
+class StageLimits:
+    """Maximum number of concurrent calls per stage."""
+
+    classify: int = 8
+    extract: int = 8
+    validate: int = 2
+
+
+@dataclass(frozen=True)
+class DocumentFailure:
+    """A document (or DL/insurance pair, for validation) that raised in ``stage``."""
+
+    file_path: str
+    stage: Stage
+    error: str
+
+
+@dataclass
+class CaseResult:
+    """Everything the pipeline produced for one case."""
+
+    case: str
+    reports: list[ValidationReport] = field(default_factory=list)
+    unknown: list[ClassificationResult] = field(default_factory=list)
+    unpaired: list[DriverLicenseData | InsuranceData] = field(default_factory=list)
+    failed: list[DocumentFailure] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class PipelineSummary:
+    """All case results of one run, with flattened views across cases."""
+
+    cases: list[CaseResult]
+
+    @property
+    def reports(self) -> list[ValidationReport]:
+        return [report for case in self.cases for report in case.reports]
+
+    @property
+    def unknown(self) -> list[ClassificationResult]:
+        return [result for case in self.cases for result in case.unknown]
+
+    @property
+    def unpaired(self) -> list[DriverLicenseData | InsuranceData]:
+        return [doc for case in self.cases for doc in case.unpaired]
+
+    @property
+    def failed(self) -> list[DocumentFailure]:
+        return [failure for case in self.cases for failure in case.failed]
+
+
+class _CaseState:
+    """Mutable progress of one case, shared by the stage callbacks."""
+
+    def __init__(self, key: str, documents: int, deadline: Deadline | None) -> None:
+        self.lock = threading.Lock()
+        self.deadline = deadline
+        self.result = CaseResult(case=key)
+        self.pending = documents
+        self.licenses: list[DriverLicenseData] = []
+        self.policies: list[InsuranceData] = []
+
+
+def _describe(error: BaseException) -> str:
+    return f"{type(error).__name__}: {error}"
+
+
+def _holder(doc: DriverLicenseData | InsuranceData) -> tuple[str, str] | None:
+    """Normalized (first, last) name, or None when either is missing."""
+    if not doc.first_name or not doc.last_name:
+        return None
+    return doc.first_name.strip().lower(), doc.last_name.strip().lower()
+
+
+def _pair(
+    licenses: list[DriverLicenseData], policies: list[InsuranceData]
+) -> tuple[list[tuple[DriverLicenseData, InsuranceData]], list[DriverLicenseData | InsuranceData]]:
+    """Pair licenses with insurance documents of the same holder; return (pairs, unpaired)."""
+    pairs = [
+        (dl, ins)
+        for dl in licenses
+        for ins in policies
+        if _holder(dl) is not None and _holder(dl) == _holder(ins)
+    ]
+    paired = {id(doc) for pair in pairs for doc in pair}
+    lone_licenses = [dl for dl in licenses if id(dl) not in paired]
+    lone_policies = [ins for ins in policies if id(ins) not in paired]
+    if len(lone_licenses) == 1 and len(lone_policies) == 1:
+        return [*pairs, (lone_licenses[0], lone_policies[0])], []
+    return pairs, [*lone_licenses, *lone_policies]
+
+
+class _Run:
+    """One pipeline run: stage pools plus the callbacks that chain them."""
+
+    def __init__(
+        self,
+        limits: StageLimits,
+        classify: Callable[[str], ClassificationResult],
+        extractors: dict[str, Callable[[str], DriverLicenseData | InsuranceData]],
+        validate: Callable[[DriverLicenseData, InsuranceData], ValidationReport],
+        case_timeout: float | None,
+    ) -> None:
+        self.case_timeout = case_timeout
+        self.token = Deadline()
+        self.classify = classify
+        self.extractors = extractors
+        self.validate = validate
+        self.pools: dict[Stage, ThreadPoolExecutor] = {
+            stage: ThreadPoolExecutor(
+                max_workers=getattr(limits, stage), thread_name_prefix=f"pipeline-{stage}"
+            )
+            for stage in ("classify", "extract", "validate")
+        }
+        self.finished: queue.Queue[CaseResult] = queue.Queue()
+        self.closed = False
+
+    def shutdown(self) -> None:
+        self.closed = True
+        self.token.cancel()
+        for pool in self.pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def new_case(self, key: str, documents: int) -> _CaseState:
+        deadline = None if self.case_timeout is None else self.token.child(self.case_timeout)
+        return _CaseState(key, documents, deadline)
+
+    def _submit(
+        self,
+        state: _CaseState,
+        stage: Stage,
+        fn: Callable,
+        args: tuple,
+        callback: Callable[[Future], None],
+    ) -> None:
+        """Queue ``fn(*args)`` on ``stage``'s pool; a no-op once the run is shut down.
+
+        The case deadline, if any, is passed as ``deadline=``.
+        """
+        if self.closed:
+            return
+        kwargs = {} if state.deadline is None else {"deadline": state.deadline}
+        try:
+            future = self.pools[stage].submit(fn, *args, **kwargs)
+        except RuntimeError:
+            return  # shut down between the check and the submit
+        future.add_done_callback(lambda f: None if f.cancelled() else callback(f))
+
+    def start(self, state: _CaseState, file_path: str) -> None:
+        self._submit(
+            state,
+            "classify",
+            self.classify,
+            (file_path,),
+            lambda f: self._classified(state, file_path, f),
+        )
+
+    def _fail(self, state: _CaseState, file_path: str, stage: Stage, error: BaseException) -> None:
+        metrics.increment(f"pipeline.{stage}.failed")
+        with state.lock:
+            state.result.failed.append(DocumentFailure(file_path, stage, _describe(error)))
+
+    def _classified(self, state: _CaseState, file_path: str, future: Future) -> None:
+        # Callbacks must not raise: concurrent.futures would swallow the error
+        # and the case would never finish. Every path ends in _document_done
+        # unless the document moved on to extraction.
+        stage: Stage = "classify"
+        try:
+            classification = future.result()
+            if classification.document_type == "unknown":
+                with state.lock:
+                    state.result.unknown.append(classification)
+            else:
+                stage = "extract"
+                extract = self.extractors.get(classification.document_type)
+                if extract is None:
+                    raise LookupError(f"No extractor for {classification.document_type}")
+                self._submit(
+                    state,
+                    "extract",
+                    extract,
+                    (file_path,),
+                    lambda f: self._extracted(state, file_path, f),
+                )
+                return
+        except BaseException as e:
+            self._fail(state, file_path, stage, e)
+        self._document_done(state)
+
+    def _extracted(self, state: _CaseState, file_path: str, future: Future) -> None:
+        try:
+            data = future.result()
+            if not isinstance(data, (DriverLicenseData, InsuranceData)):
+                raise TypeError(f"Extractor returned {type(data).__name__}")
+            with state.lock:
+                if isinstance(data, DriverLicenseData):
+                    state.licenses.append(data)
+                else:
+                    state.policies.append(data)
+        except BaseException as e:
+            self._fail(state, file_path, "extract", e)
+        self._document_done(state)
+
+    def _document_done(self, state: _CaseState) -> None:
+        with state.lock:
+            state.pending -= 1
+            if state.pending:
+                return
+            pairs, unpaired = _pair(state.licenses, state.policies)
+            state.result.unpaired.extend(unpaired)
+            if not pairs:
+                self._case_done(state)
+                return
+            state.pending = len(pairs)
+        for dl, ins in pairs:
+            self._submit(
+                state,
+                "validate",
+                self.validate,
+                (dl, ins),
+                lambda f, dl=dl, ins=ins: self._validated(state, dl, ins, f),
+            )
+
+    def _validated(
+        self, state: _CaseState, dl: DriverLicenseData, ins: InsuranceData, future: Future
+    ) -> None:
+        try:
+            report = future.result()
+            with state.lock:
+                state.result.reports.append(report)
+        except BaseException as e:
+            self._fail(state, f"{dl.file_path} + {ins.file_path}", "validate", e)
+        with state.lock:
+            state.pending -= 1
+            if state.pending:
+                return
+        self._case_done(state)
+
+    def _case_done(self, state: _CaseState) -> None:
+        metrics.increment("pipeline.cases")
+        self.finished.put(state.result)
+
+
+def iter_cases(
+    cases: dict[str, list[str]],
+    *,
+    limits: StageLimits = StageLimits(),
+    classify: Callable[[str], ClassificationResult] | None = None,
+    extractors: dict[str, Callable[[str], DriverLicenseData | InsuranceData]] | None = None,
+    validate: Callable[[DriverLicenseData, InsuranceData], ValidationReport] | None = None,
+    case_timeout: float | None = None,
+) -> Iterator[CaseResult]:
+    """Run the pipeline over ``{case: [file paths]}``, yielding each case as it completes.
+
+    Cases come out in completion order, not input order. ``classify``,
+    ``extractors`` (keyed by document type) and ``validate`` default to the
+    skills; with ``case_timeout`` they must accept a ``deadline`` keyword. A
+    document that raises is recorded in its case's ``failed`` list and does
+    not stop the run. Closing the iterator early cancels queued work.
+    """
+    classify = classify or load_skill("classify")
+    extractors = extractors or {
+        "driver_license": load_skill("extract_dl"),
+        "insurance": load_skill("extract_insurance"),
+    }
+    validate = validate or load_skill("validate")
+
+    run = _Run(limits, classify, extractors, validate, case_timeout)
+    expected = 0
+    try:
+        for key, file_paths in cases.items():
+            if not file_paths:
+                continue
+            state = run.new_case(key, len(file_paths))
+            for file_path in file_paths:
+                run.start(state, file_path)
+            expected += 1
+        for _ in range(expected):
+            yield run.finished.get()
+    finally:
+        run.shutdown()
+
+
+def group_by_directory(folder: str | Path, file_paths: Iterable[str]) -> dict[str, list[str]]:
+    """Group files into cases by their directory relative to ``folder`` ("." for the top level)."""
+    root = Path(folder)
+    cases: dict[str, list[str]] = defaultdict(list)
+    for file_path in file_paths:
+        cases[Path(file_path).parent.relative_to(root).as_posix()].append(file_path)
+    return dict(cases)
+
+
+def find_documents(folder: str | Path) -> list[str]:
+    """All supported document files under ``folder``, recursively, in sorted order."""
+    return sorted(
+        str(path)
+        for path in Path(folder).rglob("*")
+        if path.is_file() and path.suffix.lower() in SUPPORTED_SUFFIXES
+    )
+
+
+def process_folder(
+    folder: str | Path,
+    *,
+    limits: StageLimits = StageLimits(),
+    on_case: Callable[[CaseResult], None] | None = None,
+    case_timeout: float | None = None,
+    **skills: Callable,
+) -> PipelineSummary:
+    """Classify, extract, pair and validate every document under ``folder``.
+
+    Each subdirectory is one case; documents directly in ``folder`` form the
+    case ".". ``on_case`` is called with each case as soon as it completes.
+    ``case_timeout`` bounds each case end to end, in seconds. ``skills`` may
+    override ``classify``, ``extractors`` and ``validate`` as in ``iter_cases``.
+    """
+    cases = group_by_directory(folder, find_documents(folder))
+    results = []
+    for case in iter_cases(cases, limits=limits, case_timeout=case_timeout, **skills):
+        if on_case is not None:
+            on_case(case)
+        results.append(case)
+    return PipelineSummary(cases=sorted(results, key=lambda case: case.case))
+
+
+def _case_to_json(case: CaseResult) -> str:
+    return json.dumps(
+        {
+            "case": case.case,
+            "reports": [report.model_dump() for report in case.reports],
+            "unknown": [result.file_path for result in case.unknown],
+            "unpaired": [doc.file_path for doc in case.unpaired],
+            "failed": [asdict(failure) for failure in case.failed],
+        }
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Classify, extract and validate a folder.")
+    parser.add_argument("folder", type=Path, help="Folder of documents, one subfolder per case")
+    defaults = StageLimits()
+    for stage in ("classify", "extract", "validate"):
+        parser.add_argument(
+            f"--{stage}",
+            type=int,
+            default=getattr(defaults, stage),
+            help=f"Concurrent {stage} calls (default: {getattr(defaults, stage)})",
+        )
+    parser.add_argument(
+        "--case-timeout", type=float, default=None, help="Seconds allowed per case, end to end"
+    )
+    args = parser.parse_args(argv)
+
+    limits = StageLimits(classify=args.classify, extract=args.extract, validate=args.validate)
+    summary = process_folder(
+        args.folder,
+        limits=limits,
+        on_case=lambda case: print(_case_to_json(case), flush=True),
+        case_timeout=args.case_timeout,
+    )
+    print(
+        f"{len(summary.cases)} cases: {len(summary.reports)} reports, "
+        f"{len(summary.unknown)} unknown, {len(summary.unpaired)} unpaired, "
+        f"{len(summary.failed)} failed",
+        file=sys.stderr,
+    )
+    return 1 if summary.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
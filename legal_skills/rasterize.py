@@ -0,0 +1,250 @@
+"""Pluggable PDF rasterizers for rendering the first page of a document.
+
+``pdf2image`` shells out to poppler: every PDF costs a ``pdfinfo`` process
+for the page count and a ``pdftoppm`` process for the render, with the
+bitmap piped back through temp files. For small card PDFs, process spawn and
+IPC dominate the render time. ``PdfiumRasterizer`` renders in-process with
+the optional ``pypdfium2`` package and reads the page count from the parsed
+document, so no process is started at all.
+
+The rasterizer used by ``file_to_base64_image`` is selected with:
+
+    LEGAL_SKILLS_PDF_RASTERIZER=auto  # auto (default), pdfium or pdf2image
+
+``auto`` uses pdfium when ``pypdfium2`` is installed and pdf2image otherwise.
+
+Compare both on a set of PDFs with:
+
+    python -m legal_skills.rasterize test_data/*.pdf --repeat 20
+
+``test_data/`` holds the private sample documents used by the integration
+tests and is not distributed. Without arguments the benchmark renders a
+generated PDF shaped like a scanned license (one 300 dpi card image), so it
+can be run anywhere; results on real documents will differ.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Protocol
+
+from pdf2image import convert_from_bytes, convert_from_path, pdfinfo_from_bytes, pdfinfo_from_path
+from pdf2image.exceptions import PDFPopplerTimeoutError
+from PIL import Image, ImageDraw
+
+from legal_skills import metrics
+from legal_skills.deadline import DeadlineExceeded
+
+# pdf2image's default resolution; both rasterizers render at it unless a size is given.
+DEFAULT_DPI = 200
+
+# Points per inch in PDF user space.
+_PDF_UNITS_PER_INCH = 72
+
+# A PDF to render: a file path, or the file's bytes.
+PdfSource = Path | bytes | memoryview
+
+
+def _describe(pdf: PdfSource) -> str:
+    return pdf.name if isinstance(pdf, Path) else f"in-memory PDF ({len(pdf)} bytes)"
+
+
+class Rasterizer(Protocol):
+    """Renders PDF pages to PIL images."""
+
+    name: str
+
+    def render_first_page(
+        self, pdf: PdfSource, *, size: int | None = None, timeout: float | None = None
+    ) -> Image.Image:
+        """Render page 1 of ``pdf``, scaled so its longer side is ``size`` pixels when given.
+
+        Raises DeadlineExceeded when ``timeout`` (seconds) runs out.
+        """
+        ...
+
+    def page_count(self, pdf: PdfSource) -> int: ...
+
+
+class Pdf2ImageRasterizer:
+    """Renders with poppler's command-line tools through pdf2image."""
+
+    name = "pdf2image"
+
+    def render_first_page(
+        self, pdf: PdfSource, *, size: int | None = None, timeout: float | None = None
+    ) -> Image.Image:
+        options = {"dpi": DEFAULT_DPI, "first_page": 1, "last_page": 1, "size": size}
+        try:
+            if isinstance(pdf, Path):
+                images = convert_from_path(str(pdf), timeout=timeout, **options)
+            else:
+                images = convert_from_bytes(bytes(pdf), timeout=timeout, **options)
+        except PDFPopplerTimeoutError as e:
+            message = f"PDF rendering of {_describe(pdf)} exceeded {timeout:.2f}s"
+            raise DeadlineExceeded(message) from e
+        metrics.increment("rasterize.pdf2image.pages")
+        return images[0]
+
+    def page_count(self, pdf: PdfSource) -> int:
+        if isinstance(pdf, Path):
+            return pdfinfo_from_path(str(pdf))["Pages"]
+        return pdfinfo_from_bytes(bytes(pdf))["Pages"]
+
+
+class PdfiumRasterizer:
+    """Renders in-process with PDFium through the optional ``pypdfium2`` package.
+
+    PDFium is not thread-safe, so calls are serialized on a process-wide
+    lock; a first-page render takes milliseconds, so this costs less than
+    the process spawns it replaces. A render cannot be interrupted, so
+    ``timeout`` is checked before it starts.
+    """
+
+    name = "pdfium"
+
+    _lock = threading.Lock()
+
+    def __init__(self) -> None:
+        try:
+            import pypdfium2
+        except ImportError:
+            raise ImportError(
+                "The pdfium rasterizer requires pypdfium2: pip install pypdfium2"
+            ) from None
+        self._pdfium = pypdfium2
+
+    @staticmethod
+    def _input(pdf: PdfSource) -> str | bytes:
+        # pypdfium2 reads paths and bytes, but not other buffers.
+        return str(pdf) if isinstance(pdf, Path) else bytes(pdf)
+
+    def render_first_page(
+        self, pdf: PdfSource, *, size: int | None = None, timeout: float | None = None
+    ) -> Image.Image:
+        start = time.monotonic()
+        with self._lock:
+            if timeout is not None and time.monotonic() - start >= timeout:
+                raise DeadlineExceeded(f"PDF rendering of {_describe(pdf)} exceeded {timeout:.2f}s")
+            pdf = self._pdfium.PdfDocument(self._input(pdf))
+            try:
+                page = pdf[0]
+                try:
+                    if size is None:
+                        scale = DEFAULT_DPI / _PDF_UNITS_PER_INCH
+                    else:
+                        scale = size / max(page.get_size())
+                    bitmap = page.render(scale=scale)
+                    img = bitmap.to_pil()
+                    bitmap.close()
+                finally:
+                    page.close()
+            finally:
+                pdf.close()
+        metrics.increment("rasterize.pdfium.pages")
+        return img
+
+    def page_count(self, pdf: PdfSource) -> int:
+        with self._lock:
+            pdf = self._pdfium.PdfDocument(self._input(pdf))
+            try:
+                return len(pdf)
+            finally:
+                pdf.close()
+
+
+RASTERIZERS: dict[str, type[Rasterizer]] = {
+    "pdfium": PdfiumRasterizer,
+    "pdf2image": Pdf2ImageRasterizer,
+}
+
+
+@lru_cache(maxsize=None)
+def get_rasterizer(name: str = "auto") -> Rasterizer:
+    """Return the rasterizer called ``name``; ``auto`` prefers pdfium when installed."""
+    if name == "auto":
+        try:
+            return PdfiumRasterizer()
+        except ImportError:
+            return Pdf2ImageRasterizer()
+    if name not in RASTERIZERS:
+        expected = ", ".join(["auto", *RASTERIZERS])
+        raise ValueError(f"Unknown PDF rasterizer: {name} (expected one of {expected})")
+    return RASTERIZERS[name]()
+
+
+def default_rasterizer() -> Rasterizer:
+    """The rasterizer selected by LEGAL_SKILLS_PDF_RASTERIZER."""
+    return get_rasterizer(os.environ.get("LEGAL_SKILLS_PDF_RASTERIZER") or "auto")
+
+
+def _sample_pdf(directory: Path) -> Path:
+    """Write a one-page PDF like a scanned ID-1 card at 300 dpi; return its path."""
+    card = Image.new("RGB", (1012, 638), (236, 240, 244))
+    draw = ImageDraw.Draw(card)
+    draw.rectangle((40, 150, 300, 500), fill=(150, 160, 170))  # photo
+    for row in range(8):
+        top = 160 + row * 40
+        draw.rectangle((340, top, 340 + 600 - row * 45, top + 18), fill=(30, 30, 40))  # text
+    path = directory / "sample_card.pdf"
+    card.save(path, resolution=300)
+    return path
+
+
+def _benchmark(
+    rasterizer: Rasterizer, paths: list[Path], repeat: int, size: int | None
+) -> list[float]:
+    """Seconds per page count + first-page render, one sample per file per repeat."""
+    samples = []
+    for _ in range(repeat):
+        for path in paths:
+            start = time.perf_counter()
+            rasterizer.page_count(path)
+            rasterizer.render_first_page(path, size=size).close()
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare PDF rasterizers on a set of PDFs.")
+    parser.add_argument(
+        "pdfs", nargs="*", type=Path, help="PDF files to render (default: a generated card)"
+    )
+    parser.add_argument("--repeat", type=int, default=10, help="Renders per file (default: 10)")
+    parser.add_argument("--size", type=int, default=None, help="Longer side in pixels")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        pdfs = args.pdfs or [_sample_pdf(Path(directory))]
+        _compare(pdfs, args.repeat, args.size)
+    return 0
+
+
+def _compare(pdfs: list[Path], repeat: int, size: int | None) -> None:
+    for name in RASTERIZERS:
+        try:
+            rasterizer = get_rasterizer(name)
+            rasterizer.render_first_page(pdfs[0], size=size).close()  # warm up
+            samples = _benchmark(rasterizer, pdfs, repeat, size)
+        except Exception as e:
+            print(f"{name:>10}: unavailable ({e})")
+            continue
+        ordered = sorted(samples)
+        p95 = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+        print(
+            f"{name:>10}: {len(samples)} renders, "
+            f"median {statistics.median(samples) * 1000:.1f} ms, p95 {p95 * 1000:.1f} ms, "
+            f"{len(samples) / sum(samples):.1f} docs/s"
+        )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+"""Indexed store of extracted driver license and insurance records.
+
+Records are kept in SQLite with indexes on normalized license number, VIN,
+policy number and identity (first name + last name + date of birth), so
+point lookups stay fast and duplicate scans run as indexed GROUP BY queries
+instead of scans over JSON dumps.
+
+Duplicate kinds:
+- ``reused_license``: one license number under more than one identity.
+- ``duplicate_identity``: one identity holding more than one license number.
+- ``reused_policy``: one policy number under more than one identity.
+- ``shared_vin``: one VIN listed on more than one policy.
+"""
+
+from __future__ import annotations
+
+import re
+import sqlite3
+import threading
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+from pathlib import Path
+
+from legal_skills.cascade import is_iso_date
+from legal_skills.models import DriverLicenseData, DuplicateGroup, InsuranceData
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dl_records (
+    id INTEGER PRIMARY KEY,
+    file_path TEXT NOT NULL,
+    license_number TEXT NOT NULL,
+    identity TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS dl_license ON dl_records (license_number, identity);
+CREATE INDEX IF NOT EXISTS dl_identity ON dl_records (identity, license_number);
+
+CREATE TABLE IF NOT EXISTS insurance_records (
+    id INTEGER PRIMARY KEY,
+    file_path TEXT NOT NULL,
+    policy_number TEXT,
+    vin TEXT,
+    identity TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ins_policy ON insurance_records (policy_number, identity);
+CREATE INDEX IF NOT EXISTS ins_vin ON insurance_records (vin, policy_number);
+CREATE INDEX IF NOT EXISTS ins_identity ON insurance_records (identity);
+"""
+
+# kind -> (table, grouping column, column whose distinct values must be unique per group)
+_DUPLICATE_QUERIES = {
+    "reused_license": ("dl_records", "license_number", "identity"),
+    "duplicate_identity": ("dl_records", "identity", "license_number"),
+    "reused_policy": ("insurance_records", "policy_number", "identity"),
+    "shared_vin": ("insurance_records", "vin", "policy_number"),
+}
+
+
+def normalize_identifier(value: str | None) -> str | None:
+    """Uppercase and drop everything but letters and digits ("d-123 4" -> "D1234")."""
+    if value is None:
+        return None
+    normalized = re.sub(r"[^0-9A-Za-z]", "", value).upper()
+    return normalized or None
+
+
+def normalize_date(value: str | None) -> str | None:
+    """ISO ``YYYY-MM-DD`` for an ISO or US ``MM/DD/YYYY`` date; None for anything else."""
+    if value is None:
+        return None
+    value = value.strip()
+    if is_iso_date(value):
+        return value
+    try:
+        return datetime.strptime(value, "%m/%d/%Y").date().isoformat()
+    except ValueError:
+        return None
+
+
+def identity_key(first_name: str, last_name: str, date_of_birth: str | None) -> str | None:
+    """Normalized ``first|last|dob`` key, or None without a parseable DOB.
+
+    Names alone are ambiguous, so a DOB that is missing or in an unknown
+    format gives no key rather than one that can never match.
+    """
+    date_of_birth = normalize_date(date_of_birth)
+    if date_of_birth is None:
+        return None
+    parts = (first_name, last_name, date_of_birth)
+    return "|".join(" ".join(part.lower().split()) for part in parts)
+
+
+class RecordStore:
+    """SQLite-backed record store; pass ":memory:" for a throwaway store."""
+
+    def __init__(self, path: str | Path) -> None:
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> RecordStore:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def add(self, record: DriverLicenseData | InsuranceData) -> None:
+        """Store one extracted record."""
+        self.add_many([record])
+
+    def add_many(self, records: Iterable[DriverLicenseData | InsuranceData]) -> int:
+        """Store many records in a single transaction; return how many were added."""
+        dl_rows, ins_rows = [], []
+        for record in records:
+            identity = identity_key(record.first_name, record.last_name, record.date_of_birth)
+            if isinstance(record, DriverLicenseData):
+                dl_rows.append(
+                    (
+                        record.file_path or "",
+                        normalize_identifier(record.license_number) or "",
+                        identity,
+                        record.model_dump_json(),
+                    )
+                )
+            else:
+                ins_rows.append(
+                    (
+                        record.file_path or "",
+                        normalize_identifier(record.policy_number),
+                        normalize_identifier(record.vin),
+                        identity,
+                        record.model_dump_json(),
+                    )
+                )
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO dl_records (file_path, license_number, identity, data) "
+                "VALUES (?, ?, ?, ?)",
+                dl_rows,
+            )
+            self._conn.executemany(
+                "INSERT INTO insurance_records (file_path, policy_number, vin, identity, data) "
+                "VALUES (?, ?, ?, ?, ?)",
+                ins_rows,
+            )
+        return len(dl_rows) + len(ins_rows)
+
+    def find_by_license(self, license_number: str) -> list[DriverLicenseData]:
+        """All driver licenses with this license number (normalized)."""
+        rows = self._select("dl_records", "license_number", normalize_identifier(license_number))
+        return [DriverLicenseData.model_validate_json(data) for data in rows]
+
+    def find_by_policy(self, policy_number: str) -> list[InsuranceData]:
+        """All insurance records with this policy number (normalized)."""
+        rows = self._select("insurance_records", "policy_number", normalize_identifier(policy_number))
+        return [InsuranceData.model_validate_json(data) for data in rows]
+
+    def find_by_vin(self, vin: str) -> list[InsuranceData]:
+        """All insurance records listing this VIN (normalized)."""
+        rows = self._select("insurance_records", "vin", normalize_identifier(vin))
+        return [InsuranceData.model_validate_json(data) for data in rows]
+
+    def find_by_identity(
+        self, first_name: str, last_name: str, date_of_birth: str
+    ) -> list[DriverLicenseData | InsuranceData]:
+        """All records, of either type, for this name and date of birth."""
+        key = identity_key(first_name, last_name, date_of_birth)
+        records: list[DriverLicenseData | InsuranceData] = [
+            DriverLicenseData.model_validate_json(data)
+            for data in self._select("dl_records", "identity", key)
+        ]
+        records.extend(
+            InsuranceData.model_validate_json(data)
+            for data in self._select("insurance_records", "identity", key)
+        )
+        return records
+
+    def duplicates(self, kind: str | None = None) -> Iterator[DuplicateGroup]:
+        """Yield duplicate groups of ``kind`` (all kinds if None), largest first per kind."""
+        kinds = [kind] if kind is not None else list(_DUPLICATE_QUERIES)
+        for name in kinds:
+            try:
+                table, key_column, value_column = _DUPLICATE_QUERIES[name]
+            except KeyError:
+                raise ValueError(f"Unknown duplicate kind: {name}") from None
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT {key_column}, COUNT(DISTINCT {value_column}), COUNT(*), "
+                    f"GROUP_CONCAT(file_path, char(31)) FROM {table} "
+                    f"WHERE {key_column} IS NOT NULL AND {key_column} != '' "
+                    f"AND {value_column} IS NOT NULL "
+                    f"GROUP BY {key_column} HAVING COUNT(DISTINCT {value_column}) > 1 "
+                    "ORDER BY COUNT(*) DESC"
+                ).fetchall()
+            for key, distinct_values, record_count, sources in rows:
+                yield DuplicateGroup(
+                    kind=name,  # type: ignore[arg-type]
+                    key=key,
+                    distinct_values=distinct_values,
+                    record_count=record_count,
+                    sources=sources.split("\x1f"),
+                )
+
+    def _select(self, table: str, column: str, value: str | None) -> list[str]:
+        if value is None:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT data FROM {table} WHERE {column} = ? ORDER BY id", (value,)
+            ).fetchall()
+        return [data for (data,) in rows]
@@ -0,0 +1,78 @@
+"""Helpers for targeted field-level re-extraction.
+
+Instead of re-running a full extraction when only a few fields are missing or
+flagged, the extractors ask the model for just those fields (optionally on a
+cropped region) and merge the answers into the existing result.
+"""
+
+from __future__ import annotations
+
+import os
+from collections.abc import Iterable, Mapping
+from typing import TypeVar
+
+from pydantic import BaseModel
+
+from legal_skills.schemas import NON_EXTRACTED_FIELDS
+
+M = TypeVar("M", bound=BaseModel)
+
+# Output token budget per requested field, plus a fixed allowance for JSON syntax.
+TOKENS_PER_FIELD = 40
+BASE_TOKENS = 20
+
+
+def select_fields(model: type[BaseModel], fields: Iterable[str]) -> tuple[str, ...]:
+    """Validate requested field names against ``model`` and return them in model order.
+
+    Raises ValueError for unknown fields, fields the skill sets itself (such
+    as file_path), or an empty selection.
+    """
+    requested = set(fields)
+    extractable = [name for name in model.model_fields if name not in NON_EXTRACTED_FIELDS]
+    unknown = requested - set(extractable)
+    if unknown:
+        raise ValueError(f"Cannot re-extract fields {sorted(unknown)} of {model.__name__}")
+    if not requested:
+        raise ValueError("At least one field must be selected for re-extraction")
+    return tuple(name for name in extractable if name in requested)
+
+
+def field_spec(descriptions: Mapping[str, str | None], fields: Iterable[str]) -> str:
+    """Render ``name (hint)`` entries for the prompt, e.g. ``date_of_birth (YYYY-MM-DD or null)``."""
+    return ", ".join(
+        f"{name} ({descriptions[name]})" if descriptions[name] else name for name in fields
+    )
+
+
+def max_tokens_for(fields: tuple[str, ...]) -> int:
+    """Output token budget for a re-extraction of ``fields``."""
+    return BASE_TOKENS + TOKENS_PER_FIELD * len(fields)
+
+
+def merge_fields(data: M, updates: Mapping[str, object]) -> M:
+    """Return a validated copy of ``data`` with non-null ``updates`` applied.
+
+    Null answers are ignored so a repair never erases a value that the full
+    extraction already found.
+    """
+    merged = data.model_dump()
+    merged.update({name: value for name, value in updates.items() if value is not None})
+    return type(data).model_validate(merged)
+
+
+def recorded_sources(data: BaseModel) -> list[str]:
+    """Return the files ``data`` was extracted from: its sources, else its file_path.
+
+    Results of in-memory extractions carry the caller's source_id (or None)
+    there instead, so their documents must be passed explicitly; ValueError
+    is raised unless every recorded id names an existing file.
+    """
+    ids = data.sources or [data.file_path]
+    unreadable = [source_id for source_id in ids if not source_id or not os.path.isfile(source_id)]
+    if unreadable:
+        raise ValueError(
+            f"Sources {unreadable!r} of the result are not files (they came from in-memory "
+            "data or a source_id); pass the document as file_path"
+        )
+    return ids
@@ -0,0 +1,296 @@
+"""Priority lanes and per-tenant fair scheduling for model calls.
+
+A ``Scheduler`` owns a fixed number of concurrent model-call slots shared by
+everything in the process. Callers wait for a slot in one of two lanes:
+
+- ``interactive``: always served first, and may use every slot.
+- ``bulk``: served only when no interactive call is waiting, and never holds
+  the ``interactive_reserve`` slots, so a freshly arrived interactive call
+  does not wait behind long bulk calls.
+
+Within a lane, tenants share slots in proportion to their weight (start-time
+fair queueing): a tenant with weight 3 is granted three slots for every one
+granted to a weight-1 tenant while both have calls waiting, and a tenant
+returning from idle does not get to spend banked credit.
+
+Each lane's queue is bounded; when it is full, ``QueueFullError`` is raised
+at once with a ``retry_after`` hint instead of queueing the call.
+
+The simplest way to put the scheduler in front of the skills is to pass a
+``ScheduledBackend`` as their ``backend``, so the slot is held only for the
+model call itself, not for rendering:
+
+    scheduler = Scheduler(capacity=16)
+    interactive = scheduler.backend(default_backend(), priority="interactive", tenant="acme")
+    classify_document(path, backend=interactive)
+
+Counters in ``legal_skills.metrics`` (per lane):
+``scheduler.<lane>.admitted``, ``.rejected``, ``.timed_out`` and ``.wait_ms``
+(total queueing time). ``Scheduler.stats()`` reports queue depth, in-flight
+calls and p50/p95 wait per lane.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterator, Mapping
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Literal, TypeVar
+
+from openai.types.chat import ChatCompletion
+
+from legal_skills import metrics
+from legal_skills.backends import ModelBackend, backend_key, stream_completion
+from legal_skills.deadline import Deadline, DeadlineExceeded, request_timeout
+
+T = TypeVar("T")
+
+Priority = Literal["interactive", "bulk"]
+PRIORITIES: tuple[Priority, ...] = ("interactive", "bulk")
+
+DEFAULT_QUEUE_LIMITS: dict[Priority, int] = {"interactive": 256, "bulk": 10_000}
+
+# Wait-time samples kept per lane for percentiles.
+WAIT_SAMPLES = 1024
+
+
+class QueueFullError(RuntimeError):
+    """Raised when a lane's queue is full; retry after ``retry_after`` seconds."""
+
+    def __init__(self, priority: Priority, retry_after: float) -> None:
+        super().__init__(f"{priority} queue is full; retry after {retry_after:.1f}s")
+        self.priority = priority
+        self.retry_after = retry_after
+
+
+@dataclass(frozen=True)
+class LaneStats:
+    """Point-in-time view of one priority lane."""
+
+    queued: int
+    in_flight: int
+    wait_p50: float
+    wait_p95: float
+
+
+@dataclass(eq=False)
+class _Ticket:
+    priority: Priority
+    tenant: str
+    enqueued_at: float
+    granted: threading.Event = field(default_factory=threading.Event)
+
+
+def _percentile(samples: list[float], fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Scheduler:
+    """Admission control for a shared pool of ``capacity`` concurrent model calls."""
+
+    def __init__(
+        self,
+        capacity: int,
+        *,
+        interactive_reserve: int | None = None,
+        queue_limits: Mapping[Priority, int] | None = None,
+        tenant_weights: Mapping[str, float] | None = None,
+    ) -> None:
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        if interactive_reserve is None:
+            interactive_reserve = max(1, capacity // 4) if capacity > 1 else 0
+        if not 0 <= interactive_reserve < capacity:
+            raise ValueError("interactive_reserve must leave at least one slot for bulk")
+        self.capacity = capacity
+        self.interactive_reserve = interactive_reserve
+        self.queue_limits = {**DEFAULT_QUEUE_LIMITS, **(queue_limits or {})}
+        self.tenant_weights = dict(tenant_weights or {})
+
+        self._lock = threading.Lock()
+        self._queues: dict[Priority, dict[str, deque[_Ticket]]] = {p: {} for p in PRIORITIES}
+        self._depth: dict[Priority, int] = dict.fromkeys(PRIORITIES, 0)
+        self._in_flight: dict[Priority, int] = dict.fromkeys(PRIORITIES, 0)
+        # Start-time fair queueing: per-tenant virtual start tags and a lane clock.
+        self._tags: dict[Priority, dict[str, float]] = {p: {} for p in PRIORITIES}
+        self._clock: dict[Priority, float] = dict.fromkeys(PRIORITIES, 0.0)
+        self._waits: dict[Priority, deque[float]] = {
+            p: deque(maxlen=WAIT_SAMPLES) for p in PRIORITIES
+        }
+        self._service_seconds = 1.0  # moving average of slot hold time, for retry hints
+
+    def _slots(self, priority: Priority) -> int:
+        if priority == "interactive":
+            return self.capacity
+        return self.capacity - self.interactive_reserve
+
+    def _next_ticket(self, priority: Priority) -> _Ticket | None:
+        """Pop the waiting ticket of the tenant with the smallest start tag."""
+        waiting = {tenant: q for tenant, q in self._queues[priority].items() if q}
+        if not waiting:
+            return None
+        tags = self._tags[priority]
+        tenant = min(waiting, key=lambda t: tags[t])
+        ticket = waiting[tenant].popleft()
+        self._clock[priority] = tags[tenant]
+        tags[tenant] += 1.0 / self.tenant_weights.get(tenant, 1.0)
+        self._depth[priority] -= 1
+        return ticket
+
+    def _dispatch(self) -> None:
+        """Grant free slots to waiting tickets, interactive first. Caller holds the lock."""
+        while sum(self._in_flight.values()) < self.capacity:
+            ticket = self._next_ticket("interactive")
+            if ticket is None and self._in_flight["bulk"] < self._slots("bulk"):
+                ticket = self._next_ticket("bulk")
+            if ticket is None:
+                return
+            self._in_flight[ticket.priority] += 1
+            wait = time.monotonic() - ticket.enqueued_at
+            self._waits[ticket.priority].append(wait)
+            metrics.increment(f"scheduler.{ticket.priority}.admitted")
+            metrics.increment(f"scheduler.{ticket.priority}.wait_ms", round(wait * 1000))
+            ticket.granted.set()
+
+    def _enqueue(self, priority: Priority, tenant: str) -> _Ticket:
+        with self._lock:
+            if self._depth[priority] >= self.queue_limits[priority]:
+                metrics.increment(f"scheduler.{priority}.rejected")
+                backlog = self._depth[priority] + self._in_flight[priority]
+                retry_after = max(0.1, backlog * self._service_seconds / self._slots(priority))
+                raise QueueFullError(priority, round(retry_after, 1))
+            queue = self._queues[priority].setdefault(tenant, deque())
+            if not queue:
+                # A tenant returning from idle starts at the lane clock, not behind it.
+                tags = self._tags[priority]
+                tags[tenant] = max(tags.get(tenant, 0.0), self._clock[priority])
+            ticket = _Ticket(priority, tenant, time.monotonic())
+            queue.append(ticket)
+            self._depth[priority] += 1
+            self._dispatch()
+        return ticket
+
+    def _abandon(self, ticket: _Ticket) -> None:
+        """Withdraw a ticket whose caller gave up; return its slot if it was just granted."""
+        with self._lock:
+            if ticket.granted.is_set():
+                self._in_flight[ticket.priority] -= 1
+            else:
+                self._queues[ticket.priority][ticket.tenant].remove(ticket)
+                self._depth[ticket.priority] -= 1
+            self._dispatch()
+
+    def _release(self, ticket: _Ticket, held: float) -> None:
+        with self._lock:
+            self._in_flight[ticket.priority] -= 1
+            self._service_seconds = 0.9 * self._service_seconds + 0.1 * held
+            self._dispatch()
+
+    @contextmanager
+    def slot(
+        self,
+        *,
+        priority: Priority = "bulk",
+        tenant: str = "default",
+        deadline: Deadline | None = None,
+    ) -> Iterator[None]:
+        """Hold one slot for the duration of the ``with`` block.
+
+        Raises QueueFullError if the lane's queue is full, and
+        DeadlineExceeded or OperationCancelled if ``deadline`` passes or is
+        cancelled while waiting.
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+        if deadline is not None:
+            deadline.check("scheduler")
+        ticket = self._enqueue(priority, tenant)
+        try:
+            while not ticket.granted.wait(None if deadline is None else 0.05):
+                deadline.check("scheduler")
+        except BaseException as e:
+            if isinstance(e, DeadlineExceeded):
+                metrics.increment(f"scheduler.{priority}.timed_out")
+            self._abandon(ticket)
+            raise
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(ticket, time.monotonic() - start)
+
+    def run(
+        self,
+        fn: Callable[..., T],
+        *args: Any,
+        priority: Priority = "bulk",
+        tenant: str = "default",
+        deadline: Deadline | None = None,
+        **kwargs: Any,
+    ) -> T:
+        """Call ``fn(*args, **kwargs)`` in a slot; ``deadline`` is also passed to ``fn``."""
+        if deadline is not None:
+            kwargs["deadline"] = deadline
+        with self.slot(priority=priority, tenant=tenant, deadline=deadline):
+            return fn(*args, **kwargs)
+
+    def backend(
+        self, inner: ModelBackend, *, priority: Priority = "bulk", tenant: str = "default"
+    ) -> ScheduledBackend:
+        """Wrap ``inner`` so each of its model calls runs in a slot of this scheduler."""
+        return ScheduledBackend(inner, self, priority=priority, tenant=tenant)
+
+    def stats(self) -> dict[Priority, LaneStats]:
+        with self._lock:
+            return {
+                p: LaneStats(
+                    queued=self._depth[p],
+                    in_flight=self._in_flight[p],
+                    wait_p50=_percentile(list(self._waits[p]), 0.50),
+                    wait_p95=_percentile(list(self._waits[p]), 0.95),
+                )
+                for p in PRIORITIES
+            }
+
+
+class ScheduledBackend:
+    """A ModelBackend whose calls wait for a scheduler slot first.
+
+    A request ``timeout`` (from the caller's deadline) also bounds the wait;
+    the inner call gets whatever is left of it.
+    """
+
+    def __init__(
+        self,
+        inner: ModelBackend,
+        scheduler: Scheduler,
+        *,
+        priority: Priority = "bulk",
+        tenant: str = "default",
+    ) -> None:
+        self._inner = inner
+        self._scheduler = scheduler
+        self.priority = priority
+        self.tenant = tenant
+        self.key = backend_key(inner)  # scheduling never changes the answer
+
+    def complete(self, **request: Any) -> ChatCompletion:
+        timeout = request.get("timeout")
+        deadline = None if timeout is None else Deadline.after(timeout)
+        with self._scheduler.slot(priority=self.priority, tenant=self.tenant, deadline=deadline):
+            request.update(request_timeout(deadline, "model call"))
+            return self._inner.complete(**request)
+
+    def stream(self, **request: Any) -> Iterator[str]:
+        """Stream from the inner backend, holding the slot until the stream is closed."""
+        timeout = request.get("timeout")
+        deadline = None if timeout is None else Deadline.after(timeout)
+        with self._scheduler.slot(priority=self.priority, tenant=self.tenant, deadline=deadline):
+            request.update(request_timeout(deadline, "model call"))
+            yield from stream_completion(self._inner, **request)
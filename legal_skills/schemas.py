@@ -0,0 +1,129 @@
+"""Strict JSON-schema response formats derived from the Pydantic models.
+
+OpenAI structured outputs only accept a subset of JSON Schema in strict mode:
+every property must be listed in ``required``, ``additionalProperties`` must be
+false, and keywords such as ``default`` and ``title`` are not allowed. The
+helpers here convert ``model_json_schema()`` output into that form once per
+model and cache the result.
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any
+
+from pydantic import BaseModel
+
+# Fields set by the skill itself rather than read from the document.
+NON_EXTRACTED_FIELDS = frozenset({"file_path", "sources"})
+
+_UNSUPPORTED_KEYWORDS = frozenset({"title", "default", "description"})
+
+
+def _strictify(node: Any) -> Any:
+    """Recursively drop unsupported keywords and simplify nullable scalars."""
+    if isinstance(node, list):
+        return [_strictify(item) for item in node]
+    if not isinstance(node, dict):
+        return node
+
+    node = {key: _strictify(value) for key, value in node.items() if key not in _UNSUPPORTED_KEYWORDS}
+    variants = node.get("anyOf")
+    if variants and all(set(v) == {"type"} for v in variants):
+        # {"anyOf": [{"type": "string"}, {"type": "null"}]} -> {"type": ["string", "null"]}
+        del node["anyOf"]
+        node["type"] = [v["type"] for v in variants]
+    if node.get("type") == "object":
+        node["required"] = list(node.get("properties", {}))
+        node["additionalProperties"] = False
+    return node
+
+
+def _object_schema(model: type[BaseModel], fields: tuple[str, ...] | None = None) -> dict:
+    """Build the strict object schema for the extractable fields of ``model``.
+
+    When ``fields`` is given, only those properties are included.
+    """
+    schema = model.model_json_schema()
+    properties = {
+        name: prop
+        for name, prop in schema["properties"].items()
+        if name not in NON_EXTRACTED_FIELDS and (fields is None or name in fields)
+    }
+    return _strictify({"type": "object", "properties": properties})
+
+
+@lru_cache(maxsize=None)
+def response_format(model: type[BaseModel]) -> dict:
+    """Return a strict ``json_schema`` response format for a single ``model`` object.
+
+    The returned dict is cached and shared; do not mutate it.
+    """
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": model.__name__,
+            "strict": True,
+            "schema": _object_schema(model),
+        },
+    }
+
+
+@lru_cache(maxsize=None)
+def field_response_format(model: type[BaseModel], fields: tuple[str, ...]) -> dict:
+    """Return a strict response format covering only ``fields`` of ``model``.
+
+    Used for targeted re-extraction. The returned dict is cached and shared;
+    do not mutate it.
+    """
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": f"{model.__name__}Fields",
+            "strict": True,
+            "schema": _object_schema(model, fields),
+        },
+    }
+
+
+@lru_cache(maxsize=None)
+def packed_response_format(model: type[BaseModel]) -> dict:
+    """Return a strict response format for an indexed ``results`` array of ``model``.
+
+    Matches the shape parsed by ``legal_skills.packing.parse_indexed_results``.
+    The returned dict is cached and shared; do not mutate it.
+    """
+    item = _object_schema(model)
+    item["properties"] = {"index": {"type": "integer"}, **item["properties"]}
+    item["required"] = list(item["properties"])
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": f"Packed{model.__name__}",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {"results": {"type": "array", "items": item}},
+                "required": ["results"],
+                "additionalProperties": False,
+            },
+        },
+    }
+
+
+class RefusalError(ValueError):
+    """The model declined to answer, so the response has no structured content."""
+
+
+def response_content(response: Any) -> str:
+    """Return the content of a chat completion, raising RefusalError when there is none.
+
+    With strict structured outputs a refusal has ``content`` None and the
+    reason in ``message.refusal``. RefusalError is a ValueError, so callers
+    that retry, fall back or escalate on malformed responses handle it too.
+    """
+    message = response.choices[0].message
+    if isinstance(message.content, str):
+        return message.content
+    refusal = getattr(message, "refusal", None)
+    raise RefusalError(f"Model refused: {refusal}" if refusal else "Model returned no content")
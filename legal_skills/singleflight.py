@@ -0,0 +1,186 @@
+"""Single-flight deduplication of concurrent identical skill calls.
+
+When two callers ask for the same skill on the same bytes with the same
+options while the first call is still running, the second waits for the
+first call's result instead of rendering the image and calling the model
+again. Works across threads and asyncio tasks: every in-flight call is a
+``concurrent.futures.Future`` that threads block on and coroutines await.
+
+Only concurrent calls are collapsed; nothing is cached after a call finishes.
+Followers increment ``singleflight.<skill>.shared`` in ``legal_skills.metrics``.
+
+Deadlines are per caller: a follower waits only until its own deadline (or
+until it is cancelled, checked every ``_WAIT_SLICE`` seconds), and if the
+leader's call was cancelled or ran out of its (shorter) deadline, the
+follower runs the call again instead of inheriting that failure.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import hashlib
+import os
+import threading
+from collections.abc import Callable, Hashable
+from concurrent.futures import Future
+from typing import Any, TypeVar
+
+from legal_skills import metrics
+from legal_skills.artifact_cache import content_digest
+from legal_skills.deadline import Deadline, OperationCancelled
+
+T = TypeVar("T")
+
+_WAIT_SLICE = 0.05
+
+
+def _wait_timeout(deadline: Deadline | None) -> float | None:
+    """Timeout for one wait on a shared call; raises once ``deadline`` is cancelled or past.
+
+    Waits are sliced so that a cancel-only ``Deadline()`` is noticed too.
+    """
+    if deadline is None:
+        return None
+    return min(_WAIT_SLICE, deadline.check("singleflight: waiting for a shared call"))
+
+
+class SingleFlight:
+    """Registry of in-flight calls keyed by request identity."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, Future] = {}
+
+    def _join(self, key: Hashable, metric: str | None) -> tuple[Future, bool]:
+        """Return the future for ``key`` and whether the caller must run the call.
+
+        When ``metric`` is given, increments ``<metric>.calls`` for leaders and
+        ``<metric>.shared`` for callers that join an in-flight call.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self._calls[key] = future
+        if metric is not None:
+            metrics.increment(f"{metric}.{'calls' if is_leader else 'shared'}")
+        return future, is_leader
+
+    def _lead(self, key: Hashable, future: Future, fn: Callable[[], T]) -> None:
+        """Run ``fn`` and publish its outcome to every waiter."""
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], T],
+        *,
+        metric: str | None = None,
+        deadline: Deadline | None = None,
+    ) -> T:
+        """Run ``fn`` unless an identical call is in flight; return the shared result."""
+        while True:
+            future, is_leader = self._join(key, metric)
+            if is_leader:
+                self._lead(key, future, fn)
+                return future.result()
+            # Not future.result(timeout): its TimeoutError is indistinguishable
+            # from a DeadlineExceeded raised by the leader.
+            while not concurrent.futures.wait([future], _wait_timeout(deadline)).done:
+                pass
+            try:
+                return future.result()
+            except OperationCancelled:
+                if deadline is not None:
+                    deadline.check("singleflight")
+
+    async def do_async(
+        self,
+        key: Hashable,
+        fn: Callable[[], T],
+        *,
+        metric: str | None = None,
+        deadline: Deadline | None = None,
+    ) -> T:
+        """Async variant of ``do``: the leader runs blocking ``fn`` in the default executor.
+
+        If the awaiting task is cancelled, the call still completes for other waiters.
+        """
+        while True:
+            future, is_leader = self._join(key, metric)
+            if is_leader:
+                loop = asyncio.get_running_loop()
+                loop.run_in_executor(None, self._lead, key, future, fn)
+            shared = asyncio.shield(asyncio.wrap_future(future))
+            while not (await asyncio.wait({shared}, timeout=_wait_timeout(deadline)))[0]:
+                pass
+            try:
+                return shared.result()
+            except OperationCancelled:
+                if is_leader:
+                    raise
+                if deadline is not None:
+                    deadline.check("singleflight")
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+_registry = SingleFlight()
+
+
+_Document = str | os.PathLike[str] | bytes | memoryview
+
+
+def request_key(skill: str, file_path: _Document | list[_Document], *options: Any) -> str | None:
+    """Key identifying a skill call by document path, content and options.
+
+    ``file_path`` may also be the document's bytes, or a list of documents
+    sent together. The path is part of the key because results carry it:
+    two files with the same content are separate calls. Callers passing
+    bytes include their source id in ``options``, and pass a backend as its
+    ``backends.backend_key``. File contents are hashed with
+    ``artifact_cache.content_digest``, which the artifact cache reuses.
+    Returns None when a file cannot be read, so the call runs
+    undeduplicated and reports its own error.
+    """
+    digest = hashlib.sha256(repr((skill, options)).encode("utf-8"))
+    for document in file_path if isinstance(file_path, list) else [file_path]:
+        if not isinstance(document, (bytes, memoryview)):
+            digest.update(os.fsencode(os.path.abspath(document)) + b"\0")
+        try:
+            digest.update(content_digest(document))
+        except OSError:
+            return None
+    return digest.hexdigest()
+
+
+def run_once(
+    skill: str, key: str | None, fn: Callable[[], T], *, deadline: Deadline | None = None
+) -> T:
+    """Run ``fn`` through the process-wide registry; key None disables deduplication."""
+    if key is None:
+        return fn()
+    return _registry.do(key, fn, metric=f"singleflight.{skill}", deadline=deadline)
+
+
+async def run_once_async(
+    skill: str, key: str | None, fn: Callable[[], T], *, deadline: Deadline | None = None
+) -> T:
+    """Async ``run_once`` for asyncio callers; ``fn`` runs in the default executor."""
+    if key is None:
+        return await asyncio.get_running_loop().run_in_executor(None, fn)
+    return await _registry.do_async(
+        key, fn, metric=f"singleflight.{skill}", deadline=deadline
+    )
@@ -0,0 +1,42 @@
+"""Load the skill entry points from their script folders.
+
+The skills live in hyphenated folders (``doc-classifier/scripts`` etc.) rather
+than in a package, so library code that runs them — job queues, workers,
+orchestration — imports them the same way the tests do: by putting each
+``scripts/`` directory on ``sys.path``.
+"""
+
+from __future__ import annotations
+
+import importlib
+import sys
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# skill name -> (skill folder, script module, entry point function)
+SKILLS: dict[str, tuple[str, str, str]] = {
+    "classify": ("doc-classifier", "classify", "classify_document"),
+    "extract_dl": ("dl-extractor", "extract_dl", "extract_dl"),
+    "extract_insurance": ("insurance-extractor", "extract_insurance", "extract_insurance"),
+    "validate": ("doc-validator", "validate", "validate_documents"),
+}
+
+
+def load_skill_module(name: str) -> Any:
+    """Import and return the script module for skill ``name``."""
+    try:
+        folder, module_name, _ = SKILLS[name]
+    except KeyError:
+        raise ValueError(f"Unknown skill: {name}") from None
+    scripts_dir = str(PROJECT_ROOT / folder / "scripts")
+    if scripts_dir not in sys.path:
+        sys.path.insert(0, scripts_dir)
+    return importlib.import_module(module_name)
+
+
+def load_skill(name: str) -> Callable[..., Any]:
+    """Return the entry point function for skill ``name``, e.g. ``classify_document``."""
+    return getattr(load_skill_module(name), SKILLS[name][2])
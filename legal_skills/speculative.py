@@ -0,0 +1,162 @@
+"""Speculative extraction that runs alongside classification.
+
+The normal flow calls classify, then the matching extractor, so latency is the
+sum of two model calls. In speculative mode the likely extractor (or both)
+starts at the same time as classification. Once the classification is known,
+the matching extraction is kept and the others are discarded.
+
+Every speculative extraction runs with its own cancellable deadline (a child
+of the caller's, or a plain cancellation token without one), which is
+cancelled when the extraction is discarded. A discarded call that has not yet
+sent its model request gives up at its next checkpoint and spends no tokens;
+one already waiting on the model runs to the end and its result is dropped.
+
+Counters in ``legal_skills.metrics``:
+- ``speculative.hits``: the needed extraction was already running.
+- ``speculative.misses``: it was not speculated and ran after classification.
+- ``speculative.cancelled``: discarded calls that stopped at a checkpoint.
+- ``speculative.wasted``: discarded calls that ran to the end anyway.
+
+The last two are counted when the discarded call finishes, which may be
+after ``classify_and_extract`` returns.
+"""
+
+from __future__ import annotations
+
+import re
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Literal
+
+from PIL import Image
+
+from legal_skills import metrics
+from legal_skills.deadline import Deadline, DeadlineExceeded, OperationCancelled
+from legal_skills.models import ClassificationResult, DriverLicenseData, InsuranceData
+from legal_skills.skills import load_skill
+
+DocumentType = Literal["driver_license", "insurance"]
+
+_FILENAME_HINTS: dict[DocumentType, re.Pattern[str]] = {
+    "driver_license": re.compile(r"(^|[^a-z])(dl|licen[cs]e|driver)([^a-z]|$)"),
+    "insurance": re.compile(r"(^|[^a-z])(ins|insurance|policy|declarations?)([^a-z]|$)"),
+}
+
+# ID-1 cards (85.6 x 54 mm) have an aspect ratio of about 1.59.
+_CARD_ASPECT = (1.4, 1.8)
+
+
+def guess_document_type(file_path: str) -> DocumentType | None:
+    """Cheaply guess the document type from the filename, then the image shape.
+
+    Returns None when there is no usable hint. The aspect check only reads
+    the image header; card-shaped images suggest a driver license and
+    portrait pages suggest insurance paperwork. PDFs are not inspected.
+    """
+    name = Path(file_path).stem.lower()
+    matches = [doc_type for doc_type, pattern in _FILENAME_HINTS.items() if pattern.search(name)]
+    if len(matches) == 1:
+        return matches[0]
+
+    if Path(file_path).suffix.lower() not in (".jpg", ".jpeg", ".png"):
+        return None
+    try:
+        with Image.open(file_path) as img:
+            width, height = img.size
+    except OSError:
+        return None
+    aspect = max(width, height) / min(width, height)
+    if _CARD_ASPECT[0] <= aspect <= _CARD_ASPECT[1]:
+        return "driver_license"
+    if height > width:
+        return "insurance"
+    return None
+
+
+def _count_discarded(future: Future) -> None:
+    error = None if future.cancelled() else future.exception()
+    stopped = future.cancelled() or (
+        isinstance(error, OperationCancelled) and not isinstance(error, DeadlineExceeded)
+    )
+    metrics.increment("speculative.cancelled" if stopped else "speculative.wasted")
+
+
+@dataclass(frozen=True)
+class SpeculativeResult:
+    """Classification plus the extraction that matched it (None for unknown documents)."""
+
+    classification: ClassificationResult
+    extraction: DriverLicenseData | InsuranceData | None
+    speculated: tuple[DocumentType, ...]
+
+
+def classify_and_extract(
+    file_path: str,
+    *,
+    prior: Literal["guess", "both"] = "guess",
+    classify: Callable[[str], ClassificationResult] | None = None,
+    extractors: dict[DocumentType, Callable[[str], DriverLicenseData | InsuranceData]]
+    | None = None,
+    deadline: Deadline | None = None,
+) -> SpeculativeResult:
+    """Classify a document while speculatively extracting it; return the committed result.
+
+    prior="guess" speculates only on the extractor suggested by
+    ``guess_document_type`` (or both when there is no hint); prior="both"
+    always runs both extractors. ``classify`` and ``extractors`` default to
+    the skills. Extractors are always passed a ``deadline`` keyword, so that
+    discarded calls can be cancelled; ``classify`` only gets one when
+    ``deadline`` is given. Errors from discarded speculative calls are ignored.
+    """
+    classify = classify or load_skill("classify")
+    extractors = extractors or {
+        "driver_license": load_skill("extract_dl"),
+        "insurance": load_skill("extract_insurance"),
+    }
+    guess = guess_document_type(file_path) if prior == "guess" else None
+    speculated: tuple[DocumentType, ...] = (guess,) if guess else ("driver_license", "insurance")
+    deadlines: dict[DocumentType, Deadline] = {
+        doc_type: Deadline() if deadline is None else deadline.child()
+        for doc_type in ("driver_license", "insurance")
+    }
+
+    def call(fn: Callable, call_deadline: Deadline | None) -> Any:
+        if call_deadline is None:
+            return fn(file_path)
+        return fn(file_path, deadline=call_deadline)
+
+    pool = ThreadPoolExecutor(max_workers=1 + len(speculated), thread_name_prefix="speculative")
+    try:
+        classification_future = pool.submit(call, classify, deadline)
+        extraction_futures: dict[DocumentType, Future] = {
+            doc_type: pool.submit(call, extractors[doc_type], deadlines[doc_type])
+            for doc_type in speculated
+        }
+        classification = classification_future.result()
+        document_type = classification.document_type
+
+        for doc_type, future in extraction_futures.items():
+            if doc_type == document_type:
+                continue
+            deadlines[doc_type].cancel()
+            future.add_done_callback(_count_discarded)
+
+        if document_type == "unknown":
+            extraction = None
+        elif document_type in extraction_futures:
+            metrics.increment("speculative.hits")
+            extraction = extraction_futures[document_type].result()
+        else:
+            metrics.increment("speculative.misses")
+            extraction = call(extractors[document_type], deadlines[document_type])
+    finally:
+        # Do not wait for discarded speculative calls still in flight.
+        for child in deadlines.values():
+            child.cancel()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    return SpeculativeResult(
+        classification=classification, extraction=extraction, speculated=speculated
+    )
@@ -0,0 +1,217 @@
+"""Incremental delivery of extracted fields from a streamed model response.
+
+With ``stream=True`` the model's JSON object arrives a few characters at a
+time. ``ObjectStreamParser`` scans the text as it arrives and reports each
+top-level member as soon as its value is complete, so a caller can show the
+name while the VIN is still being generated. Reading stops as soon as the
+object closes.
+
+``FieldStream`` ties a stream of content chunks to a result model:
+
+    with extract_dl_stream(path) as stream:
+        for field, value in stream:
+            show(field, value)
+        data = stream.result()  # validated DriverLicenseData
+
+Leaving the ``with`` block (or dropping the stream) closes the response, so
+a caller that stops after the first few fields does not keep it open.
+
+Counters in ``legal_skills.metrics`` (per skill): ``streaming.<skill>.calls``
+and ``streaming.<skill>.first_field_ms`` (total time to the first field).
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import time
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any, Generic, TypeVar
+
+import openai
+from pydantic import BaseModel, ValidationError
+
+from legal_skills import metrics
+from legal_skills.schemas import RefusalError
+
+M = TypeVar("M", bound=BaseModel)
+
+
+class ObjectStreamParser:
+    """Parse a JSON object fed in chunks, yielding each top-level member once complete.
+
+    Members are complete when the ``,`` or ``}`` after their value arrives.
+    Text after the closing brace is ignored.
+    """
+
+    def __init__(self) -> None:
+        self._buffer = ""
+        self._pos = 0  # next character to scan
+        self._start: int | None = None  # index of the opening brace
+        self._member_start = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._end: int | None = None  # index just past the closing brace
+        self.fields: dict[str, Any] = {}
+
+    @property
+    def done(self) -> bool:
+        """Whether the object's closing brace has been seen."""
+        return self._end is not None
+
+    def feed(self, text: str) -> list[tuple[str, Any]]:
+        """Add ``text`` and return the members it completed, in order.
+
+        Raises json.JSONDecodeError if the text cannot be the start of an object.
+        """
+        if self.done:
+            return []
+        self._buffer += text
+        completed = []
+        buffer = self._buffer
+        while self._pos < len(buffer) and not self.done:
+            char = buffer[self._pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif self._start is None:
+                if char == "{":
+                    self._start = self._pos
+                    self._member_start = self._pos + 1
+                    self._depth = 1
+                elif not char.isspace():
+                    raise json.JSONDecodeError("Expected '{'", buffer, self._pos)
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    completed.extend(self._member(self._pos))
+                    self._end = self._pos + 1
+            elif char == "," and self._depth == 1:
+                completed.extend(self._member(self._pos))
+                self._member_start = self._pos + 1
+            self._pos += 1
+        return completed
+
+    def _member(self, end: int) -> list[tuple[str, Any]]:
+        text = self._buffer[self._member_start : end]
+        if not text.strip():
+            return []  # empty object
+        ((key, value),) = json.loads("{" + text + "}").items()
+        self.fields[key] = value
+        return [(key, value)]
+
+    def close(self) -> dict[str, Any]:
+        """Return the complete object; raises json.JSONDecodeError if it never closed."""
+        if not self.done:
+            raise json.JSONDecodeError("Unterminated object", self._buffer, len(self._buffer))
+        return json.loads(self._buffer[self._start : self._end])
+
+
+class FieldStream(Generic[M]):
+    """Fields of a streamed extraction, then the validated model.
+
+    Iterating yields ``(field, value)`` pairs as each completes. ``result()``
+    reads whatever is left and returns the model built by ``build``. Use it
+    as a context manager to close the response early. Parse and validation
+    failures count as ``parse_failures.<skill>``, like the non-streaming call.
+    """
+
+    def __init__(
+        self, chunks: Iterable[str], build: Callable[[dict[str, Any]], M], *, skill: str
+    ) -> None:
+        self._chunks = iter(chunks)
+        self._build = build
+        self._skill = skill
+        self._parser = ObjectStreamParser()
+        self._pending: list[tuple[str, Any]] = []
+        self._result: M | None = None
+        self._started = time.monotonic()
+        self._first_field_seen = False
+        metrics.increment(f"streaming.{skill}.calls")
+
+    @property
+    def fields(self) -> dict[str, Any]:
+        """Fields completed so far, not yet validated."""
+        return dict(self._parser.fields)
+
+    def __iter__(self) -> Iterator[tuple[str, Any]]:
+        while True:
+            while self._pending:
+                yield self._pending.pop(0)
+            if self._parser.done:
+                return
+            if not self._read():
+                return
+
+    def _read(self) -> bool:
+        """Feed the next chunk to the parser; return False when the stream has ended."""
+        try:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return False
+            completed = self._parser.feed(chunk)
+        except openai.OpenAIError as e:
+            print(f"OpenAI API call failed: {e}", file=sys.stderr)
+            raise
+        except RefusalError as e:
+            metrics.increment(f"refusals.{self._skill}")
+            print(f"OpenAI declined to answer: {e}", file=sys.stderr)
+            raise
+        except json.JSONDecodeError as e:
+            metrics.increment(f"parse_failures.{self._skill}")
+            print(f"Failed to parse OpenAI response as JSON: {e}", file=sys.stderr)
+            raise
+        if completed and not self._first_field_seen:
+            self._first_field_seen = True
+            elapsed_ms = round((time.monotonic() - self._started) * 1000)
+            metrics.increment(f"streaming.{self._skill}.first_field_ms", elapsed_ms)
+        self._pending.extend(completed)
+        if self._parser.done:
+            self.close()  # stop reading as soon as the object is complete
+        return True
+
+    def close(self) -> None:
+        """Stop reading the underlying stream, releasing any scheduler slot it holds."""
+        close = getattr(self._chunks, "close", None)
+        if close is not None:
+            close()
+
+    def __enter__(self) -> FieldStream[M]:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def __del__(self) -> None:
+        if hasattr(self, "_chunks"):
+            self.close()
+
+    def result(self) -> M:
+        """Read the rest of the stream and return the validated model."""
+        if self._result is not None:
+            return self._result
+        while not self._parser.done and self._read():
+            pass
+        self._pending.clear()
+        try:
+            self._result = self._build(self._parser.close())
+        except json.JSONDecodeError as e:
+            metrics.increment(f"parse_failures.{self._skill}")
+            print(f"Failed to parse OpenAI response as JSON: {e}", file=sys.stderr)
+            raise
+        except ValidationError as e:
+            metrics.increment(f"parse_failures.{self._skill}")
+            print(f"OpenAI response failed Pydantic validation: {e}", file=sys.stderr)
+            raise
+        finally:
+            self.close()
+        return self._result
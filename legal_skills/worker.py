@@ -0,0 +1,115 @@
+"""Worker process that executes tasks from a shared job queue.
+
+Any number of workers, on one host or several hosts sharing the queue file,
+can run against the same queue. Each claimed task is leased to one worker, and
+a background heartbeat keeps the lease alive while the skill runs, so tasks are
+not double-processed unless a worker dies.
+
+Usage:
+    python -m legal_skills.worker <queue.db> [--concurrency N] [--idle-exit SECONDS] [--shared]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import socket
+import sys
+import threading
+import time
+from collections.abc import Callable, Mapping
+from pathlib import Path
+from typing import Any
+
+from legal_skills.jobqueue import DEFAULT_LEASE_SECONDS, JobQueue, skill_handlers
+
+DEFAULT_POLL_INTERVAL = 1.0
+
+
+def default_worker_id() -> str:
+    """Identify a worker by host and process id, e.g. ``web-3:4121``."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def run_worker(
+    queue_path: str | Path,
+    *,
+    handlers: Mapping[str, Callable[[dict[str, Any]], Any]] | None = None,
+    worker_id: str | None = None,
+    concurrency: int = 1,
+    lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+    idle_exit: float | None = None,
+    shared: bool = False,
+    stop: threading.Event | None = None,
+) -> int:
+    """Process tasks from the queue at ``queue_path``; return how many this worker ran.
+
+    Runs ``concurrency`` threads, each claiming one task at a time. When the
+    queue is empty, threads poll every ``poll_interval`` seconds; they exit once
+    the queue has been idle for ``idle_exit`` seconds (never, if None) or when
+    ``stop`` is set. ``shared=True`` opens the queue without WAL journaling,
+    for queue files on a network volume.
+    """
+    handlers = handlers if handlers is not None else skill_handlers()
+    worker_id = worker_id or default_worker_id()
+    stop = stop or threading.Event()
+    queue = JobQueue(
+        queue_path, lease_seconds=lease_seconds, journal_mode="DELETE" if shared else "WAL"
+    )
+    processed = 0
+    processed_lock = threading.Lock()
+
+    def loop(thread_id: str) -> None:
+        nonlocal processed
+        idle_since = time.monotonic()
+        while not stop.is_set():
+            task = queue.claim(thread_id, kinds=tuple(handlers))
+            if task is None:
+                if idle_exit is not None and time.monotonic() - idle_since >= idle_exit:
+                    return
+                stop.wait(poll_interval)
+                continue
+            queue.execute(task, handlers[task.kind], thread_id)
+            with processed_lock:
+                processed += 1
+            idle_since = time.monotonic()
+
+    threads = [
+        threading.Thread(target=loop, args=(worker_id if concurrency == 1 else f"{worker_id}/{i}",))
+        for i in range(concurrency)
+    ]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        queue.close()
+    return processed
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Run skill tasks from a shared job queue.")
+    parser.add_argument("queue", help="Path to the SQLite queue file")
+    parser.add_argument("--worker-id", default=None)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--lease-seconds", type=float, default=DEFAULT_LEASE_SECONDS)
+    parser.add_argument("--idle-exit", type=float, default=None)
+    parser.add_argument("--shared", action="store_true", help="Queue file is on a network volume")
+    args = parser.parse_args(argv)
+
+    processed = run_worker(
+        args.queue,
+        worker_id=args.worker_id,
+        concurrency=args.concurrency,
+        lease_seconds=args.lease_seconds,
+        idle_exit=args.idle_exit,
+        shared=args.shared,
+    )
+    print(f"Processed {processed} tasks", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""Tests for the content-addressed cache of preprocessed image payloads."""
+
+import os
+from unittest.mock import patch
+
+import pytest
+from PIL import Image
+
+from legal_skills import image_utils, metrics
+from legal_skills.artifact_cache import ArtifactCache, artifact_key
+from legal_skills.image_utils import TieredRenderer, file_to_base64_image, unreadable_only
+
+
+@pytest.fixture(autouse=True)
+def _reset_metrics() -> None:
+    metrics.reset()
+
+
+def test_key_depends_on_content_and_options(tmp_path) -> None:
+    a, b = tmp_path / "a.png", tmp_path / "b.png"
+    a.write_bytes(b"same")
+    b.write_bytes(b"same")
+
+    assert artifact_key(a, {"max_side": None}) == artifact_key(b, {"max_side": None})
+    assert artifact_key(a, {"max_side": None}) != artifact_key(a, {"max_side": 512})
+    b.write_bytes(b"changed")
+    assert artifact_key(a, {"max_side": None}) != artifact_key(b, {"max_side": None})
+
+
+def test_put_get_and_evict_least_recently_used(tmp_path) -> None:
+    cache = ArtifactCache(tmp_path / "cache", max_bytes=250)
+    cache.put("aa01", "x" * 100)
+    cache.put("bb02", "y" * 100)
+    # Make aa01 older than bb02, then use it so bb02 becomes least recently used.
+    os.utime(cache._path("aa01"), (1, 1))
+    os.utime(cache._path("bb02"), (2, 2))
+    assert cache.get("aa01") == "x" * 100
+
+    cache.put("cc03", "z" * 100)
+
+    assert cache.get("bb02") is None
+    assert cache.get("cc03") == "z" * 100
+    assert cache.size_bytes() <= 250
+    assert metrics.get("artifact_cache.evictions") == 1
+
+
+def test_file_to_base64_image_skips_rendering_on_hit(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("LEGAL_SKILLS_ARTIFACT_CACHE_DIR", str(tmp_path / "cache"))
+    path = tmp_path / "card.png"
+    Image.new("RGB", (300, 200), "white").save(path)
+
+    first = file_to_base64_image(str(path), auto_rotate=True)
+    with patch.object(
+        image_utils, "_render_base64_image", wraps=image_utils._render_base64_image
+    ) as render:
+        second = file_to_base64_image(str(path), auto_rotate=True)
+        render.assert_not_called()
+        file_to_base64_image(str(path), max_side=100)
+        render.assert_called_once()
+
+    assert second == first
+    assert metrics.get("artifact_cache.hits") == 1
+    assert metrics.get("artifact_cache.misses") == 2
+
+
+def test_cache_hits_count_as_quality_gate_passes(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("LEGAL_SKILLS_ARTIFACT_CACHE_DIR", str(tmp_path / "cache"))
+    path = tmp_path / "card.png"
+    card = Image.new("RGB", (300, 200), "white")
+    card.paste("black", (50, 50, 250, 150))
+    card.save(path)
+    gate = unreadable_only("test")
+
+    file_to_base64_image(str(path), quality=gate)
+    file_to_base64_image(str(path), quality=gate)
+    with TieredRenderer([str(path)], quality=gate) as renderer:
+        renderer.encode(None)
+        renderer.encode(None)
+
+    assert metrics.get("artifact_cache.hits") == 3
+    assert metrics.get("quality_gate.test.passed") == 3
+
+
+def test_tiered_renderer_shares_entries_with_file_to_base64_image(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("LEGAL_SKILLS_ARTIFACT_CACHE_DIR", str(tmp_path / "cache"))
+    path = tmp_path / "card.png"
+    Image.new("RGB", (1200, 800), "white").save(path)
+    low = file_to_base64_image(str(path), auto_rotate=True, max_side=512)
+
+    with patch.object(image_utils, "_render_image", wraps=image_utils._render_image) as render:
+        with TieredRenderer([str(path)], auto_rotate=True) as renderer:
+            assert renderer.encode(512) == [low]
+            render.assert_not_called()
+            high = renderer.encode(None)
+
+    assert high == [file_to_base64_image(str(path), auto_rotate=True)]
+    assert metrics.get("artifact_cache.hits") == 2
+
+
+def test_overwrites_are_not_double_counted(tmp_path) -> None:
+    cache = ArtifactCache(tmp_path / "cache", max_bytes=250)
+    cache.put("aa01", "x" * 100)
+    cache.put("bb02", "y" * 100)
+    cache.put("aa01", "x" * 100)  # same key again, e.g. two processes racing
+
+    assert metrics.get("artifact_cache.evictions") == 0
+    assert cache.get("bb02") == "y" * 100
+
+
+def test_budget_holds_across_processes_sharing_a_directory(tmp_path) -> None:
+    # Two instances stand in for two worker processes: neither sees the other's writes.
+    first = ArtifactCache(tmp_path / "cache", max_bytes=250)
+    second = ArtifactCache(tmp_path / "cache", max_bytes=250)
+    first.put("aa01", "x" * 100)
+    second.put("bb02", "y" * 100)
+    first.put("cc03", "z" * 100)
+
+    assert metrics.get("artifact_cache.evictions") == 1
+    assert first.size_bytes() <= 250
+
+
+def test_write_errors_do_not_fail_the_render(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("LEGAL_SKILLS_ARTIFACT_CACHE_DIR", str(tmp_path / "cache"))
+    path = tmp_path / "card.png"
+    Image.new("RGB", (300, 200), "white").save(path)
+
+    with patch("legal_skills.artifact_cache.tempfile.mkstemp", side_effect=OSError(28, "full")):
+        assert file_to_base64_image(str(path))
+
+    assert metrics.get("artifact_cache.write_errors") == 1
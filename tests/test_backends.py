@@ -0,0 +1,203 @@
+"""Tests for model backends and record/replay cassettes."""
+
+import json
+from unittest.mock import MagicMock, patch
+
+import openai
+import pytest
+from openai.types.chat import ChatCompletion
+
+from classify import classify_document
+from legal_skills.backends import (
+    CassetteMissError,
+    OpenAIBackend,
+    RecordingBackend,
+    ReplayBackend,
+    default_backend,
+    request_fingerprint,
+    stream_completion,
+)
+from legal_skills.deadline import DeadlineExceeded
+
+
+def _completion(content: str) -> ChatCompletion:
+    return ChatCompletion.model_validate(
+        {
+            "id": "chatcmpl-test",
+            "object": "chat.completion",
+            "created": 0,
+            "model": "gpt-4o-mini",
+            "choices": [
+                {
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": content},
+                }
+            ],
+        }
+    )
+
+
+class _FakeBackend:
+    def __init__(self, content: str) -> None:
+        self.content = content
+        self.calls = 0
+
+    def complete(self, **request: object) -> ChatCompletion:
+        self.calls += 1
+        return _completion(self.content)
+
+
+def test_fingerprint_ignores_key_order() -> None:
+    assert request_fingerprint({"a": 1, "b": [1, 2]}) == request_fingerprint({"b": [1, 2], "a": 1})
+    assert request_fingerprint({"a": 1}) != request_fingerprint({"a": 2})
+
+
+def test_openai_backend_delegates_to_client() -> None:
+    client = MagicMock()
+    OpenAIBackend(client).complete(model="m", messages=[])
+    client.chat.completions.create.assert_called_once_with(model="m", messages=[])
+
+
+def test_record_then_replay(tmp_path) -> None:
+    cassette = tmp_path / "run.jsonl"
+    recorder = RecordingBackend(_FakeBackend('{"ok": true}'), cassette)
+    recorder.complete(model="gpt-4o-mini", messages=[{"role": "user", "content": "hi"}])
+
+    replay = ReplayBackend(cassette)
+    response = replay.complete(model="gpt-4o-mini", messages=[{"role": "user", "content": "hi"}])
+
+    assert response.choices[0].message.content == '{"ok": true}'
+    with pytest.raises(CassetteMissError):
+        replay.complete(model="gpt-4o-mini", messages=[{"role": "user", "content": "bye"}])
+
+
+def test_recorded_stream_replays_as_completion(tmp_path) -> None:
+    cassette = tmp_path / "run.jsonl"
+    recorder = RecordingBackend(_FakeBackend('{"ok": true}'), cassette)
+    request = {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "hi"}]}
+
+    assert "".join(stream_completion(recorder, **request)) == '{"ok": true}'
+
+    replay = ReplayBackend(cassette)
+    assert replay.complete(**request).choices[0].message.content == '{"ok": true}'
+    assert list(stream_completion(replay, **request)) == ['{"ok": true}']
+
+
+def test_abandoned_stream_is_not_recorded(tmp_path) -> None:
+    cassette = tmp_path / "run.jsonl"
+
+    class _Chunked:
+        def stream(self, **request):
+            yield '{"first_name": "J'
+            yield 'ohn"}'
+            yield "\n"
+
+    recorder = RecordingBackend(_Chunked(), cassette)
+    partial = recorder.stream(model="m")
+    next(partial)
+    partial.close()
+    assert not cassette.exists()
+
+    whole = recorder.stream(model="m")
+    next(whole), next(whole)
+    whole.close()  # closed by FieldStream as soon as the object is complete
+    assert ReplayBackend(cassette).complete(model="m").choices[0].message.content == (
+        '{"first_name": "John"}'
+    )
+
+
+@patch("legal_skills.backends.time.sleep")
+def test_replay_recorded_latency(mock_sleep: MagicMock, tmp_path) -> None:
+    cassette = tmp_path / "run.jsonl"
+    RecordingBackend(_FakeBackend("{}"), cassette).complete(model="m")
+
+    ReplayBackend(cassette, latency="recorded").complete(model="m")
+
+    mock_sleep.assert_called_once()
+
+
+@patch("classify.file_to_base64_image", return_value="fake_base64")
+def test_skill_replays_offline(mock_image: MagicMock, tmp_path, monkeypatch) -> None:
+    cassette = tmp_path / "classify.jsonl"
+    live = _FakeBackend('{"document_type": "insurance", "confidence": 0.9}')
+    classify_document("/tmp/ins.pdf", backend=RecordingBackend(live, cassette))
+
+    monkeypatch.setenv("LEGAL_SKILLS_BACKEND", "replay")
+    monkeypatch.setenv("LEGAL_SKILLS_CASSETTE", str(cassette))
+    with patch("classify.OpenAI", side_effect=AssertionError("network used")):
+        result = classify_document("/tmp/ins.pdf")
+
+    assert result.document_type == "insurance"
+    assert live.calls == 1
+
+
+def test_default_backend_requires_cassette(monkeypatch) -> None:
+    monkeypatch.setenv("LEGAL_SKILLS_BACKEND", "replay")
+    monkeypatch.delenv("LEGAL_SKILLS_CASSETTE", raising=False)
+    with pytest.raises(ValueError, match="LEGAL_SKILLS_CASSETTE"):
+        default_backend(MagicMock())
+
+
+def test_fingerprint_ignores_timeout() -> None:
+    with_timeout = request_fingerprint({"model": "m", "timeout": 3.2})
+    assert with_timeout == request_fingerprint({"model": "m"})
+
+
+def test_openai_backend_retries_within_budget() -> None:
+    client = MagicMock(max_retries=2)
+    create = client.with_options.return_value.chat.completions.create
+    create.side_effect = [openai.APIConnectionError(request=MagicMock()), _completion("{}")]
+
+    with patch("legal_skills.backends.time.sleep") as mock_sleep:
+        OpenAIBackend(client).complete(model="m", timeout=30.0)
+
+    client.with_options.assert_called_once_with(max_retries=0)
+    assert create.call_count == 2
+    assert 0 < create.call_args.kwargs["timeout"] <= 30.0
+    mock_sleep.assert_called_once()
+
+
+def test_openai_backend_timeout_raises_deadline_exceeded() -> None:
+    client = MagicMock(max_retries=2)
+    create = client.with_options.return_value.chat.completions.create
+    create.side_effect = openai.APITimeoutError(request=MagicMock())
+
+    with pytest.raises(DeadlineExceeded):
+        OpenAIBackend(client).complete(model="m", timeout=5.0)
+    assert create.call_count == 1
+
+
+def test_openai_backend_stream_timeouts() -> None:
+    client = MagicMock(max_retries=2)
+    client.chat.completions.create.side_effect = openai.APITimeoutError(request=MagicMock())
+    response = MagicMock()
+    response.__iter__.side_effect = openai.APITimeoutError(request=MagicMock())
+    client.with_options.return_value.chat.completions.create.return_value = response
+
+    with pytest.raises(openai.APITimeoutError):
+        list(OpenAIBackend(client).stream(model="m"))  # no deadline: the client's error
+    with pytest.raises(DeadlineExceeded):
+        list(OpenAIBackend(client).stream(model="m", timeout=5.0))
+    response.close.assert_called_once()
+
+
+@patch("legal_skills.backends.time.sleep")
+def test_replay_recorded_latency_respects_budget(mock_sleep: MagicMock, tmp_path) -> None:
+    cassette = tmp_path / "run.jsonl"
+    cassette.write_text(
+        json.dumps(
+            {
+                "fingerprint": request_fingerprint({"model": "m"}),
+                "model": "m",
+                "latency": 4.0,
+                "response": _completion("{}").model_dump(mode="json", exclude_unset=True),
+            }
+        )
+        + "\n"
+    )
+
+    replay = ReplayBackend(cassette, latency="recorded")
+    with pytest.raises(DeadlineExceeded):
+        replay.complete(model="m", timeout=1.0)
+    mock_sleep.assert_called_once_with(1.0)
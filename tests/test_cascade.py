@@ -0,0 +1,77 @@
+"""Tests for the cost-tiered extraction cascade."""
+
+import pytest
+from pydantic import BaseModel
+
+from legal_skills import metrics
+from legal_skills.cascade import DEFAULT_TIERS, ImageProfile, missing_fields, run_cascade, tier_fractions
+from legal_skills.deadline import Deadline
+
+
+class _Doc(BaseModel):
+    name: str
+    number: str | None = None
+
+
+@pytest.fixture(autouse=True)
+def _reset_metrics() -> None:
+    metrics.reset()
+
+
+def test_missing_fields_treats_blank_as_missing() -> None:
+    assert missing_fields(_Doc(name=" ", number=None), ["name", "number"]) == ["name", "number"]
+
+
+def test_cascade_stops_at_cheap_tier_when_complete() -> None:
+    seen: list[str] = []
+
+    def attempt(profile: ImageProfile) -> _Doc:
+        seen.append(profile.name)
+        return _Doc(name="John", number="D1")
+
+    result = run_cascade(attempt, skill="test", required_fields=["number"])
+
+    assert result.number == "D1"
+    assert seen == ["low"]
+    assert tier_fractions("test") == {"low": 1.0}
+
+
+def test_cascade_escalates_on_missing_field_and_error() -> None:
+    responses = iter(
+        [_Doc(name="John"), _Doc(name="John", number="D1"), ValueError("bad json"), _Doc(name="John")]
+    )
+
+    def attempt(profile: ImageProfile) -> _Doc:
+        value = next(responses)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    run_cascade(attempt, skill="test", required_fields=["number"])
+    run_cascade(attempt, skill="test", required_fields=["number"])
+
+    assert tier_fractions("test") == {"high": 1.0}
+
+
+def test_cascade_last_tier_error_propagates() -> None:
+    def attempt(profile: ImageProfile) -> _Doc:
+        raise ValueError(profile.name)
+
+    with pytest.raises(ValueError, match=DEFAULT_TIERS[-1].name):
+        run_cascade(attempt, skill="test", required_fields=[])
+
+
+def test_cascade_keeps_incomplete_result_when_deadline_is_near() -> None:
+    seen: list[str] = []
+
+    def attempt(profile: ImageProfile) -> _Doc:
+        seen.append(profile.name)
+        return _Doc(name="John")
+
+    result = run_cascade(
+        attempt, skill="test", required_fields=["number"], deadline=Deadline.after(0.5)
+    )
+
+    assert result.name == "John"
+    assert seen == ["low"]
+    assert metrics.get("cascade.test.deadline") == 1
@@ -1,12 +1,16 @@
 """Tests for doc-classifier skill."""
 
+import asyncio
 import json
+import math
+import time
 from unittest.mock import MagicMock, patch
 
 import pytest
 from openai import OpenAIError
 
-from classify import classify_document
+from classify import classify_document, classify_document_async, classify_documents
+from legal_skills import metrics
 from legal_skills.models import ClassificationResult
 
 
@@ -78,3 +82,168 @@ def test_classify_openai_error(mock_openai_cls: MagicMock, mock_image: MagicMock
 
     with pytest.raises(OpenAIError, match="API error"):
         classify_document("/tmp/test.jpg")
+
+
+def _mock_packed_response(items: list[dict]) -> MagicMock:
+    """Create a mock packed (multi-document) chat completion response."""
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.content = json.dumps({"results": items})
+    return mock_response
+
+
+@patch("classify.file_to_base64_image", return_value="fake_base64")
+@patch("classify.OpenAI")
+def test_classify_documents_packs_batch(mock_openai_cls: MagicMock, mock_image: MagicMock) -> None:
+    mock_client = MagicMock()
+    mock_openai_cls.return_value = mock_client
+    mock_client.chat.completions.create.return_value = _mock_packed_response(
+        [
+            {"index": 1, "document_type": "insurance", "confidence": 0.8},
+            {"index": 0, "document_type": "driver_license", "confidence": 0.9},
+        ]
+    )
+
+    results = classify_documents(["/tmp/a.jpg", "/tmp/b.pdf"])
+
+    assert mock_client.chat.completions.create.call_count == 1
+    content = mock_client.chat.completions.create.call_args.kwargs["messages"][1]["content"]
+    assert sum(part["type"] == "image_url" for part in content) == 2
+    assert [r.file_path for r in results] == ["/tmp/a.jpg", "/tmp/b.pdf"]
+    assert [r.document_type for r in results] == ["driver_license", "insurance"]
+
+
+@patch("classify.file_to_base64_image", return_value="fake_base64")
+@patch("classify.OpenAI")
+def test_classify_documents_falls_back_on_malformed_batch(
+    mock_openai_cls: MagicMock, mock_image: MagicMock
+) -> None:
+    mock_client = MagicMock()
+    mock_openai_cls.return_value = mock_client
+    mock_client.chat.completions.create.side_effect = [
+        _mock_packed_response([{"index": 0, "document_type": "insurance", "confidence": 0.8}]),
+        _mock_openai_response("driver_license", 0.9),
+        _mock_openai_response("unknown", 0.6),
+    ]
+
+    results = classify_documents(["/tmp/a.jpg", "/tmp/b.jpg"])
+
+    assert mock_client.chat.completions.create.call_count == 3
+    assert [r.document_type for r in results] == ["driver_license", "unknown"]
+
+
+@patch("classify.file_to_base64_image", return_value="fake_base64")
+@patch("classify.OpenAI")
+def test_classify_refusal_raises_value_error(
+    mock_openai_cls: MagicMock, mock_image: MagicMock
+) -> None:
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.content = None
+    mock_response.choices[0].message.refusal = "I can't help with that."
+    mock_openai_cls.return_value.chat.completions.create.return_value = mock_response
+
+    with pytest.raises(ValueError, match="Model refused"):
+        classify_document("/tmp/refused.jpg")
+
+
+def _mock_logprob_response(top: dict[str, float]) -> MagicMock:
+    """Create a mock single-token response with the given top logprobs."""
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    candidates = []
+    for token, logprob in top.items():
+        candidate = MagicMock()
+        candidate.token = token
+        candidate.logprob = logprob
+        candidates.append(candidate)
+    mock_response.choices[0].logprobs.content = [MagicMock(top_logprobs=candidates)]
+    return mock_response
+
+
+@patch("classify.file_to_base64_image", return_value="fake_base64")
+@patch("classify.OpenAI")
+def test_classify_logprob_mode(mock_openai_cls: MagicMock, mock_image: MagicMock) -> None:
+    mock_client = MagicMock()
+    mock_openai_cls.return_value = mock_client
+    mock_client.chat.completions.create.return_value = _mock_logprob_response(
+        {"I": math.log(0.6), " I": math.log(0.2), "D": math.log(0.1), "The": math.log(0.1)}
+    )
+
+    result = classify_document("/tmp/test_ins.pdf", mode="logprob")
+
+    assert result.document_type == "insurance"
+    assert result.confidence == pytest.approx(0.8 / 0.9)
+    request = mock_client.chat.completions.create.call_args.kwargs
+    assert request["max_tokens"] == 1
+    assert request["logprobs"] is True
+
+
+@patch("classify.file_to_base64_image", return_value="fake_base64")
+@patch("classify.OpenAI")
+def test_classify_logprob_mode_without_label(mock_openai_cls: MagicMock, mock_image: MagicMock) -> None:
+    mock_client = MagicMock()
+    mock_openai_cls.return_value = mock_client
+    mock_client.chat.completions.create.return_value = _mock_logprob_response({"The": -0.1})
+
+    with pytest.raises(ValueError, match="No classification label"):
+        classify_document("/tmp/test.jpg", mode="logprob")
+
+
+@pytest.mark.parametrize("logprobs", [None, MagicMock(content=[])], ids=["none", "empty"])
+@patch("classify.file_to_base64_image", return_value="fake_base64")
+@patch("classify.OpenAI")
+def test_classify_logprob_mode_without_logprobs(
+    mock_openai_cls: MagicMock, mock_image: MagicMock, logprobs
+) -> None:
+    mock_client = MagicMock()
+    mock_openai_cls.return_value = mock_client
+    response = _mock_logprob_response({})
+    response.choices[0].logprobs = logprobs
+    mock_client.chat.completions.create.return_value = response
+    before = metrics.get("parse_failures.classify")
+
+    with pytest.raises(ValueError, match="no logprobs"):
+        classify_document("/tmp/test.jpg", mode="logprob")
+
+    assert metrics.get("parse_failures.classify") == before + 1
+
+
+@patch("classify.file_to_base64_image", return_value="fake_base64")
+@patch("classify.OpenAI")
+def test_classify_concurrent_identical_calls_share_request(
+    mock_openai_cls: MagicMock, mock_image: MagicMock, tmp_path
+) -> None:
+    path = tmp_path / "dl.jpg"
+    path.write_bytes(b"image bytes")
+    mock_client = MagicMock()
+    mock_openai_cls.return_value = mock_client
+
+    def slow_response(**request: object) -> MagicMock:
+        time.sleep(0.1)
+        return _mock_openai_response("driver_license", 0.95)
+
+    mock_client.chat.completions.create.side_effect = slow_response
+
+    async def main() -> list[ClassificationResult]:
+        return await asyncio.gather(*(classify_document_async(str(path)) for _ in range(3)))
+
+    results = asyncio.run(main())
+
+    assert mock_client.chat.completions.create.call_count == 1
+    assert [r.document_type for r in results] == ["driver_license"] * 3
+
+
+@patch("classify.file_to_base64_image", return_value="fake_base64")
+@patch("classify.OpenAI")
+def test_classify_bytes_with_source_id(mock_openai_cls: MagicMock, mock_image: MagicMock) -> None:
+    mock_client = MagicMock()
+    mock_openai_cls.return_value = mock_client
+    mock_client.chat.completions.create.return_value = _mock_openai_response("insurance", 0.9)
+
+    upload = classify_document(b"%PDF-1.7 upload", source_id="upload-42")
+    anonymous = classify_document(b"%PDF-1.7 upload")
+
+    assert upload.file_path == "upload-42"
+    assert anonymous.file_path is None
+    assert mock_image.call_args.args[0] == b"%PDF-1.7 upload"
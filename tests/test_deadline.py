@@ -0,0 +1,47 @@
+"""Tests for deadlines and cooperative cancellation."""
+
+import time
+
+import pytest
+
+from legal_skills.deadline import (
+    MIN_MODEL_CALL_SECONDS,
+    Deadline,
+    DeadlineExceeded,
+    OperationCancelled,
+    request_timeout,
+    timeout_kwargs,
+)
+
+
+def test_deadline_counts_down_and_raises_when_too_close() -> None:
+    deadline = Deadline.after(0.05)
+
+    assert 0 < deadline.remaining() <= 0.05
+    assert deadline.check("op") > 0
+    with pytest.raises(DeadlineExceeded, match="op"):
+        deadline.check("op", needed=1.0)
+    time.sleep(0.06)
+    with pytest.raises(DeadlineExceeded):
+        deadline.check("op")
+
+
+def test_child_is_bounded_and_cancelled_by_parent() -> None:
+    parent = Deadline.after(10.0)
+    child = parent.child(60.0)
+    sibling = parent.child()
+
+    assert child.at == parent.at
+    sibling.cancel()
+    assert not child.cancelled
+    parent.cancel()
+    with pytest.raises(OperationCancelled, match="cancelled"):
+        child.check("op")
+
+
+def test_timeout_kwargs() -> None:
+    assert timeout_kwargs(None, "op") == {}
+    assert timeout_kwargs(Deadline(), "op") == {}
+    assert timeout_kwargs(Deadline.after(5.0), "op")["timeout"] == pytest.approx(5.0, abs=0.1)
+    with pytest.raises(DeadlineExceeded):
+        request_timeout(Deadline.after(MIN_MODEL_CALL_SECONDS / 2), "op")
@@ -0,0 +1,103 @@
+"""Tests for columnar export of skill results."""
+
+import csv
+
+import pytest
+
+from legal_skills.export import ColumnarWriter, columns_for, export_records, to_row
+from legal_skills.models import (
+    ClassificationResult,
+    DriverLicenseData,
+    FieldDiscrepancy,
+    ValidationReport,
+)
+
+
+def _report(name: str, discrepancies: list[FieldDiscrepancy]) -> ValidationReport:
+    return ValidationReport(
+        person_name=name,
+        name_match=True,
+        dob_match=True,
+        address_match=not discrepancies,
+        match_status="discrepancy" if discrepancies else "match",
+        discrepancies=discrepancies,
+        dl_source="/dl.jpg",
+        insurance_source="/ins.pdf",
+    )
+
+
+def _classification(i: int) -> ClassificationResult:
+    return ClassificationResult(file_path=f"/doc{i}.pdf", document_type="insurance", confidence=0.9)
+
+
+def test_validation_report_is_flattened() -> None:
+    names = [name for name, _ in columns_for(ValidationReport)]
+    assert "discrepancies" not in names
+    assert {"discrepancy_count", "address_dl_value", "address_insurance_value"} <= set(names)
+
+    discrepancy = FieldDiscrepancy(field_name="address", dl_value="1 A St", insurance_value="2 B St")
+    row = to_row(_report("John Smith", [discrepancy]))
+    assert row["discrepancy_count"] == 1
+    assert row["discrepancy_fields"] == "address"
+    assert row["address_insurance_value"] == "2 B St"
+    assert row["name_dl_value"] is None
+
+
+def test_csv_export_appends_in_row_groups(tmp_path) -> None:
+    path = tmp_path / "classifications.csv"
+    records = [_classification(i) for i in range(5)]
+    assert export_records(records, path, ClassificationResult, row_group_size=2) == 5
+    export_records([_classification(5)], path, ClassificationResult)
+
+    with path.open(newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 6
+    assert rows[-1] == {"file_path": "/doc5.pdf", "document_type": "insurance", "confidence": "0.9"}
+
+
+def test_csv_append_rejects_different_schema(tmp_path) -> None:
+    path = tmp_path / "out.csv"
+    export_records([_classification(0)], path, ClassificationResult)
+    with pytest.raises(ValueError, match="columns"):
+        ColumnarWriter(path, ValidationReport)
+
+
+def test_parquet_dataset_append(tmp_path) -> None:
+    pq = pytest.importorskip("pyarrow.parquet")
+    dataset = tmp_path / "reports"
+    export_records([_report("A", [])], dataset, ValidationReport, format="parquet")
+    export_records([_report("B", [])], dataset, ValidationReport, format="parquet")
+
+    table = pq.read_table(dataset)
+    assert table.num_rows == 2
+    assert table.schema.field("discrepancy_count").type == "int64"
+    assert table.schema.field("name_dl_value").nullable
+
+
+def test_parquet_append_never_reuses_a_part_name(tmp_path) -> None:
+    pq = pytest.importorskip("pyarrow.parquet")
+    dataset = tmp_path / "reports"
+    for name in ("A", "B"):
+        export_records([_report(name, [])], dataset, ValidationReport, format="parquet")
+    (dataset / "part-00000.parquet").unlink()
+    (dataset / "part-00002.parquet").touch()  # reserved by a concurrent writer
+
+    export_records([_report("C", [])], dataset, ValidationReport, format="parquet")
+
+    assert (dataset / "part-00003.parquet").stat().st_size > 0
+    assert pq.read_table(dataset / "part-00001.parquet").num_rows == 1
+
+
+def test_list_fields_are_joined() -> None:
+    dl = DriverLicenseData(
+        file_path="/front.jpg",
+        sources=["/front.jpg", None],
+        first_name="John",
+        last_name="Smith",
+        license_number="D1234567",
+        address="123 Main St",
+        state="IL",
+    )
+
+    assert dict(columns_for(DriverLicenseData))["sources"] is str
+    assert to_row(dl)["sources"] == "/front.jpg;"
@@ -1,11 +1,24 @@
 """Tests for dl-extractor skill."""
+import base64
+import io
 import json
 from unittest.mock import patch, MagicMock
 
 import pytest
 from openai import OpenAIError
+from PIL import Image, ImageDraw, ImageFilter
+from pydantic import ValidationError
 
-from extract_dl import extract_dl
+from extract_dl import (
+    QUALITY_THRESHOLDS,
+    extract_dl,
+    extract_dl_batch,
+    extract_dl_stream,
+    reextract_dl_fields,
+)
+from legal_skills import image_utils, metrics
+from legal_skills.deadline import Deadline, DeadlineExceeded
+from legal_skills.image_utils import ImageQualityError, assess_quality
 from legal_skills.models import DriverLicenseData
 
 
@@ -78,3 +91,246 @@ def test_extract_dl_openai_error(mock_openai_cls, mock_image):
 
     with pytest.raises(OpenAIError, match="API error"):
         extract_dl("/tmp/dl.jpg")
+
+
+@patch("extract_dl.file_to_base64_image", side_effect=["small", "x" * 50, "small"])
+@patch("extract_dl.OpenAI")
+def test_extract_dl_batch_packs_only_small_images(mock_openai_cls, mock_image):
+    fields = json.loads(_mock_dl_response().choices[0].message.content)
+    packed = MagicMock()
+    packed.choices = [MagicMock()]
+    packed.choices[0].message.content = json.dumps({
+        "results": [{"index": 0, **fields}, {"index": 1, **fields, "first_name": "Jane"}],
+    })
+    mock_client = MagicMock()
+    mock_openai_cls.return_value = mock_client
+    mock_client.chat.completions.create.side_effect = [_mock_dl_response(), packed]
+
+    results = extract_dl_batch(["/tmp/a.jpg", "/tmp/big.png", "/tmp/c.jpg"], max_packed_image_chars=10)
+
+    assert mock_client.chat.completions.create.call_count == 2
+    assert [r.file_path for r in results] == ["/tmp/a.jpg", "/tmp/big.png", "/tmp/c.jpg"]
+    assert [r.first_name for r in results] == ["John", "John", "Jane"]
+
+
+@patch("extract_dl.file_to_base64_image", return_value="fake_base64")
+@patch("extract_dl.OpenAI")
+def test_extract_dl_counts_parse_failures(mock_openai_cls, mock_image):
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.content = json.dumps({"first_name": "John"})
+    mock_client = MagicMock()
+    mock_openai_cls.return_value = mock_client
+    mock_client.chat.completions.create.return_value = mock_response
+    before = metrics.get("parse_failures.extract_dl")
+
+    with pytest.raises(ValidationError):
+        extract_dl("/tmp/dl.jpg")
+
+    assert metrics.get("parse_failures.extract_dl") == before + 1
+    request = mock_client.chat.completions.create.call_args.kwargs
+    assert request["response_format"]["type"] == "json_schema"
+
+
+@pytest.mark.parametrize(
+    "low_fields",
+    [
+        {"date_of_birth": None},
+        {"license_number": "N/A"},
+        {"expiration_date": "03/15/2027"},
+        {"date_of_birth": "2030-01-01"},
+    ],
+    ids=["missing", "placeholder", "not_iso", "born_after_expiry"],
+)
+@patch("extract_dl.OpenAI")
+def test_extract_dl_cascade_escalates_once_rendered(mock_openai_cls, low_fields, tmp_path):
+    path = tmp_path / "dl.png"
+    Image.new("RGB", (1200, 800), "white").save(path)
+    low = MagicMock()
+    low.choices = [MagicMock()]
+    low.choices[0].message.content = json.dumps({
+        **json.loads(_mock_dl_response().choices[0].message.content),
+        **low_fields,
+    })
+    mock_client = MagicMock()
+    mock_openai_cls.return_value = mock_client
+    mock_client.chat.completions.create.side_effect = [low, _mock_dl_response()]
+
+    with patch.object(
+        image_utils, "_render_image", wraps=image_utils._render_image
+    ) as render:
+        result = extract_dl(str(path), cascade=True, quality=None)
+
+    assert result.date_of_birth == "1985-03-15"
+    render.assert_called_once()
+    parts = [
+        c.kwargs["messages"][1]["content"][0]["image_url"]
+        for c in mock_client.chat.completions.create.call_args_list
+    ]
+    assert [part["detail"] for part in parts] == ["low", "high"]
+    sizes = [
+        Image.open(io.BytesIO(base64.b64decode(part["url"].split(",", 1)[1]))).size
+        for part in parts
+    ]
+    assert sizes == [(512, 341), (1200, 800)]
+
+
+@patch("extract_dl.OpenAI")
+def test_extract_dl_cascade_stops_at_plausible_low_tier(mock_openai_cls, tmp_path):
+    path = tmp_path / "dl.png"
+    Image.new("RGB", (1200, 800), "white").save(path)
+    mock_client = MagicMock()
+    mock_openai_cls.return_value = mock_client
+    mock_client.chat.completions.create.return_value = _mock_dl_response()
+
+    result = extract_dl(str(path), cascade=True, quality=None)
+
+    assert result.license_number == "D1234567"
+    assert mock_client.chat.completions.create.call_count == 1
+
+
+@patch("extract_dl.file_to_base64_image", return_value="fake_base64")
+@patch("extract_dl.OpenAI")
+def test_extract_dl_deadline_bounds_render_and_request(mock_openai_cls, mock_image):
+    mock_client = MagicMock(max_retries=2)
+    mock_openai_cls.return_value = mock_client
+    create = mock_client.with_options.return_value.chat.completions.create
+    create.return_value = _mock_dl_response()
+
+    extract_dl("/tmp/dl.jpg", deadline=Deadline.after(30.0))
+
+    assert 0 < mock_image.call_args.kwargs["timeout"] <= 30.0
+    assert 0 < create.call_args.kwargs["timeout"] <= 30.0
+
+
+@patch("extract_dl.file_to_base64_image", return_value="fake_base64")
+@patch("extract_dl.OpenAI")
+def test_extract_dl_fails_fast_without_budget(mock_openai_cls, mock_image):
+    mock_client = MagicMock()
+    mock_openai_cls.return_value = mock_client
+
+    with pytest.raises(DeadlineExceeded):
+        extract_dl("/tmp/dl.jpg", deadline=Deadline.after(0.5))
+
+    mock_client.with_options.return_value.chat.completions.create.assert_not_called()
+    mock_client.chat.completions.create.assert_not_called()
+
+
+@patch("extract_dl.OpenAI")
+def test_extract_dl_quality_gate_skips_model_call(mock_openai_cls, tmp_path):
+    path = tmp_path / "blank.png"
+    Image.new("RGB", (800, 500), "white").save(path)
+    create = mock_openai_cls.return_value.chat.completions.create
+
+    with pytest.raises(ImageQualityError):
+        extract_dl(str(path))
+    create.assert_not_called()
+
+    create.return_value = _mock_dl_response()
+    assert extract_dl(str(path), quality=None).license_number == "D1234567"
+
+
+def test_default_gate_only_rejects_unreadable_captures() -> None:
+    gate = QUALITY_THRESHOLDS
+    small_text = Image.new("RGB", (400, 250), "white")
+    ImageDraw.Draw(small_text).text((10, 10), "DRIVER LICENSE D1234567", fill="black")
+
+    assert assess_quality(small_text.filter(ImageFilter.GaussianBlur(2)), gate).issues == ()
+    assert assess_quality(Image.new("RGB", (800, 500), "white"), gate).issues == ("blank",)
+    assert "too_small" in assess_quality(small_text.resize((120, 75)), gate).issues
+
+
+@patch("extract_dl.file_to_base64_image", return_value="fake_base64")
+@patch("extract_dl.OpenAI")
+def test_extract_dl_stream_yields_fields_then_model(mock_openai_cls, mock_image):
+    text = _mock_dl_response().choices[0].message.content
+    chunks = [
+        MagicMock(choices=[MagicMock(delta=MagicMock(content=text[i : i + 5]))])
+        for i in range(0, len(text), 5)
+    ]
+    mock_stream = MagicMock()
+    mock_stream.__iter__.return_value = iter(chunks)
+    mock_client = MagicMock()
+    mock_openai_cls.return_value = mock_client
+    mock_client.chat.completions.create.return_value = mock_stream
+
+    stream = extract_dl_stream("/tmp/dl.jpg")
+    fields = dict(stream)
+    result = stream.result()
+
+    assert fields["first_name"] == "John"
+    assert isinstance(result, DriverLicenseData)
+    assert result.expiration_date == "2027-03-15"
+    assert result.file_path == "/tmp/dl.jpg"
+    assert mock_client.chat.completions.create.call_args.kwargs["stream"] is True
+    mock_stream.close.assert_called()
+
+
+@pytest.mark.parametrize(("composite", "image_parts"), [(False, 2), (True, 1)])
+@patch("extract_dl.OpenAI")
+def test_extract_dl_merges_front_and_back(mock_openai_cls, tmp_path, composite, image_parts):
+    front, back = tmp_path / "front.png", tmp_path / "back.png"
+    Image.new("RGB", (300, 200), "white").save(front)
+    Image.new("RGB", (300, 200), "gray").save(back)
+    mock_client = MagicMock()
+    mock_openai_cls.return_value = mock_client
+    mock_client.chat.completions.create.return_value = _mock_dl_response()
+
+    result = extract_dl(
+        [str(front), back.read_bytes()],
+        source_id=[None, "upload-back"],
+        composite=composite,
+        quality=None,
+    )
+
+    assert result.file_path == str(front)
+    assert result.sources == [str(front), "upload-back"]
+    mock_client.chat.completions.create.assert_called_once()
+    content = mock_client.chat.completions.create.call_args.kwargs["messages"][1]["content"]
+    assert [part["type"] for part in content] == ["image_url"] * image_parts + ["text"]
+    assert "same driver license" in content[-1]["text"]
+
+
+@patch("extract_dl.OpenAI")
+def test_reextract_dl_fields_reads_every_capture(mock_openai_cls, tmp_path):
+    front, back = tmp_path / "front.png", tmp_path / "back.png"
+    Image.new("RGB", (300, 200), "white").save(front)
+    Image.new("RGB", (300, 200), "gray").save(back)
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.content = json.dumps({"expiration_date": "2029-03-15"})
+    mock_client = MagicMock()
+    mock_openai_cls.return_value = mock_client
+    mock_client.chat.completions.create.return_value = mock_response
+    original = DriverLicenseData(
+        **{**json.loads(_mock_dl_response().choices[0].message.content), "expiration_date": None},
+        file_path=str(front),
+        sources=[str(front), str(back)],
+    )
+
+    result = reextract_dl_fields(original, ["expiration_date"])
+
+    assert result.expiration_date == "2029-03-15"
+    content = mock_client.chat.completions.create.call_args.kwargs["messages"][1]["content"]
+    assert [part["type"] for part in content] == ["image_url", "image_url", "text"]
+    with pytest.raises(ValueError, match="single document"):
+        reextract_dl_fields(original, ["expiration_date"], crop=(0.0, 0.0, 1.0, 0.5))
+
+
+@patch("extract_dl.OpenAI")
+def test_extract_dl_cascade_escalates_on_refusal(mock_openai_cls, tmp_path):
+    path = tmp_path / "dl.png"
+    Image.new("RGB", (1200, 800), "white").save(path)
+    refusal = MagicMock()
+    refusal.choices = [MagicMock()]
+    refusal.choices[0].message.content = None
+    refusal.choices[0].message.refusal = "I can't help with that."
+    mock_client = MagicMock()
+    mock_openai_cls.return_value = mock_client
+    mock_client.chat.completions.create.side_effect = [refusal, _mock_dl_response()]
+    before = metrics.get("refusals.extract_dl")
+
+    result = extract_dl(str(path), cascade=True, quality=None)
+
+    assert result.license_number == "D1234567"
+    assert metrics.get("refusals.extract_dl") == before + 1
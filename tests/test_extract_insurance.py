@@ -1,14 +1,26 @@
 """Tests for insurance-extractor skill."""
+import io
 import json
 from unittest.mock import patch, MagicMock
 
 import pytest
 from openai import OpenAIError
+from PIL import Image
 
-from extract_insurance import extract_insurance
+from extract_insurance import (
+    extract_insurance,
+    extract_insurance_stream,
+    reextract_insurance_fields,
+)
 from legal_skills.models import InsuranceData
 
 
+def _card_png() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (800, 500), "white").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
 def _mock_insurance_response():
     """Create a mock OpenAI response with all insurance fields."""
     mock_response = MagicMock()
@@ -84,3 +96,99 @@ def test_extract_insurance_openai_error(mock_openai_cls, mock_image):
 
     with pytest.raises(OpenAIError, match="API error"):
         extract_insurance("/tmp/ins.pdf")
+
+
+@patch("extract_insurance.file_to_base64_image", return_value="fake_base64")
+@patch("extract_insurance.OpenAI")
+def test_reextract_insurance_fields(mock_openai_cls, mock_image, tmp_path):
+    path = tmp_path / "ins.pdf"
+    path.write_bytes(b"%PDF-1.4")
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.content = json.dumps({"vin": "1HGBH41JXMN109186"})
+    mock_client = MagicMock()
+    mock_openai_cls.return_value = mock_client
+    mock_client.chat.completions.create.return_value = mock_response
+    original = InsuranceData(
+        file_path=str(path), first_name="John", last_name="Smith", address="456 Oak Ave"
+    )
+
+    result = reextract_insurance_fields(original, ["vin"], crop=(0.0, 0.5, 1.0, 1.0))
+
+    assert result.vin == "1HGBH41JXMN109186"
+    assert result.first_name == "John"
+    assert mock_image.call_args.args == (str(path),)
+    assert mock_image.call_args.kwargs["crop"] == (0.0, 0.5, 1.0, 1.0)
+    request = mock_client.chat.completions.create.call_args.kwargs
+    assert list(request["response_format"]["json_schema"]["schema"]["properties"]) == ["vin"]
+    assert request["max_tokens"] < 300
+
+
+@pytest.mark.parametrize("source_id", [None, "upload-17"])
+@patch("extract_insurance.OpenAI")
+def test_reextract_bytes_sourced_result_needs_the_document(mock_openai_cls, source_id):
+    document = _card_png()
+    mock_client = MagicMock()
+    mock_openai_cls.return_value = mock_client
+    mock_client.chat.completions.create.return_value = _mock_insurance_response()
+    original = extract_insurance(document, source_id=source_id, quality=None)
+    assert original.file_path == source_id
+
+    with pytest.raises(ValueError, match="pass the document as file_path"):
+        reextract_insurance_fields(original, ["vin"])
+
+    mock_client.chat.completions.create.return_value.choices[0].message.content = json.dumps(
+        {"vin": "2T1BURHE0JC012345"}
+    )
+    result = reextract_insurance_fields(original, ["vin"], file_path=document)
+    assert result.vin == "2T1BURHE0JC012345"
+    assert result.file_path == source_id
+
+
+@patch("extract_insurance.file_to_base64_image", return_value="fake_base64")
+@patch("extract_insurance.OpenAI")
+def test_extract_insurance_stream_closes_after_first_field(mock_openai_cls, mock_image):
+    text = _mock_insurance_response().choices[0].message.content
+    chunks = [
+        MagicMock(choices=[MagicMock(delta=MagicMock(content=text[i : i + 5]))])
+        for i in range(0, len(text), 5)
+    ]
+    mock_stream = MagicMock()
+    mock_stream.__iter__.return_value = iter(chunks)
+    mock_client = MagicMock()
+    mock_openai_cls.return_value = mock_client
+    mock_client.chat.completions.create.return_value = mock_stream
+
+    with extract_insurance_stream("/tmp/ins.pdf") as stream:
+        assert next(iter(stream)) == ("first_name", "John")
+
+    assert mock_client.chat.completions.create.call_args.kwargs["stream"] is True
+    mock_stream.close.assert_called_once()
+
+
+@pytest.mark.parametrize(
+    "low_fields",
+    [{"vin": "1HGBH41JXMN1O9186"}, {"vehicle_year": "22"}, {"policy_number": "?"}],
+    ids=["vin_with_o", "short_year", "placeholder_policy"],
+)
+@patch("extract_insurance.OpenAI")
+def test_extract_insurance_cascade_escalates_on_implausible_field(
+    mock_openai_cls, low_fields, tmp_path
+):
+    path = tmp_path / "card.png"
+    Image.new("RGB", (800, 1100), "white").save(path)
+    low = MagicMock()
+    low.choices = [MagicMock()]
+    low.choices[0].message.content = json.dumps({
+        **json.loads(_mock_insurance_response().choices[0].message.content),
+        **low_fields,
+    })
+    mock_client = MagicMock()
+    mock_openai_cls.return_value = mock_client
+    mock_client.chat.completions.create.side_effect = [low, _mock_insurance_response()]
+
+    result = extract_insurance(str(path), cascade=True, quality=None)
+
+    assert result.vin == "1HGBH41JXMN109186"
+    assert result.policy_number == "POL-98765"
+    assert mock_client.chat.completions.create.call_count == 2
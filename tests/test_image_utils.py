@@ -0,0 +1,252 @@
+"""Tests for shared image handling utilities."""
+
+import base64
+import io
+import subprocess
+import sys
+import tracemalloc
+from pathlib import Path
+
+import pytest
+from PIL import Image, ImageDraw, ImageFilter
+
+from legal_skills import image_utils, metrics
+from legal_skills.image_utils import (
+    COMPOSITE_GAP,
+    ImageQualityError,
+    QualityThresholds,
+    assess_quality,
+    composite_base64_image,
+    file_to_base64_image,
+    files_to_base64_images,
+    quality_skip_rate,
+)
+
+GATE = QualityThresholds(name="test")
+
+
+def _decode(base64_image: str) -> Image.Image:
+    return Image.open(io.BytesIO(base64.b64decode(base64_image)))
+
+
+def test_png_round_trip(tmp_path) -> None:
+    path = tmp_path / "card.png"
+    Image.new("RGB", (300, 200), "white").save(path)
+
+    img = _decode(file_to_base64_image(str(path)))
+
+    assert img.format == "PNG"
+    assert img.size == (300, 200)
+
+
+def test_images_do_not_need_a_pdf_rasterizer(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("LEGAL_SKILLS_PDF_RASTERIZER", "ghostscript")  # invalid, but unused
+    path = tmp_path / "card.png"
+    Image.new("RGB", (64, 40), "white").save(path)
+
+    assert _decode(file_to_base64_image(path)).size == (64, 40)
+
+
+def test_auto_rotate_portrait(tmp_path) -> None:
+    path = tmp_path / "card.jpg"
+    Image.new("RGB", (200, 300), "white").save(path)
+
+    assert _decode(file_to_base64_image(str(path), auto_rotate=True)).size == (300, 200)
+
+
+def test_max_side_downscales(tmp_path) -> None:
+    path = tmp_path / "card.jpg"
+    Image.new("RGB", (2000, 1000), "white").save(path)
+
+    assert _decode(file_to_base64_image(str(path), max_side=512)).size == (512, 256)
+
+
+def test_crop_by_fraction(tmp_path) -> None:
+    path = tmp_path / "card.png"
+    Image.new("RGB", (400, 200), "white").save(path)
+
+    assert _decode(file_to_base64_image(str(path), crop=(0.5, 0.0, 1.0, 0.5))).size == (200, 100)
+
+
+def test_max_decode_side_caps_decoded_size(tmp_path) -> None:
+    path = tmp_path / "photo.jpg"
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotate 90 degrees clockwise on display
+    Image.new("RGB", (4000, 3000), "white").save(path, exif=exif)
+
+    assert _decode(file_to_base64_image(str(path), max_decode_side=1000)).size == (750, 1000)
+    assert _decode(file_to_base64_image(str(path))).size == (1536, 2048)
+    # A quarter-width crop is decoded at 4x the limit, keeping its full 750 px.
+    cropped = file_to_base64_image(str(path), crop=(0.0, 0.0, 0.25, 1.0), max_decode_side=1000)
+    assert _decode(cropped).size == (750, 4000)
+
+
+def test_encoding_peak_memory_ceiling(tmp_path) -> None:
+    """Python-side peak stays near base64 buffer + final str (no PNG/bytes copies).
+
+    tracemalloc does not see PIL's pixel buffers; see the RSS test below.
+    """
+    path = tmp_path / "noise.png"
+    Image.merge("RGB", [Image.effect_noise((1400, 1000), 64) for _ in range(3)]).save(path)
+
+    tracemalloc.start()
+    try:
+        base64_image = file_to_base64_image(str(path), max_decode_side=None)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # Naive BytesIO -> getvalue() -> b64encode -> decode peaks around 2.75x.
+    assert peak < 2.3 * len(base64_image)
+    assert _decode(base64_image).size == (1400, 1000)
+
+
+_PEAK_RSS_SCRIPT = """
+import sys
+from legal_skills.image_utils import file_to_base64_image
+
+def peak_rss():
+    with open("/proc/self/status") as status:
+        return next(int(line.split()[1]) * 1024 for line in status if line.startswith("VmHWM"))
+
+before = peak_rss()
+try:
+    file_to_base64_image(sys.argv[1])
+    outcome = "rendered"
+except ValueError:
+    outcome = "rejected"
+print(outcome, peak_rss() - before)
+"""
+
+
+@pytest.mark.parametrize(
+    ("name", "size", "outcome", "ceiling_mb"),
+    [
+        # 24 MP (96 MB decoded): JPEGs decode at a reduced DCT scale; ~180 MB uncapped.
+        ("scan.jpg", (6000, 4000), "rendered", 64),
+        # PNGs decode in full, so one this large is rejected from its header.
+        ("scan.png", (6000, 4000), "rejected", 16),
+        # The largest PNG still decoded in full (~90 MB measured).
+        ("page.png", (3500, 3500), "rendered", 112),
+    ],
+)
+def test_large_scan_peak_rss_ceiling(tmp_path, name, size, outcome, ceiling_mb) -> None:
+    if not Path("/proc/self/status").exists():
+        pytest.skip("peak RSS is read from /proc")
+    path = tmp_path / name
+    scan = Image.new("RGB", size, "white")
+    box = (500, 500, size[0] - 500, size[1] - 500)
+    ImageDraw.Draw(scan).rectangle(box, outline="black", width=40)
+    scan.save(path, quality=90)  # PNG ignores quality
+    scan.close()
+
+    # A fresh interpreter (VmHWM, unlike ru_maxrss, is reset by exec), so the
+    # peak reflects this one document.
+    result = subprocess.run(
+        [sys.executable, "-c", _PEAK_RSS_SCRIPT, str(path)],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=Path(__file__).resolve().parent.parent,
+    )
+
+    rendered, peak = result.stdout.split()
+    assert rendered == outcome
+    assert int(peak) < ceiling_mb * 1024 * 1024
+
+
+def _text_page(size: tuple[int, int] = (800, 500)) -> Image.Image:
+    img = Image.new("RGB", size, "white")
+    draw = ImageDraw.Draw(img)
+    for y in range(20, size[1] - 20, 24):
+        draw.text((20, y), "DRIVER LICENSE D1234567 SPRINGFIELD IL 62701", fill="black")
+    return img
+
+
+def test_quality_passes_sharp_text() -> None:
+    assert assess_quality(_text_page(), GATE).issues == ()
+
+
+@pytest.mark.parametrize(
+    ("img", "issue"),
+    [
+        (_text_page().filter(ImageFilter.GaussianBlur(2)), "blurry"),
+        (Image.new("RGB", (800, 500), "white"), "blank"),
+        (_text_page().point(lambda v: v // 8), "too_dark"),
+        (_text_page().point(lambda v: 200 + v // 5), "too_bright"),
+        (_text_page((200, 120)), "too_small"),
+    ],
+)
+def test_quality_flags_bad_images(img, issue) -> None:
+    assert issue in assess_quality(img, GATE).issues
+
+
+def test_blank_page_is_not_also_blurry() -> None:
+    assert assess_quality(Image.new("RGB", (800, 500), "black"), GATE).issues == ("blank",)
+
+
+def test_file_to_base64_image_rejects_before_encoding(tmp_path) -> None:
+    metrics.reset()
+    good, bad = tmp_path / "good.png", tmp_path / "bad.png"
+    _text_page().save(good)
+    Image.new("RGB", (800, 500), "white").save(bad)
+
+    assert file_to_base64_image(str(good), quality=GATE)
+    with pytest.raises(ImageQualityError) as excinfo:
+        file_to_base64_image(str(bad), quality=GATE)
+
+    assert excinfo.value.report.issues == ("blank",)
+    assert metrics.get("quality_gate.test.passed") == 1
+    assert metrics.get("quality_gate.test.rejected.blank") == 1
+    assert quality_skip_rate("test") == 0.5
+    # Without thresholds the gate is skipped.
+    assert file_to_base64_image(str(bad))
+
+
+def test_in_memory_sources_detected_by_content(tmp_path) -> None:
+    buffer = io.BytesIO()
+    Image.new("RGB", (300, 200), "white").save(buffer, format="JPEG")
+    data = buffer.getvalue()
+    misnamed = tmp_path / "card.png"
+    misnamed.write_bytes(data)
+
+    expected = file_to_base64_image(data)
+    assert _decode(expected).size == (300, 200)
+    assert file_to_base64_image(memoryview(data)) == expected
+    assert file_to_base64_image(io.BytesIO(data)) == expected
+    assert file_to_base64_image(misnamed) == expected
+    with pytest.raises(ValueError, match="Unsupported file type"):
+        file_to_base64_image(b"plain text, not an image")
+
+
+def test_multiple_documents_rendered_in_order_or_stacked(tmp_path) -> None:
+    front, back = tmp_path / "front.png", tmp_path / "back.jpg"
+    Image.new("RGB", (300, 200), "white").save(front)
+    Image.new("RGB", (240, 100), "white").save(back)
+
+    images = files_to_base64_images([front, back])
+    composite = _decode(composite_base64_image([front, back]))
+
+    assert [_decode(image).size for image in images] == [(300, 200), (240, 100)]
+    assert composite.size == (300, 200 + COMPOSITE_GAP + 100)
+    assert _decode(composite_base64_image([front, back], max_side=158)).size == (150, 158)
+
+
+def test_composite_flattens_transparency_and_closes_on_error(tmp_path, monkeypatch) -> None:
+    clear = tmp_path / "clear.png"
+    Image.new("RGBA", (40, 20), (0, 0, 0, 0)).save(clear)
+    assert _decode(composite_base64_image([clear, clear])).getpixel((0, 0))[:3] == (255, 255, 255)
+
+    rendered = []
+    render = image_utils._render_image
+
+    def recording_render(*args, **kwargs):
+        rendered.append(render(*args, **kwargs))
+        return rendered[-1]
+
+    monkeypatch.setattr(image_utils, "_render_image", recording_render)
+    with pytest.raises(OSError):
+        composite_base64_image([clear, b"\x89PNG\r\n\x1a\n truncated"])
+    (img,) = rendered
+    with pytest.raises(ValueError, match="closed"):
+        img.getpixel((0, 0))
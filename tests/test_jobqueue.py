@@ -0,0 +1,150 @@
+"""Tests for the durable SQLite job queue."""
+
+import sqlite3
+import time
+from unittest.mock import patch
+
+import pytest
+
+from legal_skills.jobqueue import JobQueue, skill_handlers
+from legal_skills.models import ClassificationResult
+
+
+@pytest.fixture
+def queue(tmp_path):
+    with JobQueue(tmp_path / "jobs.db", lease_seconds=60, max_attempts=2) as q:
+        yield q
+
+
+def test_enqueue_is_idempotent(queue: JobQueue) -> None:
+    first = queue.enqueue("classify", {"file_path": "/tmp/a.jpg"})
+    second = queue.enqueue("classify", {"file_path": "/tmp/a.jpg"})
+    assert first == second
+    assert queue.counts() == {"pending": 1}
+
+
+def test_run_completes_tasks_and_stores_model_results(queue: JobQueue) -> None:
+    queue.enqueue("classify", {"file_path": "/tmp/a.jpg"})
+    handler = lambda payload: ClassificationResult(  # noqa: E731
+        file_path=payload["file_path"], document_type="insurance", confidence=0.9
+    )
+
+    assert queue.run({"classify": handler}, worker_id="w1") == 1
+
+    (task,) = queue.tasks(status="done")
+    assert task.result == {"file_path": "/tmp/a.jpg", "document_type": "insurance", "confidence": 0.9}
+    assert task.attempts == 1
+
+
+def test_resume_after_crash_reclaims_expired_lease(tmp_path) -> None:
+    path = tmp_path / "jobs.db"
+    crashed = JobQueue(path, lease_seconds=60)
+    task_id = crashed.enqueue("classify", {"file_path": "/tmp/a.jpg"})
+    assert crashed.claim("w1") is not None
+    crashed.close()  # process dies holding the lease
+
+    with JobQueue(path, lease_seconds=60) as restarted:
+        assert restarted.claim("w2") is None  # lease still valid
+        with patch("legal_skills.jobqueue.time.time", return_value=10**10):
+            task = restarted.claim("w2")
+        assert task is not None and task.task_id == task_id
+        assert task.attempts == 2
+
+
+def test_opens_queue_created_before_timing_columns(tmp_path) -> None:
+    path = tmp_path / "jobs.db"
+    with sqlite3.connect(path) as conn:
+        conn.executescript(
+            """
+            CREATE TABLE tasks (
+                task_id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0,
+                lease_owner TEXT, lease_expires REAL, result TEXT, error TEXT,
+                created_at REAL NOT NULL, updated_at REAL NOT NULL
+            );
+            INSERT INTO tasks (task_id, kind, payload, created_at, updated_at)
+            VALUES ('old', 'classify', '{"file_path": "/tmp/a.jpg"}', 0, 0);
+            """
+        )
+    conn.close()
+
+    with JobQueue(path) as queue:
+        task = queue.claim("w1")
+        assert task is not None and task.task_id == "old" and task.started_at is not None
+        assert queue.complete("old", "w1", {"v": 1}) is True
+        assert queue.get("old").finished_at is not None
+
+
+def test_complete_keeps_first_result(queue: JobQueue) -> None:
+    task_id = queue.enqueue("classify", {"file_path": "/tmp/a.jpg"})
+    queue.claim("w1")
+    assert queue.complete(task_id, "w1", {"v": 1}) is True
+    assert queue.complete(task_id, "w2", {"v": 2}) is False
+    assert queue.get(task_id).result == {"v": 1}
+
+
+def test_complete_requires_the_current_lease(queue: JobQueue) -> None:
+    task_id = queue.enqueue("classify", {"file_path": "/tmp/a.jpg"})
+    queue.claim("w1")
+    with patch("legal_skills.jobqueue.time.time", return_value=10**10):
+        assert queue.claim("w2").lease_owner == "w2"  # w1's lease expired
+
+    assert queue.complete(task_id, "w1", {"v": 1}) is False
+    assert queue.get(task_id).status == "running"
+
+    queue.fail(task_id, "w2", "RuntimeError: API down")  # second attempt: failed
+    assert queue.complete(task_id, "w2", {"v": 2}) is False
+    assert queue.get(task_id).status == "failed"
+
+
+def test_run_renews_the_lease_of_long_tasks(tmp_path) -> None:
+    with JobQueue(tmp_path / "jobs.db", lease_seconds=0.3) as queue:
+        queue.enqueue("classify", {"file_path": "/tmp/a.jpg"})
+        stolen = []
+
+        def slow(payload: dict) -> str:
+            time.sleep(0.8)  # well past the lease without heartbeats
+            stolen.append(queue.claim("w2"))
+            return "ok"
+
+        assert queue.run({"classify": slow}, worker_id="w1") == 1
+        assert stolen == [None]
+
+
+def test_execute_records_the_outcome_of_a_claimed_task(queue: JobQueue) -> None:
+    ok_id = queue.enqueue("classify", {"file_path": "/tmp/a.jpg"})
+    bad_id = queue.enqueue("classify", {"file_path": "/tmp/b.jpg"})
+
+    def boom(payload: dict) -> None:
+        raise RuntimeError("API down")
+
+    assert queue.execute(queue.claim("w1"), lambda payload: {"v": 1}, "w1") is True
+    assert queue.execute(queue.claim("w1"), boom, "w1") is False
+
+    assert queue.get(ok_id).result == {"v": 1}
+    assert queue.get(bad_id).status == "pending"
+    assert queue.get(bad_id).error == "RuntimeError: API down"
+
+
+def test_failures_retry_then_fail(queue: JobQueue) -> None:
+    task_id = queue.enqueue("classify", {"file_path": "/tmp/a.jpg"})
+
+    def boom(payload: dict) -> None:
+        raise RuntimeError("API down")
+
+    assert queue.run({"classify": boom}, worker_id="w1") == 0
+
+    task = queue.get(task_id)
+    assert task.status == "failed"
+    assert task.attempts == 2
+    assert task.error == "RuntimeError: API down"
+
+
+def test_run_only_claims_handled_kinds(queue: JobQueue) -> None:
+    queue.enqueue("validate", {"dl": {}, "insurance": {}})
+    assert queue.run({"classify": lambda payload: None}, worker_id="w1") == 0
+    assert queue.counts() == {"pending": 1}
+
+
+def test_skill_handlers_cover_all_skills() -> None:
+    assert set(skill_handlers()) == {"classify", "extract_dl", "extract_insurance", "validate"}
@@ -0,0 +1,37 @@
+"""Tests for multi-document packing helpers."""
+
+import json
+
+import pytest
+
+from legal_skills.packing import chunked, packed_image_content, parse_indexed_results
+
+
+def test_chunked_splits_into_batches() -> None:
+    assert list(chunked([1, 2, 3, 4, 5], 2)) == [[1, 2], [3, 4], [5]]
+
+
+def test_packed_image_content_labels_each_image() -> None:
+    content = packed_image_content(["aaa", "bbb"], "Do it.")
+    assert [part["type"] for part in content] == ["text", "image_url", "text", "image_url", "text"]
+    assert content[2]["text"] == "Document 1:"
+    assert content[3]["image_url"]["url"] == "data:image/png;base64,bbb"
+
+
+def test_parse_indexed_results_orders_by_index() -> None:
+    content = json.dumps({"results": [{"index": 1, "v": "b"}, {"index": 0, "v": "a"}]})
+    assert parse_indexed_results(content, 2) == [{"v": "a"}, {"v": "b"}]
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        {"results": [{"index": 0}]},
+        {"results": [{"index": 0}, {"index": 0}]},
+        {"results": [{"index": 0}, {"index": 5}]},
+        {"items": []},
+    ],
+)
+def test_parse_indexed_results_rejects_malformed(payload: dict) -> None:
+    with pytest.raises(ValueError):
+        parse_indexed_results(json.dumps(payload), 2)
@@ -0,0 +1,208 @@
+"""Tests for the classify -> extract -> pair -> validate orchestrator."""
+
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from legal_skills import metrics
+from legal_skills.deadline import Deadline
+from legal_skills.models import ClassificationResult, DriverLicenseData, InsuranceData
+from legal_skills.pipeline import StageLimits, iter_cases, process_folder
+from validate import validate_documents
+
+
+@pytest.fixture(autouse=True)
+def _reset_metrics() -> None:
+    metrics.reset()
+
+
+def _classify(file_path: str) -> ClassificationResult:
+    name = Path(file_path).stem
+    if name.startswith("broken"):
+        raise RuntimeError("model unavailable")
+    document_type = {"dl": "driver_license", "ins": "insurance"}.get(
+        name.split("_")[0], "unknown"
+    )
+    return ClassificationResult(file_path=file_path, document_type=document_type, confidence=0.9)
+
+
+def _extract_dl(file_path: str) -> DriverLicenseData:
+    return DriverLicenseData(
+        file_path=file_path,
+        first_name="John",
+        last_name="Smith",
+        license_number="D1",
+        address="1 Main St",
+        state="IL",
+    )
+
+
+def _extract_insurance(file_path: str) -> InsuranceData:
+    address = "9 Elm St" if "moved" in file_path else "1 Main St"
+    return InsuranceData(
+        file_path=file_path, first_name="John", last_name="Smith", address=address
+    )
+
+
+def _skills(**overrides):
+    skills = {
+        "classify": _classify,
+        "extractors": {"driver_license": _extract_dl, "insurance": _extract_insurance},
+        "validate": validate_documents,
+    }
+    skills.update(overrides)
+    return skills
+
+
+def _touch(root: Path, *names: str) -> None:
+    for name in names:
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"")
+
+
+def test_process_folder_pairs_and_validates_per_case(tmp_path: Path) -> None:
+    _touch(
+        tmp_path,
+        "alice/dl_front.jpg",
+        "alice/ins_card.pdf",
+        "bob/dl.png",
+        "bob/ins_moved.pdf",
+        "bob/selfie.jpg",
+        "carol/dl.jpg",
+        "carol/broken.jpg",
+        "notes.txt",
+    )
+
+    streamed = []
+    summary = process_folder(tmp_path, on_case=streamed.append, **_skills())
+
+    assert [case.case for case in summary.cases] == ["alice", "bob", "carol"]
+    assert sorted(case.case for case in streamed) == ["alice", "bob", "carol"]
+    alice, bob, carol = summary.cases
+    assert [r.match_status for r in alice.reports] == ["match"]
+    assert [r.match_status for r in bob.reports] == ["discrepancy"]
+    assert bob.reports[0].insurance_source.endswith("ins_moved.pdf")
+    assert [u.file_path for u in summary.unknown] == [str(tmp_path / "bob/selfie.jpg")]
+    assert [d.file_path for d in summary.unpaired] == [str(tmp_path / "carol/dl.jpg")]
+    assert [(f.stage, f.error) for f in carol.failed] == [
+        ("classify", "RuntimeError: model unavailable")
+    ]
+    assert metrics.get("pipeline.cases") == 3
+    assert metrics.get("pipeline.classify.failed") == 1
+
+
+def test_iter_cases_streams_cases_as_they_complete() -> None:
+    def slow_extract_dl(file_path: str) -> DriverLicenseData:
+        if "slow" in file_path:
+            time.sleep(0.3)
+        return _extract_dl(file_path)
+
+    skills = _skills(
+        extractors={"driver_license": slow_extract_dl, "insurance": _extract_insurance}
+    )
+    cases = {"slow": ["slow/dl.jpg", "slow/ins.pdf"], "fast": ["fast/dl.jpg", "fast/ins.pdf"]}
+
+    start = time.monotonic()
+    results = iter_cases(cases, **skills)
+    first = next(results)
+    first_at = time.monotonic() - start
+
+    assert first.case == "fast"
+    assert first_at < 0.2
+    assert next(results).case == "slow"
+
+
+def test_stage_limits_bound_concurrency() -> None:
+    lock = threading.Lock()
+    active = {"now": 0, "peak": 0}
+
+    def tracked_extract_dl(file_path: str) -> DriverLicenseData:
+        with lock:
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+        time.sleep(0.02)
+        with lock:
+            active["now"] -= 1
+        return _extract_dl(file_path)
+
+    skills = _skills(
+        extractors={"driver_license": tracked_extract_dl, "insurance": _extract_insurance}
+    )
+    cases = {f"case{i}": [f"case{i}/dl.jpg"] for i in range(12)}
+
+    results = list(iter_cases(cases, limits=StageLimits(classify=8, extract=3), **skills))
+
+    assert len(results) == 12
+    assert active["peak"] == 3
+
+
+def test_extraction_failure_is_reported_and_case_still_completes() -> None:
+    def failing_extract_insurance(file_path: str) -> InsuranceData:
+        raise ValueError("unreadable")
+
+    skills = _skills(
+        extractors={"driver_license": _extract_dl, "insurance": failing_extract_insurance}
+    )
+
+    (case,) = iter_cases({"x": ["x/dl.jpg", "x/ins.pdf"]}, **skills)
+
+    assert case.reports == []
+    assert [(f.file_path, f.stage) for f in case.failed] == [("x/ins.pdf", "extract")]
+    assert [d.file_path for d in case.unpaired] == ["x/dl.jpg"]
+
+
+def test_case_timeout_is_shared_by_all_stages_of_a_case() -> None:
+    deadlines = []
+
+    def classify(file_path: str, *, deadline: Deadline) -> ClassificationResult:
+        deadlines.append(deadline)
+        return _classify(file_path)
+
+    def slow_extract_dl(file_path: str, *, deadline: Deadline) -> DriverLicenseData:
+        deadlines.append(deadline)
+        time.sleep(0.1)
+        deadline.check("extract_dl")
+        return _extract_dl(file_path)
+
+    skills = _skills(classify=classify, extractors={"driver_license": slow_extract_dl})
+
+    (case,) = iter_cases({"x": ["x/dl.jpg"]}, case_timeout=0.05, **skills)
+
+    assert len({id(deadline) for deadline in deadlines}) == 1
+    assert [(f.stage, f.error.split(":")[0]) for f in case.failed] == [
+        ("extract", "DeadlineExceeded")
+    ]
+    assert metrics.get("pipeline.extract.failed") == 1
+
+
+def test_routing_error_is_reported_instead_of_stalling_the_case() -> None:
+    skills = _skills(extractors={"driver_license": _extract_dl})  # no insurance extractor
+
+    (case,) = iter_cases({"x": ["x/dl.jpg", "x/ins.pdf"]}, **skills)
+
+    assert [(f.file_path, f.stage) for f in case.failed] == [("x/ins.pdf", "extract")]
+    assert "No extractor for insurance" in case.failed[0].error
+    assert [d.file_path for d in case.unpaired] == ["x/dl.jpg"]
+
+
+def test_documents_are_paired_by_holder() -> None:
+    def extract_dl(file_path: str) -> DriverLicenseData:
+        first = {"jane": "Jane", "kid": "Tim"}.get(file_path[5:-4], "John")
+        return _extract_dl(file_path).model_copy(update={"first_name": first})
+
+    def extract_insurance(file_path: str) -> InsuranceData:
+        first = "jane" if "jane" in file_path else "John"
+        return _extract_insurance(file_path).model_copy(update={"first_name": first})
+
+    skills = _skills(extractors={"driver_license": extract_dl, "insurance": extract_insurance})
+    files = ["x/dl_john.jpg", "x/dl_jane.jpg", "x/ins_john.pdf", "x/ins_jane.pdf", "x/dl_kid.jpg"]
+
+    (case,) = iter_cases({"x": files}, **skills)
+
+    pairs = sorted((r.dl_source, r.insurance_source) for r in case.reports)
+    assert pairs == [("x/dl_jane.jpg", "x/ins_jane.pdf"), ("x/dl_john.jpg", "x/ins_john.pdf")]
+    assert all(r.match_status == "match" for r in case.reports)
+    assert [d.file_path for d in case.unpaired] == ["x/dl_kid.jpg"]
@@ -0,0 +1,58 @@
+"""Tests for the pluggable PDF rasterizers."""
+
+import pytest
+from PIL import Image
+
+from legal_skills import metrics
+from legal_skills.deadline import DeadlineExceeded
+from legal_skills.image_utils import file_to_base64_image
+from legal_skills.rasterize import PdfiumRasterizer, default_rasterizer, get_rasterizer, main
+
+pytest.importorskip("pypdfium2")
+
+
+@pytest.fixture
+def two_page_pdf(tmp_path):
+    path = tmp_path / "card.pdf"
+    first = Image.new("RGB", (720, 360), "white")  # 10in x 5in at 72 dpi
+    first.save(path, resolution=72, save_all=True, append_images=[Image.new("RGB", (72, 72))])
+    return path
+
+
+def test_pdfium_renders_first_page_in_process(two_page_pdf) -> None:
+    metrics.reset()
+    rasterizer = PdfiumRasterizer()
+
+    assert rasterizer.page_count(two_page_pdf) == 2
+    assert rasterizer.render_first_page(two_page_pdf).size == (2000, 1000)
+    assert rasterizer.render_first_page(two_page_pdf, size=512).size == (512, 256)
+    assert metrics.get("rasterize.pdfium.pages") == 2
+    with pytest.raises(DeadlineExceeded):
+        rasterizer.render_first_page(two_page_pdf, timeout=0.0)
+
+
+def test_rasterizer_selected_by_environment(monkeypatch, two_page_pdf) -> None:
+    monkeypatch.setenv("LEGAL_SKILLS_PDF_RASTERIZER", "pdfium")
+    assert default_rasterizer().name == "pdfium"
+    assert file_to_base64_image(str(two_page_pdf), max_side=512)
+
+    monkeypatch.setenv("LEGAL_SKILLS_PDF_RASTERIZER", "ghostscript")
+    with pytest.raises(ValueError, match="ghostscript"):
+        default_rasterizer()
+    assert get_rasterizer("auto").name == "pdfium"
+
+
+def test_pdf_rendered_from_bytes(two_page_pdf) -> None:
+    data = two_page_pdf.read_bytes()
+    rasterizer = PdfiumRasterizer()
+
+    assert rasterizer.page_count(memoryview(data)) == 2
+    assert rasterizer.render_first_page(data, size=512).size == (512, 256)
+    assert file_to_base64_image(data, max_side=512) == file_to_base64_image(
+        two_page_pdf, max_side=512
+    )
+
+
+def test_benchmark_runs_without_sample_documents(capsys) -> None:
+    assert main(["--repeat", "2"]) == 0
+    assert "pdfium: 2 renders" in capsys.readouterr().out
@@ -0,0 +1,95 @@
+"""Tests for the indexed record store and duplicate detection."""
+
+import pytest
+
+from legal_skills.models import DriverLicenseData, InsuranceData
+from legal_skills.record_store import RecordStore, identity_key, normalize_identifier
+
+
+def _dl(file_path: str, first: str, license_number: str, dob: str = "1985-03-15") -> DriverLicenseData:
+    return DriverLicenseData(
+        file_path=file_path,
+        first_name=first,
+        last_name="Smith",
+        license_number=license_number,
+        address="123 Main St",
+        state="IL",
+        date_of_birth=dob,
+    )
+
+
+def _ins(file_path: str, first: str, policy: str, vin: str) -> InsuranceData:
+    return InsuranceData(
+        file_path=file_path,
+        first_name=first,
+        last_name="Smith",
+        date_of_birth="1985-03-15",
+        address="123 Main St",
+        policy_number=policy,
+        vin=vin,
+    )
+
+
+@pytest.fixture
+def store():
+    with RecordStore(":memory:") as s:
+        s.add_many(
+            [
+                _dl("/a.jpg", "John", "D123-4567"),
+                _dl("/b.jpg", "Jane", "d1234567"),
+                _dl("/c.jpg", "John", "X999"),
+                _dl("/d.jpg", "Bob", "B1", dob=""),
+                _ins("/e.pdf", "John", "POL-1", "1hgbh41jxmn109186"),
+                _ins("/f.pdf", "John", "POL-2", "1HGBH41JXMN109186"),
+            ]
+        )
+        yield s
+
+
+def test_normalization() -> None:
+    assert normalize_identifier(" d-123 4 ") == "D1234"
+    assert normalize_identifier("--") is None
+    assert identity_key(" John ", "SMITH", "1985-03-15") == "john|smith|1985-03-15"
+    assert identity_key("John", "Smith", None) is None
+
+
+def test_identity_key_normalizes_date_of_birth() -> None:
+    assert identity_key("John", "Smith", "03/15/1985") == "john|smith|1985-03-15"
+    assert identity_key("John", "Smith", " 1985-03-15 ") == "john|smith|1985-03-15"
+    assert identity_key("John", "Smith", "March 15, 1985") is None
+    assert identity_key("John", "Smith", "13/45/1985") is None
+
+    with RecordStore(":memory:") as s:
+        s.add(_dl("/us.jpg", "John", "D1", dob="03/15/1985"))
+        s.add(_ins("/iso.pdf", "John", "POL-1", "1HGBH41JXMN109186"))
+        found = s.find_by_identity("John", "Smith", "1985-03-15")
+    assert {r.file_path for r in found} == {"/us.jpg", "/iso.pdf"}
+
+
+def test_lookups(store: RecordStore) -> None:
+    assert [r.file_path for r in store.find_by_license("D1234567")] == ["/a.jpg", "/b.jpg"]
+    assert len(store.find_by_vin("1HGBH41JXMN109186")) == 2
+    assert [r.file_path for r in store.find_by_policy("pol 2")] == ["/f.pdf"]
+    assert {r.file_path for r in store.find_by_identity("john", "smith", "1985-03-15")} == {
+        "/a.jpg",
+        "/c.jpg",
+        "/e.pdf",
+        "/f.pdf",
+    }
+
+
+def test_duplicate_report(store: RecordStore) -> None:
+    groups = {(g.kind, g.key): g for g in store.duplicates()}
+
+    assert set(groups) == {
+        ("reused_license", "D1234567"),
+        ("duplicate_identity", "john|smith|1985-03-15"),
+        ("shared_vin", "1HGBH41JXMN109186"),
+    }
+    assert sorted(groups[("reused_license", "D1234567")].sources) == ["/a.jpg", "/b.jpg"]
+    assert groups[("shared_vin", "1HGBH41JXMN109186")].distinct_values == 2
+
+
+def test_unknown_duplicate_kind(store: RecordStore) -> None:
+    with pytest.raises(ValueError):
+        list(store.duplicates("nope"))
@@ -0,0 +1,46 @@
+"""Tests for targeted field re-extraction helpers."""
+
+import pytest
+
+from legal_skills.models import DriverLicenseData
+from legal_skills.repair import field_spec, max_tokens_for, merge_fields, select_fields
+
+
+def _dl() -> DriverLicenseData:
+    return DriverLicenseData(
+        file_path="/tmp/dl.jpg",
+        first_name="John",
+        last_name="Smith",
+        license_number="D1234567",
+        address="123 Main St",
+        state="IL",
+    )
+
+
+def test_select_fields_returns_model_order() -> None:
+    assert select_fields(DriverLicenseData, ["expiration_date", "address"]) == (
+        "address",
+        "expiration_date",
+    )
+
+
+@pytest.mark.parametrize("fields", [["file_path"], ["nickname"], []])
+def test_select_fields_rejects_invalid(fields: list[str]) -> None:
+    with pytest.raises(ValueError):
+        select_fields(DriverLicenseData, fields)
+
+
+def test_field_spec_includes_hints() -> None:
+    spec = field_spec({"address": None, "date_of_birth": "YYYY-MM-DD or null"}, ["address", "date_of_birth"])
+    assert spec == "address, date_of_birth (YYYY-MM-DD or null)"
+
+
+def test_max_tokens_scales_with_fields() -> None:
+    assert max_tokens_for(("a",)) < max_tokens_for(("a", "b"))
+
+
+def test_merge_fields_ignores_nulls() -> None:
+    merged = merge_fields(_dl(), {"address": "9 Elm St", "date_of_birth": None})
+    assert merged.address == "9 Elm St"
+    assert merged.date_of_birth is None
+    assert _dl().address == "123 Main St"
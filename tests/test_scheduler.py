@@ -0,0 +1,108 @@
+"""Tests for priority lanes and per-tenant fair scheduling."""
+
+import threading
+import time
+
+import pytest
+
+from legal_skills import metrics
+from legal_skills.deadline import Deadline, DeadlineExceeded
+from legal_skills.scheduler import QueueFullError, Scheduler
+
+
+@pytest.fixture(autouse=True)
+def _reset_metrics() -> None:
+    metrics.reset()
+
+
+def _wait_for_queued(scheduler: Scheduler, count: int) -> None:
+    deadline = time.monotonic() + 2.0
+    while sum(lane.queued for lane in scheduler.stats().values()) < count:
+        assert time.monotonic() < deadline, "waiters never queued"
+        time.sleep(0.005)
+
+
+def _grant_order(scheduler: Scheduler, requests: list[tuple[str, str]]) -> list[str]:
+    """Queue ``(priority, tenant)`` requests behind a held slot; return the order served."""
+    order: list[str] = []
+    lock = threading.Lock()
+
+    def call(priority: str, tenant: str) -> None:
+        with scheduler.slot(priority=priority, tenant=tenant):
+            with lock:
+                order.append(f"{priority}:{tenant}")
+
+    threads = []
+    with scheduler.slot(priority="interactive"):
+        for i, (priority, tenant) in enumerate(requests):
+            thread = threading.Thread(target=call, args=(priority, tenant))
+            thread.start()
+            threads.append(thread)
+            _wait_for_queued(scheduler, i + 1)
+    for thread in threads:
+        thread.join()
+    return order
+
+
+def test_interactive_calls_jump_queued_bulk_calls() -> None:
+    scheduler = Scheduler(capacity=1)
+
+    order = _grant_order(
+        scheduler, [("bulk", "a"), ("bulk", "a"), ("interactive", "b"), ("bulk", "a")]
+    )
+
+    assert order[0] == "interactive:b"
+    assert metrics.get("scheduler.interactive.admitted") == 2
+    assert metrics.get("scheduler.bulk.admitted") == 3
+
+
+def test_tenants_share_a_lane_by_weight() -> None:
+    scheduler = Scheduler(capacity=1, tenant_weights={"big": 3.0})
+
+    order = _grant_order(scheduler, [("bulk", "big")] * 6 + [("bulk", "small")] * 2)
+
+    first_four = [entry.split(":")[1] for entry in order[:4]]
+    assert first_four.count("big") == 3
+    assert first_four.count("small") == 1
+
+
+def test_bulk_never_takes_the_interactive_reserve() -> None:
+    scheduler = Scheduler(capacity=2, interactive_reserve=1)
+    with scheduler.slot(priority="bulk"):
+        with pytest.raises(DeadlineExceeded):
+            with scheduler.slot(priority="bulk", deadline=Deadline.after(0.1)):
+                pass
+        with scheduler.slot(priority="interactive", deadline=Deadline.after(0.1)):
+            assert scheduler.stats()["interactive"].in_flight == 1
+    assert scheduler.stats()["bulk"].queued == 0
+    assert metrics.get("scheduler.bulk.timed_out") == 1
+
+
+def test_full_queue_sheds_load_with_retry_hint() -> None:
+    scheduler = Scheduler(capacity=1, queue_limits={"bulk": 1})
+    with scheduler.slot(priority="interactive"):
+        waiter = threading.Thread(target=lambda: scheduler.run(lambda: None, priority="bulk"))
+        waiter.start()
+        _wait_for_queued(scheduler, 1)
+        with pytest.raises(QueueFullError) as excinfo:
+            scheduler.run(lambda: None, priority="bulk")
+    waiter.join()
+
+    assert excinfo.value.retry_after > 0
+    assert metrics.get("scheduler.bulk.rejected") == 1
+
+
+def test_scheduled_backend_spends_wait_from_request_timeout() -> None:
+    seen = {}
+
+    class _Backend:
+        def complete(self, **request):
+            seen.update(request)
+            return "response"
+
+    scheduler = Scheduler(capacity=1)
+    backend = scheduler.backend(_Backend(), priority="interactive", tenant="acme")
+
+    assert backend.complete(model="m", timeout=30.0) == "response"
+    assert seen["model"] == "m"
+    assert 0 < seen["timeout"] <= 30.0
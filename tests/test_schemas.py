@@ -0,0 +1,32 @@
+"""Tests for strict JSON-schema response formats."""
+
+from legal_skills.models import ClassificationResult, DriverLicenseData, InsuranceData
+from legal_skills.schemas import packed_response_format, response_format
+
+
+def test_response_format_is_strict_and_excludes_file_path() -> None:
+    fmt = response_format(DriverLicenseData)
+    schema = fmt["json_schema"]["schema"]
+    assert fmt["type"] == "json_schema"
+    assert fmt["json_schema"]["strict"] is True
+    assert "file_path" not in schema["properties"]
+    assert schema["required"] == list(schema["properties"])
+    assert schema["additionalProperties"] is False
+    assert schema["properties"]["date_of_birth"] == {"type": ["string", "null"]}
+
+
+def test_response_format_keeps_enum_and_drops_titles() -> None:
+    schema = response_format(ClassificationResult)["json_schema"]["schema"]
+    assert schema["properties"]["document_type"]["enum"] == ["driver_license", "insurance", "unknown"]
+    assert "title" not in schema["properties"]["confidence"]
+
+
+def test_response_format_is_cached() -> None:
+    assert response_format(InsuranceData) is response_format(InsuranceData)
+
+
+def test_packed_response_format_adds_index() -> None:
+    schema = packed_response_format(InsuranceData)["json_schema"]["schema"]
+    item = schema["properties"]["results"]["items"]
+    assert item["required"][0] == "index"
+    assert "vin" in item["required"]
@@ -0,0 +1,184 @@
+"""Tests for single-flight deduplication of concurrent calls."""
+
+import asyncio
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import pytest
+
+from legal_skills import artifact_cache
+from legal_skills.artifact_cache import artifact_key
+from legal_skills.backends import OpenAIBackend, backend_key
+from legal_skills.deadline import Deadline, DeadlineExceeded, OperationCancelled
+from legal_skills.scheduler import Scheduler
+from legal_skills.singleflight import SingleFlight, request_key
+
+
+def _slow_counter() -> tuple[list[int], Callable[[], str]]:
+    calls: list[int] = []
+
+    def fn() -> str:
+        calls.append(1)
+        time.sleep(0.1)
+        return "result"
+
+    return calls, fn
+
+
+def test_concurrent_threads_share_one_call() -> None:
+    flight = SingleFlight()
+    calls, fn = _slow_counter()
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        results = list(pool.map(lambda _: flight.do("key", fn), range(5)))
+
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+    assert flight.in_flight() == 0
+
+
+def test_sequential_calls_are_not_cached() -> None:
+    flight = SingleFlight()
+    calls, fn = _slow_counter()
+    flight.do("key", fn)
+    flight.do("key", fn)
+    assert len(calls) == 2
+
+
+def test_errors_propagate_to_all_waiters() -> None:
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def fail() -> None:
+        started.set()
+        time.sleep(0.1)
+        raise RuntimeError("boom")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flight.do, "key", fail)
+        started.wait()
+        follower = pool.submit(flight.do, "key", fail)
+        for future in (leader, follower):
+            with pytest.raises(RuntimeError, match="boom"):
+                future.result()
+
+
+def test_followers_wait_only_until_their_own_deadline() -> None:
+    flight = SingleFlight()
+    calls, fn = _slow_counter()
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flight.do, "key", fn)
+        time.sleep(0.02)
+        with pytest.raises(DeadlineExceeded):
+            flight.do("key", fn, deadline=Deadline.after(0.01))
+        assert leader.result() == "result"
+
+
+def test_followers_without_time_limit_can_be_cancelled_while_waiting() -> None:
+    flight = SingleFlight()
+    calls, fn = _slow_counter()
+    deadline = Deadline()
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flight.do, "key", fn)
+        time.sleep(0.02)
+        follower = pool.submit(flight.do, "key", fn, deadline=deadline)
+        deadline.cancel()
+        with pytest.raises(OperationCancelled):
+            follower.result(timeout=0.5)
+        assert leader.result() == "result"
+
+
+def test_async_followers_can_be_cancelled_while_waiting() -> None:
+    flight = SingleFlight()
+    calls, fn = _slow_counter()
+    deadline = Deadline()
+
+    async def main() -> None:
+        leader = asyncio.create_task(flight.do_async("key", fn))
+        await asyncio.sleep(0.02)
+        follower = asyncio.create_task(flight.do_async("key", fn, deadline=deadline))
+        await asyncio.sleep(0.01)
+        deadline.cancel()
+        with pytest.raises(OperationCancelled):
+            await asyncio.wait_for(follower, 0.5)
+        assert await leader == "result"
+
+    asyncio.run(main())
+
+
+def test_follower_reruns_call_whose_leader_ran_out_of_time() -> None:
+    flight = SingleFlight()
+    started = threading.Event()
+    calls: list[str] = []
+
+    def timed_out() -> str:
+        calls.append("leader")
+        started.set()
+        time.sleep(0.05)
+        raise DeadlineExceeded("leader budget")
+
+    def succeed() -> str:
+        calls.append("follower")
+        return "result"
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flight.do, "key", timed_out)
+        started.wait()
+        follower = pool.submit(flight.do, "key", succeed)
+        with pytest.raises(DeadlineExceeded):
+            leader.result()
+        assert follower.result() == "result"
+    assert calls == ["leader", "follower"]
+
+
+def test_async_and_thread_callers_share_one_call() -> None:
+    flight = SingleFlight()
+    calls, fn = _slow_counter()
+
+    async def main() -> list[str]:
+        thread_result = asyncio.get_running_loop().run_in_executor(None, flight.do, "key", fn)
+        await asyncio.sleep(0.02)
+        return await asyncio.gather(
+            flight.do_async("key", fn), flight.do_async("key", fn), thread_result
+        )
+
+    assert asyncio.run(main()) == ["result"] * 3
+    assert len(calls) == 1
+
+
+def test_request_key_uses_path_content_and_options(tmp_path) -> None:
+    a, b = tmp_path / "a.jpg", tmp_path / "b.jpg"
+    a.write_bytes(b"same")
+    b.write_bytes(b"same")
+
+    key = request_key("classify", str(a), "json")
+    assert request_key("classify", a, "json") == key
+    assert request_key("classify", str(b), "json") != key  # results carry their own path
+    a.write_bytes(b"edited")
+    assert request_key("classify", str(a), "json") != key
+    assert request_key("classify", str(a), "json") != request_key("classify", str(a), "logprob")
+    assert request_key("classify", str(a)) != request_key("extract_dl", str(a))
+    assert request_key("classify", str(tmp_path / "missing.jpg")) is None
+
+
+def test_request_key_is_stable_across_backend_wrappers(tmp_path, monkeypatch) -> None:
+    path = tmp_path / "dl.jpg"
+    path.write_bytes(b"image bytes")
+    client = MagicMock(base_url="https://api.openai.com/v1/")
+    scheduler = Scheduler(capacity=2)
+    # The scheduler docstring's pattern: a fresh wrapper per call.
+    first = scheduler.backend(OpenAIBackend(client), priority="interactive")
+    second = scheduler.backend(OpenAIBackend(client), priority="bulk")
+    file_digest = MagicMock(wraps=artifact_cache.hashlib.file_digest)
+    monkeypatch.setattr(artifact_cache.hashlib, "file_digest", file_digest)
+
+    key = request_key("classify", str(path), "json", backend_key(first))
+    assert request_key("classify", str(path), "json", backend_key(second)) == key
+    artifact_key(str(path), {"max_side": None})
+
+    file_digest.assert_called_once()  # one hash for both keys
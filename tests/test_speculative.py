@@ -0,0 +1,132 @@
+"""Tests for speculative extraction alongside classification."""
+
+import threading
+import time
+
+import pytest
+from PIL import Image
+
+from legal_skills import metrics
+from legal_skills.deadline import Deadline
+from legal_skills.models import ClassificationResult, DriverLicenseData, InsuranceData
+from legal_skills.speculative import classify_and_extract, guess_document_type
+
+
+@pytest.fixture(autouse=True)
+def _reset_metrics() -> None:
+    metrics.reset()
+
+
+def _classifier(document_type: str, delay: float = 0.1):
+    def classify(file_path: str) -> ClassificationResult:
+        time.sleep(delay)
+        return ClassificationResult(
+            file_path=file_path, document_type=document_type, confidence=0.9
+        )
+
+    return classify
+
+
+def _extractors(calls: list[str], delay: float = 0.1):
+    def extract_dl(file_path: str, *, deadline: Deadline) -> DriverLicenseData:
+        calls.append("driver_license")
+        time.sleep(delay)
+        return DriverLicenseData(
+            file_path=file_path,
+            first_name="J",
+            last_name="S",
+            license_number="D1",
+            address="A",
+            state="IL",
+        )
+
+    def extract_insurance(file_path: str, *, deadline: Deadline) -> InsuranceData:
+        calls.append("insurance")
+        time.sleep(delay)
+        return InsuranceData(file_path=file_path, first_name="J", last_name="S", address="A")
+
+    return {"driver_license": extract_dl, "insurance": extract_insurance}
+
+
+def test_guess_from_filename_and_aspect(tmp_path) -> None:
+    assert guess_document_type("/up/john_dl_front.pdf") == "driver_license"
+    assert guess_document_type("/up/Insurance-Card.pdf") == "insurance"
+    assert guess_document_type("/up/scan001.pdf") is None
+
+    card, page = tmp_path / "a.png", tmp_path / "b.png"
+    Image.new("RGB", (856, 540)).save(card)
+    Image.new("RGB", (850, 1100)).save(page)
+    assert guess_document_type(str(card)) == "driver_license"
+    assert guess_document_type(str(page)) == "insurance"
+
+
+def test_both_runs_concurrently_and_discards_mismatch() -> None:
+    started = threading.Barrier(3, timeout=2.0)  # classify and both extractions
+    calls: list[str] = []
+    extractors = _extractors(calls, delay=0)
+
+    def overlapping(fn):
+        def call(file_path: str, **kwargs):
+            started.wait()
+            return fn(file_path, **kwargs)
+
+        return call
+
+    result = classify_and_extract(
+        "/up/scan.pdf",
+        prior="both",
+        classify=overlapping(_classifier("insurance", delay=0)),
+        extractors={doc_type: overlapping(fn) for doc_type, fn in extractors.items()},
+    )
+
+    assert isinstance(result.extraction, InsuranceData)
+    assert sorted(calls) == ["driver_license", "insurance"]
+    assert metrics.get("speculative.hits") == 1
+
+
+def test_discarded_extraction_is_cancelled_without_a_deadline() -> None:
+    finished = threading.Event()
+
+    def extract_dl(file_path: str, *, deadline: Deadline) -> DriverLicenseData:
+        try:
+            while True:  # rendering, then retry backoff: checks its deadline
+                deadline.check("extract_dl")
+                time.sleep(0.01)
+        finally:
+            finished.set()
+
+    result = classify_and_extract(
+        "/up/scan.pdf",
+        prior="both",
+        classify=_classifier("insurance", delay=0.05),
+        extractors={**_extractors([], delay=0), "driver_license": extract_dl},
+    )
+
+    assert isinstance(result.extraction, InsuranceData)
+    assert finished.wait(2.0)
+    for _ in range(100):  # counted by the discarded call's done callback
+        if metrics.get("speculative.cancelled"):
+            break
+        time.sleep(0.01)
+    assert metrics.get("speculative.cancelled") == 1
+    assert metrics.get("speculative.wasted") == 0
+
+
+def test_wrong_guess_falls_back_to_sequential() -> None:
+    calls: list[str] = []
+
+    result = classify_and_extract(
+        "/up/policy.pdf", classify=_classifier("driver_license"), extractors=_extractors(calls)
+    )
+
+    assert result.speculated == ("insurance",)
+    assert isinstance(result.extraction, DriverLicenseData)
+    assert metrics.get("speculative.misses") == 1
+
+
+def test_unknown_document_has_no_extraction() -> None:
+    result = classify_and_extract(
+        "/up/dl.pdf", classify=_classifier("unknown"), extractors=_extractors([])
+    )
+    assert result.extraction is None
+    assert metrics.get("speculative.hits") == 0
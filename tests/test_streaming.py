@@ -0,0 +1,105 @@
+"""Tests for incremental field delivery from streamed responses."""
+
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from legal_skills import metrics
+from legal_skills.backends import stream_completion
+from legal_skills.models import DriverLicenseData
+from legal_skills.scheduler import Scheduler
+from legal_skills.streaming import FieldStream, ObjectStreamParser
+
+DOCUMENT = {
+    "first_name": "John",
+    "last_name": 'O"Brien, Jr. {the 2nd}',
+    "license_number": "D1234567",
+    "address": "123 Main St\nSpringfield",
+    "state": "IL",
+    "date_of_birth": None,
+    "expiration_date": "2027-03-15",
+}
+
+
+def test_parser_yields_each_member_once_complete() -> None:
+    text = json.dumps({**DOCUMENT, "nested": {"a": [1, {"b": "}"}]}}, indent=1)
+    parser = ObjectStreamParser()
+
+    seen = []
+    for char in text + "\n trailing text is ignored":
+        seen.extend(parser.feed(char))
+
+    assert [key for key, _ in seen] == [*DOCUMENT, "nested"]
+    assert dict(seen)["last_name"] == DOCUMENT["last_name"]
+    assert dict(seen)["nested"] == {"a": [1, {"b": "}"}]}
+    assert parser.done
+    assert parser.close() == {**DOCUMENT, "nested": {"a": [1, {"b": "}"}]}}
+
+
+def test_parser_rejects_truncated_and_non_object_text() -> None:
+    parser = ObjectStreamParser()
+    assert parser.feed('{"first_name": "John", "last') == [("first_name", "John")]
+    with pytest.raises(json.JSONDecodeError):
+        parser.close()
+    with pytest.raises(json.JSONDecodeError):
+        ObjectStreamParser().feed('["not", "an", "object"]')
+
+
+def test_field_stream_stops_reading_when_object_closes() -> None:
+    metrics.reset()
+    text = json.dumps(DOCUMENT)
+    read = []
+
+    def chunks():
+        for start in range(0, len(text), 7):
+            read.append(start)
+            yield text[start : start + 7]
+        yield "never read"
+
+    stream = FieldStream(chunks(), lambda fields: DriverLicenseData(**fields), skill="test")
+
+    first_field, first_value = next(iter(stream))
+    assert (first_field, first_value) == ("first_name", "John")
+    assert len(read) < len(text) // 7  # yielded before the whole object arrived
+    assert [field for field, _ in stream] == list(DOCUMENT)[1:]
+    assert stream.result().license_number == "D1234567"
+    assert len(read) == len(range(0, len(text), 7))
+    assert metrics.get("streaming.test.calls") == 1
+
+
+def test_field_stream_counts_parse_failures() -> None:
+    metrics.reset()
+    stream = FieldStream(
+        iter(['{"first_name": "John"}']),
+        lambda fields: DriverLicenseData(**fields),
+        skill="test",
+    )
+
+    assert list(stream) == [("first_name", "John")]
+    with pytest.raises(ValidationError):
+        stream.result()
+    assert metrics.get("parse_failures.test") == 1
+
+
+def test_closing_field_stream_releases_scheduler_slot() -> None:
+    text = json.dumps(DOCUMENT)
+
+    class _StreamingBackend:
+        def stream(self, **request):
+            for start in range(0, len(text), 7):
+                yield text[start : start + 7]
+
+    scheduler = Scheduler(capacity=1)
+    backend = scheduler.backend(_StreamingBackend(), priority="interactive")
+    build = lambda fields: DriverLicenseData(**fields)  # noqa: E731
+
+    with FieldStream(stream_completion(backend, model="m"), build, skill="test") as stream:
+        assert next(iter(stream)) == ("first_name", "John")
+        assert scheduler.stats()["interactive"].in_flight == 1
+    assert scheduler.stats()["interactive"].in_flight == 0
+
+    stream = FieldStream(stream_completion(backend, model="m"), build, skill="test")
+    next(iter(stream))
+    del stream  # abandoned without closing
+    assert scheduler.stats()["interactive"].in_flight == 0
@@ -119,3 +119,11 @@ def test_case_insensitive_address_match() -> None:
         _make_ins(address="123 main st"),
     )
     assert report.address_match is True
+
+
+def test_in_memory_sources_have_no_path() -> None:
+    report = validate_documents(_make_dl(file_path=None), _make_ins(file_path=None))
+
+    assert report.match_status == "match"
+    assert report.dl_source is None
+    assert report.insurance_source is None
@@ -0,0 +1,63 @@
+"""Tests for shared-queue workers and the coordinator, using several processes."""
+
+import multiprocessing
+import time
+
+from legal_skills.coordinator import collect_results, enqueue_files, summarize
+from legal_skills.jobqueue import JobQueue
+from legal_skills.models import ClassificationResult
+from legal_skills.worker import run_worker
+
+
+def _fake_classify(payload: dict) -> ClassificationResult:
+    time.sleep(0.01)
+    return ClassificationResult(
+        file_path=payload["file_path"], document_type="unknown", confidence=0.5
+    )
+
+
+def _worker_process(queue_path: str, worker_id: str) -> None:
+    run_worker(
+        queue_path,
+        handlers={"classify": _fake_classify},
+        worker_id=worker_id,
+        concurrency=2,
+        poll_interval=0.05,
+        idle_exit=0.5,
+    )
+
+
+def test_workers_share_queue_without_double_processing(tmp_path) -> None:
+    queue_path = str(tmp_path / "jobs.db")
+    files = [f"/tmp/doc_{i}.jpg" for i in range(60)]
+    with JobQueue(queue_path) as queue:
+        enqueue_files(queue, "classify", files)
+
+    ctx = multiprocessing.get_context("fork")
+    processes = [
+        ctx.Process(target=_worker_process, args=(queue_path, f"host{i}:1")) for i in range(3)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+
+    with JobQueue(queue_path) as queue:
+        assert queue.counts() == {"done": 60}
+        assert all(task.attempts == 1 for task in queue.tasks())
+        results = collect_results(queue, "classify", ClassificationResult)
+        summary = summarize(queue)
+
+    assert sorted(r.file_path for r in results) == sorted(files)
+    assert sum(w.completed for w in summary.workers) == 60
+    assert {w.worker_id for w in summary.workers} <= {"host0:1", "host1:1", "host2:1"}
+    assert len(summary.workers) >= 2
+    assert summary.total_tasks_per_second > 0
+
+
+def test_run_worker_stops_when_idle(tmp_path) -> None:
+    processed = run_worker(
+        tmp_path / "jobs.db", handlers={"classify": _fake_classify}, idle_exit=0, poll_interval=0
+    )
+    assert processed == 0